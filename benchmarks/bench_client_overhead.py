@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo por arquivo no cliente distribuído, sem rede
+Compara o caminho antigo (duas aberturas do arquivo, `import json` no laço e
+serialização dupla para medir bytes) com o atual (uma leitura para hash +
+prévia, corpo serializado uma vez e reutilizado no envio e na contagem).
+A montagem da requisição HTTP pelo requests é igual nos dois e fica de fora.
+
+Uso: python3 benchmarks/bench_client_overhead.py [--files 2000] [--size 8192] [--rounds 5]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'distribuido'))
+
+from client import AntivirusDistribuidoCliente, PREVIEW_SIZE
+
+CLIENT_ID = 'bench'
+
+
+def before(filepath):
+    """Caminho anterior de scan_file_remote até o corpo pronto para envio"""
+    md5 = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(4096), b''):
+            md5.update(chunk)
+    file_hash = md5.hexdigest()
+    with open(filepath, 'rb') as f:
+        content_preview = f.read(PREVIEW_SIZE).decode('utf-8', errors='ignore')
+    request_data = {
+        'hash': file_hash,
+        'name': str(filepath),
+        'client_id': CLIENT_ID,
+        'content_preview': content_preview
+    }
+    import json
+    request_size = len(json.dumps(request_data).encode('utf-8'))
+    # requests.post(json=...) serializa o dict outra vez antes de enviar
+    json.dumps(request_data, allow_nan=False).encode('utf-8')
+    return request_size
+
+
+def after(filepath):
+    """Caminho atual: uma leitura, uma serialização"""
+    file_hash, content_preview = AntivirusDistribuidoCliente.hash_and_preview(filepath)
+    body = json.dumps({
+        'hash': file_hash,
+        'name': str(filepath),
+        'client_id': CLIENT_ID,
+        'content_preview': content_preview
+    }, separators=(',', ':')).encode('utf-8')
+    return len(body)
+
+
+def make_corpus(directory, files, size):
+    paths = []
+    for i in range(files):
+        path = Path(directory) / f'arquivo_{i:05d}.txt'
+        path.write_bytes(os.urandom(size // 2).hex().encode('ascii')[:size])
+        paths.append(path)
+    return paths
+
+
+def measure(fn, paths, rounds):
+    """Microssegundos por arquivo em cada rodada (cache de páginas já quente)"""
+    for path in paths[:100]:
+        fn(path)
+    per_file = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        per_file.append((time.perf_counter() - start) / len(paths) * 1e6)
+    return per_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=8192, help='Tamanho de cada arquivo em bytes')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_corpus(directory, args.files, args.size)
+        print(f"{args.files} arquivos de {args.size} bytes, {args.rounds} rodadas\n")
+        results = {}
+        for name, fn in (('antes (2 leituras, 2 serializações)', before),
+                         ('depois (1 leitura, 1 serialização)', after)):
+            samples = measure(fn, paths, args.rounds)
+            results[name] = statistics.median(samples)
+            print(f"{name:<40} {results[name]:8.1f} µs/arquivo   "
+                  f"(min {min(samples):.1f}, max {max(samples):.1f})")
+        old, new = results.values()
+        print(f"\nRedução do custo por arquivo: {(1 - new / old) * 100:.1f}%")
+        print(f"Bytes por requisição: antes {before(paths[0])}, depois {after(paths[0])}")
+
+
+if __name__ == '__main__':
+    main()
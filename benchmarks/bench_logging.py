@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga do caminho /scan com logging síncrono vs assíncrono
+Dispara requisições em várias threads via test client do Flask e mede vazão e latência
+
+Uso: python3 benchmarks/bench_logging.py [--requests 5000] [--threads 8]
+(os logs vão para o stdout; rode no terminal para ver o custo real do console)
+"""
+
+import sys
+import time
+import argparse
+import threading
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'distribuido'))
+
+import server
+from async_logger import AsyncLogger
+from admission import AdmissionController
+
+CLEAN_HASH = '0' * 32
+MALWARE_HASH = '5d41402abc4b2a76b9719d911017c592'
+
+
+def run_load(total_requests, threads):
+    """Executa a carga e retorna (vazão em req/s, latências em segundos)"""
+    latencies = []
+    lock = threading.Lock()
+    per_thread = total_requests // threads
+
+    def worker(worker_id):
+        client = server.app.test_client()
+        local_latencies = []
+        for i in range(per_thread):
+            payload = {
+                'hash': MALWARE_HASH if i % 50 == 0 else CLEAN_HASH,
+                'name': f'bench_{worker_id}_{i}.txt',
+                'client_id': f'bench-{worker_id}',
+                'content_preview': 'conteudo limpo de teste'
+            }
+            start = time.perf_counter()
+            client.post('/scan', json=payload)
+            local_latencies.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local_latencies)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sample-clean', type=float, default=0.1,
+                        help='Taxa de amostragem de eventos limpos no modo assíncrono')
+    args = parser.parse_args()
+
+    modos = [
+        ('print síncrono', dict(synchronous=True)),
+        ('assíncrono', dict()),
+        (f'assíncrono + amostragem {args.sample_clean:.0%}', dict(clean_sample_rate=args.sample_clean)),
+    ]
+
+    # Sem limite por cliente: com o padrão (50 req/s, burst 100) quase toda a carga viraria 429
+    # e o benchmark mediria rejeições em vez do custo do logger
+    server.admission = AdmissionController(client_rate=0, max_concurrent=64, max_queue=100000)
+
+    resultados = []
+    for nome, config in modos:
+        server.logger.close()
+        server.logger = AsyncLogger(**config)
+        throughput, latencies = run_load(args.requests, args.threads)
+        server.logger.close()
+        resultados.append((nome, throughput, latencies, dict(server.logger.stats)))
+
+    print(f"\n{'='*70}", file=sys.stderr)
+    print(f"RESULTADO ({args.requests} requisições, {args.threads} threads)", file=sys.stderr)
+    print(f"{'='*70}", file=sys.stderr)
+    for nome, throughput, latencies, stats in resultados:
+        print(f"{nome:<32} {throughput:10.1f} req/s   "
+              f"p50={statistics.median(latencies)*1000:.3f}ms   "
+              f"p99={percentile(latencies, 0.99)*1000:.3f}ms   "
+              f"escritos={stats['written']} descartados={stats['dropped']}",
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark do protocolo TCP com quadros vs caminho HTTP/JSON do Flask
+Sobe os dois listeners no próprio processo e mede latência e vazão de consultas de hash
+
+Uso: python3 benchmarks/bench_protocol.py [--requests 3000] [--window 32]
+"""
+
+import sys
+import time
+import logging
+import argparse
+import threading
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'distribuido'))
+
+import requests
+from werkzeug.serving import make_server
+
+import server
+from async_logger import AsyncLogger
+from admission import AdmissionController
+from framed_protocol import FramedServer, FramedClient, OP_SCAN, encode_scan_request
+
+HASHES = ['5d41402abc4b2a76b9719d911017c592', '0' * 32]
+PREVIEW = 'conteudo de teste sem padroes'
+
+
+def summary(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<34} {len(latencies)/elapsed:10.0f} req/s   "
+          f"p50={statistics.median(latencies)*1e6:8.1f}µs   p99={p99*1e6:8.1f}µs")
+
+
+def bench_http(url, total, session=None):
+    post = session.post if session else requests.post
+    latencies = []
+    start = time.perf_counter()
+    for i in range(total):
+        t0 = time.perf_counter()
+        post(f'{url}/scan', json={'hash': HASHES[i % 2], 'name': f'f{i}', 'client_id': 'bench',
+                                  'content_preview': PREVIEW}, timeout=10).json()
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def bench_tcp(client, total, window):
+    """window=1 é sequencial; maior que 1 mantém várias requisições em voo na mesma conexão"""
+    latencies = []
+    in_flight = []
+    start = time.perf_counter()
+    for i in range(total):
+        payload = encode_scan_request(HASHES[i % 2], f'f{i}', PREVIEW.encode('utf-8'))
+        in_flight.append((time.perf_counter(), client.submit(OP_SCAN, payload)))
+        if len(in_flight) >= window:
+            t0, future = in_flight.pop(0)
+            future.result(10)
+            latencies.append(time.perf_counter() - t0)
+    for t0, future in in_flight:
+        future.result(10)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--window', type=int, default=32, help='Requisições em voo no modo pipelined')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server.logger.close()
+    server.logger = AsyncLogger(level='ERROR')
+    server.admission = AdmissionController(client_rate=0, max_concurrent=64, max_queue=100000)
+
+    http_server = make_server('127.0.0.1', 0, server.app, threaded=True, request_handler=server.KeepAliveRequestHandler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{http_server.server_port}'
+
+    framed_server = FramedServer(('127.0.0.1', 0), server.framed_dispatch)
+    framed_server.start_background()
+    client = FramedClient('127.0.0.1', framed_server.server_address[1], 'bench')
+
+    # Aquecimento
+    bench_http(url, 50)
+    bench_tcp(client, 50, 1)
+
+    print(f"{args.requests} consultas por modo\n")
+    summary('HTTP/JSON (conexão nova)', *bench_http(url, args.requests))
+    with requests.Session() as session:
+        summary('HTTP/JSON (keep-alive)', *bench_http(url, args.requests, session))
+    summary('TCP quadros (sequencial)', *bench_tcp(client, args.requests, 1))
+    summary(f'TCP quadros (pipeline {args.window})', *bench_tcp(client, args.requests, args.window))
+
+    client.close()
+    framed_server.shutdown()
+    http_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência de consulta do backend SQLite de assinaturas
+Gera bases sintéticas com N digests MD5 e mede lookups de acerto e de falta
+
+Uso: python3 benchmarks/bench_signature_store.py [--sizes 1000000 10000000] [--lookups 20000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'distribuido'))
+
+from signature_store import SqliteSignatureStore
+
+
+def build_store(path, size, seed):
+    """Cria a base com `size` digests e devolve uma amostra de digests existentes"""
+    rng = random.Random(seed)
+    sample = []
+    sample_every = max(1, size // 50000)
+
+    def digests():
+        for i in range(size):
+            digest = rng.getrandbits(128).to_bytes(16, 'big').hex()
+            if i % sample_every == 0:
+                sample.append(digest)
+            yield digest, f'Bench.Malware.{i}'
+
+    store = SqliteSignatureStore(path, seed=False)
+    start = time.perf_counter()
+    store.add_many(digests())
+    build_time = time.perf_counter() - start
+    return store, sample, build_time
+
+
+def measure(store, keys):
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        store.lookup(key)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies) * 1e6,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+        'mean': statistics.fmean(latencies) * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--dir', default=None, help='Diretório para as bases temporárias')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    print(f"{'entradas':>12} {'build(s)':>9} {'arquivo':>10} {'acerto p50/p99 (µs)':>22} {'falta p50/p99 (µs)':>22}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+            path = Path(tmp) / f'bench_{size}.sqlite3'
+            store, sample, build_time = build_store(path, size, args.seed)
+            hits = [rng.choice(sample) for _ in range(args.lookups)]
+            misses = [os.urandom(16).hex() for _ in range(args.lookups)]
+            measure(store, hits[:1000])  # aquecimento do cache de páginas
+            hit = measure(store, hits)
+            miss = measure(store, misses)
+            store.close()
+            file_mb = path.stat().st_size / 1024 / 1024
+        print(f"{size:>12} {build_time:>9.1f} {file_mb:>8.1f}MB "
+              f"{hit['p50']:>10.1f} / {hit['p99']:<9.1f} {miss['p50']:>10.1f} / {miss['p99']:<9.1f}")
+
+
+if __name__ == '__main__':
+    main()
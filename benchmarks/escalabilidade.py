@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Curvas de escalabilidade dos dois antivírus
+Mede a vazão (arquivos/s e MB/s) variando quatro eixos: número de arquivos
+do corpus, tamanho médio dos arquivos, workers e clientes simultâneos. Os
+corpora vêm do gerador_corpus.py (semente fixa, sem outliers) e são gerados
+uma vez por combinação de arquivos × tamanho.
+
+- workers: processos do antivírus local dividindo o corpus, ou `concurrency`
+  do cliente distribuído;
+- clientes: processos do cliente distribuído escaneando o corpus inteiro ao
+  mesmo tempo contra o mesmo servidor (vazão agregada do servidor).
+
+Por padrão cada eixo varia com os outros no primeiro valor da lista (curvas
+de um fator); --grade-completa mede o produto cartesiano. Eficiência paralela
+de n workers/clientes = vazão(n) / (n × vazão(1)). Rode o servidor com
+--client-rate 0 para o limite por cliente não entrar na medida.
+
+Uso: python3 benchmarks/escalabilidade.py [--server http://localhost:5000] [--arquivos 100,1000,10000]
+     [--tamanhos 4KB,64KB,1MB] [--workers 1,2,4,8] [--clientes 1,2,4,8] [--repeticoes 1] [--output escala.json]
+"""
+
+import sys
+import json
+import asyncio
+import time
+import shutil
+import tempfile
+import argparse
+import itertools
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'distribuido'))
+sys.path.insert(0, str(ROOT / 'local'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from antivirus_local import AntivirusLocal
+from client import AntivirusDistribuidoCliente
+from gerador_corpus import CorpusGenerator, parse_size
+from harness import quiet, summarize
+
+AXES = ('files', 'size', 'workers', 'clients')
+DEFAULT_AXES = {'files': [100, 1000, 10000], 'size': [4 * 1024, 64 * 1024, 1024 ** 2],
+                'workers': [1, 2, 4, 8], 'clients': [1, 2, 4, 8]}
+# Abaixo desta eficiência o eixo é considerado saturado
+EFFICIENCY_FLOOR = 0.5
+
+
+def sweep_points(axes, full_grid=False):
+    """Combinações a medir: produto cartesiano ou um eixo por vez a partir do ponto base"""
+    if full_grid:
+        return [dict(zip(AXES, values)) for values in itertools.product(*(axes[a] for a in AXES))]
+    base = {axis: axes[axis][0] for axis in AXES}
+    points = []
+    for axis in AXES:
+        for value in axes[axis]:
+            point = dict(base, **{axis: value})
+            if point not in points:
+                points.append(point)
+    return points
+
+
+class CorpusCache:
+    """Um corpus por (arquivos, tamanho mediano), gerado sob demanda em um diretório temporário"""
+
+    def __init__(self, workdir=None, seed=42):
+        self.workdir = Path(workdir or tempfile.mkdtemp(prefix='escala_'))
+        self.owned = workdir is None
+        self.seed = seed
+        self.corpora = {}
+
+    def get(self, files, size):
+        key = (files, size)
+        if key not in self.corpora:
+            output = self.workdir / f'corpus_{files}_{size}'
+            if not (output / 'manifest.json').exists():
+                # Tamanhos concentrados em torno da mediana: o eixo mede o tamanho, não a cauda
+                CorpusGenerator(seed=self.seed, files=files, size_median=size, size_sigma=0.5,
+                                max_size=size * 8, outlier_rate=0, depth=2).generate(output)
+            self.corpora[key] = sorted(str(p) for p in (output / 'arquivos').rglob('*') if p.is_file())
+        return self.corpora[key]
+
+    def cleanup(self):
+        if self.owned:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def _local_worker(paths, barrier, results):
+    with quiet():
+        scanner = AntivirusLocal(phases=False)
+        barrier.wait()
+        start = time.perf_counter()
+        for path in paths:
+            scanner.scan_file(path)
+        end = time.perf_counter()
+    results.put((start, end, scanner.scan_results['total_files'], scanner.scan_results['total_bytes_scanned']))
+
+
+def _distributed_worker(paths, server_url, concurrency, barrier, results):
+    with quiet():
+        scanner = AntivirusDistribuidoCliente(server_url, concurrency=concurrency, phases=False,
+                                              cache_path=None, queue_path=None)
+        scanner.download_signatures()
+        barrier.wait()
+        start = time.perf_counter()
+        if concurrency > 1:
+            asyncio.run(scanner.scan_files_async(paths))
+        else:
+            for path in paths:
+                scanner.scan_file(path)
+        end = time.perf_counter()
+    results.put((start, end, scanner.scan_results['total_files'], scanner.scan_results['total_bytes_scanned']))
+
+
+def run_processes(target, args_list):
+    """Um processo por item de `args_list`, todos liberados juntos; vazão agregada da janela comum"""
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(len(args_list))
+    results = context.Queue()
+    processes = [context.Process(target=target, args=(*args, barrier, results)) for args in args_list]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = max(end for _, end, _, _ in measured) - min(start for start, _, _, _ in measured)
+    files = sum(m[2] for m in measured)
+    total_bytes = sum(m[3] for m in measured)
+    return {'wall_time': wall, 'files': files, 'bytes': total_bytes,
+            'files_per_s': files / wall if wall > 0 else 0.0,
+            'mb_per_s': total_bytes / 1024 ** 2 / wall if wall > 0 else 0.0}
+
+
+def measure(scanner, point, paths, server_url):
+    if scanner == 'local':
+        # Workers do local dividem o corpus; o eixo de clientes não se aplica
+        return run_processes(_local_worker, [(paths[i::point['workers']],) for i in range(point['workers'])])
+    return run_processes(_distributed_worker,
+                         [(paths, server_url, point['workers']) for _ in range(point['clients'])])
+
+
+def efficiency_curves(points, axes):
+    """Para workers e clientes: vazão, speedup e eficiência ao longo do eixo, demais eixos na base"""
+    base = {axis: axes[axis][0] for axis in AXES}
+    curves = {}
+    for axis in AXES:
+        curves[axis] = {}
+        for scanner in ('local', 'distribuido'):
+            if scanner == 'local' and axis == 'clients':
+                continue
+            series = []
+            for value in axes[axis]:
+                wanted = dict(base, **{axis: value})
+                match = next((p for p in points if p['scanner'] == scanner and
+                              all(p[a] == wanted[a] for a in AXES if not (scanner == 'local' and a == 'clients'))),
+                             None)
+                if match:
+                    series.append({'value': value, 'files_per_s': match['files_per_s']['mean'],
+                                   'mb_per_s': match['mb_per_s']['mean'], 'ci95': match['files_per_s']['ci95']})
+            if axis in ('workers', 'clients') and series:
+                first = series[0]
+                for entry in series:
+                    ratio = entry['value'] / first['value']
+                    entry['speedup'] = entry['files_per_s'] / first['files_per_s'] if first['files_per_s'] else 0.0
+                    entry['efficiency'] = entry['speedup'] / ratio
+                # Último n antes da eficiência cair abaixo do limite pela primeira vez
+                saturation = None
+                for entry in series:
+                    if entry['efficiency'] < EFFICIENCY_FLOOR:
+                        break
+                    saturation = entry['value']
+                curves[axis][f'{scanner}_saturation'] = saturation
+            curves[axis][scanner] = series
+    return curves
+
+
+def run_sweep(server_url='http://localhost:5000', axes=None, full_grid=False, repetitions=1, workdir=None,
+              scanners=('local', 'distribuido'), log=print):
+    axes = {**DEFAULT_AXES, **(axes or {})}
+    cache = CorpusCache(workdir)
+    points = []
+    try:
+        for point in sweep_points(axes, full_grid):
+            paths = cache.get(point['files'], point['size'])
+            for scanner in scanners:
+                if scanner == 'local' and point['clients'] != axes['clients'][0]:
+                    continue
+                runs = [measure(scanner, point, paths, server_url) for _ in range(max(1, repetitions))]
+                result = dict(point, scanner=scanner, runs=runs,
+                              files_per_s=summarize([r['files_per_s'] for r in runs]),
+                              mb_per_s=summarize([r['mb_per_s'] for r in runs]),
+                              wall_time=summarize([r['wall_time'] for r in runs]))
+                points.append(result)
+                log(f"   {scanner:<12} arquivos={point['files']:<6} tamanho={point['size'] // 1024}K "
+                    f"workers={point['workers']:<3} clientes={point['clients'] if scanner != 'local' else '-':<3} "
+                    f"{result['files_per_s']['mean']:>10.1f} arq/s {result['mb_per_s']['mean']:>8.2f} MB/s")
+    finally:
+        cache.cleanup()
+    return {'timestamp': datetime.now().isoformat(), 'server': server_url, 'axes': axes, 'full_grid': full_grid,
+            'repetitions': repetitions, 'points': points, 'curves': efficiency_curves(points, axes)}
+
+
+def parse_list(text, convert=int):
+    return [convert(v) for v in text.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default='http://localhost:5000')
+    parser.add_argument('--arquivos', default='100,1000,10000')
+    parser.add_argument('--tamanhos', default='4KB,64KB,1MB')
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--clientes', default='1,2,4,8')
+    parser.add_argument('--grade-completa', action='store_true', help='Produto cartesiano dos eixos')
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--only', choices=['local', 'distribuido'], action='append', default=None)
+    parser.add_argument('--workdir', default=None, help='Diretório dos corpora (mantido entre execuções)')
+    parser.add_argument('--output', default='escala.json')
+    args = parser.parse_args()
+
+    axes = {'files': parse_list(args.arquivos), 'size': parse_list(args.tamanhos, parse_size),
+            'workers': parse_list(args.workers), 'clients': parse_list(args.clientes)}
+    result = run_sweep(args.server, axes, args.grade_completa, args.repeticoes, args.workdir,
+                       args.only or ('local', 'distribuido'))
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    for axis in ('workers', 'clients'):
+        for scanner in ('local', 'distribuido'):
+            if f'{scanner}_saturation' in result['curves'][axis]:
+                print(f"{axis}/{scanner}: escala até {result['curves'][axis][f'{scanner}_saturation']} "
+                      f"(eficiência >= {EFFICIENCY_FLOOR:.0%})")
+    print(f"\nResultados: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga com múltiplos clientes para o servidor de assinaturas
+Simula N clientes, cada um com seu client_id e sua sessão keep-alive, e
+dispara uma mistura configurável de /health, /signatures, /scan e /update em
+malha aberta: as chegadas seguem um processo de Poisson na taxa alvo,
+independente das respostas, e a latência é medida a partir do instante
+agendado (o atraso de quem espera na fila do gerador também conta, sem
+"omissão coordenada"). Para cada taxa oferecida saem vazão, taxa de erro,
+fração de 429 e percentis de latência; o joelho de saturação é a última
+taxa atendida antes de a vazão descolar da carga ou o p99 disparar.
+
+/update grava na base: use um servidor com --db descartável quando o mix incluir update.
+
+Uso: python3 benchmarks/gerador_carga.py [--server http://localhost:5000] [--clients 500]
+     [--rates 50 100 200 400 800] [--duration 10] [--warmup 2] [--mix health=5,signatures=1,scan=94,update=0]
+     [--workers 256] [--output carga.json] [--grafico carga.png]
+"""
+
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from tabulate import tabulate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'distribuido'))
+
+from signature_store import default_database
+
+DEFAULT_MIX = 'health=5,signatures=1,scan=94,update=0'
+
+OPERATIONS = ('health', 'signatures', 'scan', 'update')
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        op, _, weight = part.partition('=')
+        op = op.strip()
+        if op not in OPERATIONS:
+            raise ValueError(f'Operação desconhecida no mix: {op}')
+        mix[op] = float(weight or 1)
+    return {op: w for op, w in mix.items() if w > 0}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+class SimulatedClient:
+    """Um endpoint: client_id próprio e uma conexão keep-alive própria"""
+
+    def __init__(self, index, timeout):
+        self.client_id = f'carga-{index:05d}'
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+class LoadGenerator:
+    def __init__(self, server_url, clients=500, mix=None, workers=256, timeout=10.0, hit_rate=0.05,
+                 preview_bytes=512, seed=42):
+        self.server_url = server_url.rstrip('/')
+        self.clients = [SimulatedClient(i, timeout) for i in range(clients)]
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.workers = workers
+        self.hit_rate = hit_rate
+        self.rng = random.Random(seed)
+        self.known_hashes = list(default_database()['malware'])
+        self.preview = ('conteudo de teste ' * (preview_bytes // 18 + 1))[:preview_bytes]
+        self.lock = threading.Lock()
+        self.sequence = 0
+
+    def next_hash(self):
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+        return hashlib.md5(f'carga-{sequence}-{time.time_ns()}'.encode('ascii')).hexdigest()
+
+    def issue(self, op, client, scheduled, records):
+        """Executa uma requisição e registra (op, agendado, início, fim, status, erro)"""
+        start = time.perf_counter()
+        status, error = None, None
+        try:
+            if op == 'health':
+                response = client.session.get(f'{self.server_url}/health', timeout=client.timeout)
+            elif op == 'signatures':
+                response = client.session.get(f'{self.server_url}/signatures',
+                                              params={'client_id': client.client_id}, timeout=client.timeout)
+            elif op == 'scan':
+                file_hash = (random.choice(self.known_hashes) if random.random() < self.hit_rate
+                             else self.next_hash())
+                response = client.session.post(f'{self.server_url}/scan', json={
+                    'hash': file_hash, 'name': f'carga/{file_hash}.bin',
+                    'client_id': client.client_id, 'content_preview': self.preview}, timeout=client.timeout)
+            else:
+                response = client.session.post(f'{self.server_url}/update', json={
+                    'hash': self.next_hash(), 'threat_name': 'Load.Test.Update'}, timeout=client.timeout)
+            response.content
+            status = response.status_code
+        except requests.RequestException as e:
+            error = type(e).__name__
+        records.append((op, scheduled, start, time.perf_counter(), status, error))
+
+    def run_step(self, rate, duration, warmup=0.0):
+        """Uma taxa oferecida: chegadas de Poisson por `warmup + duration` segundos"""
+        ops = list(self.mix)
+        weights = [self.mix[op] for op in ops]
+        records = []
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='carga')
+        futures = []
+        begin = time.perf_counter() + 0.05
+        measure_from = begin + warmup
+        end = measure_from + duration
+        scheduled = begin
+        scheduler_lag = 0.0
+        while scheduled < end:
+            now = time.perf_counter()
+            if scheduled > now:
+                time.sleep(scheduled - now)
+            else:
+                scheduler_lag = max(scheduler_lag, now - scheduled)
+            op = self.rng.choices(ops, weights)[0]
+            client = self.rng.choice(self.clients)
+            futures.append(executor.submit(self.issue, op, client, scheduled, records))
+            scheduled += self.rng.expovariate(rate)
+        wait(futures)
+        executor.shutdown()
+        measured = [r for r in records if r[1] >= measure_from]
+        summary = self.summarize(rate, duration, measured, measure_from, end)
+        summary['scheduler_lag_ms'] = scheduler_lag * 1000
+        return summary
+
+    @staticmethod
+    def summarize(rate, duration, records, window_start, window_end):
+        """Vazão conta só o que terminou dentro da janela; latência vale para todas as respostas"""
+        latencies = [end - scheduled for _, scheduled, _, end, status, _ in records if status is not None]
+        ok = sum(1 for r in records if r[4] is not None and r[4] < 400)
+        completed = sum(1 for r in records if r[4] is not None and r[4] < 400 and window_start <= r[3] <= window_end)
+        throttled = sum(1 for r in records if r[4] == 429)
+        failed = sum(1 for r in records if r[4] is None or (r[4] >= 400 and r[4] != 429))
+        total = len(records)
+        by_op = {}
+        for op in OPERATIONS:
+            op_latencies = [end - scheduled for o, scheduled, _, end, status, _ in records
+                            if o == op and status is not None]
+            if op_latencies:
+                by_op[op] = {'count': len(op_latencies), 'p50_ms': percentile(op_latencies, 0.5) * 1000,
+                             'p99_ms': percentile(op_latencies, 0.99) * 1000}
+        return {
+            'offered_rate': rate,
+            'sent_rate': total / duration,
+            'throughput': completed / duration,
+            'requests': total,
+            'ok': ok,
+            'throttled': throttled,
+            'errors': failed,
+            'error_rate': failed / total if total else 0.0,
+            'throttled_rate': throttled / total if total else 0.0,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p90_ms': percentile(latencies, 0.9) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': max(latencies) * 1000 if latencies else 0.0,
+            # Espera por uma thread livre do gerador (todas presas em requisições lentas)
+            'queue_wait_p99_ms': percentile([start - scheduled for _, scheduled, start, *_ in records], 0.99) * 1000,
+            'by_operation': by_op
+        }
+
+
+def find_knee(steps, goodput_ratio=0.95, latency_factor=5.0, max_error_rate=0.01):
+    """Última taxa atendida: vazão ≥ 95% da oferecida, erros ≤ 1% e p99 ≤ 5× o p99 da menor taxa"""
+    if not steps:
+        return None
+    baseline = max(steps[0]['p99_ms'], 1e-3)
+    knee = None
+    for step in steps:
+        if (step['throughput'] < goodput_ratio * step['offered_rate'] or step['error_rate'] > max_error_rate
+                or step['p99_ms'] > latency_factor * baseline):
+            break
+        knee = step['offered_rate']
+    return knee
+
+
+def plot(steps, knee, filename):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    offered = [s['offered_rate'] for s in steps]
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    fig.suptitle('Servidor sob carga: vazão e latência vs carga oferecida', fontsize=14, fontweight='bold')
+
+    ax1.plot(offered, offered, '--', color='gray', alpha=0.7, label='Ideal (vazão = carga)')
+    ax1.plot(offered, [s['throughput'] for s in steps], 'o-', color='#3498db', linewidth=2, label='Vazão (2xx/3xx)')
+    ax1.plot(offered, [s['throttled_rate'] * s['sent_rate'] for s in steps], 's-',
+             color='#f39c12', label='Rejeitadas (429)')
+    ax1.set_xlabel('Carga oferecida (req/s)', fontweight='bold')
+    ax1.set_ylabel('req/s', fontweight='bold')
+    ax1.set_title('Vazão', fontweight='bold')
+
+    for key, color in (('p50_ms', '#2ecc71'), ('p90_ms', '#f39c12'), ('p99_ms', '#e74c3c')):
+        ax2.plot(offered, [max(s[key], 1e-3) for s in steps], 'o-', color=color, linewidth=2, label=key[:-3])
+    ax2.set_yscale('log')
+    ax2.set_xlabel('Carga oferecida (req/s)', fontweight='bold')
+    ax2.set_ylabel('Latência (ms, log)', fontweight='bold')
+    ax2.set_title('Percentis de latência', fontweight='bold')
+
+    for ax in (ax1, ax2):
+        if knee is not None:
+            ax.axvline(knee, color='red', linestyle=':', alpha=0.7, label=f'Joelho ~{knee:g} req/s')
+        ax.grid(alpha=0.3, linestyle='--')
+        ax.legend()
+
+    plt.tight_layout()
+    plt.savefig(filename, dpi=150, bbox_inches='tight')
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=500, help='Clientes simulados (client_ids distintos)')
+    parser.add_argument('--rates', type=float, nargs='+', default=[50, 100, 200, 400, 800],
+                        help='Taxas oferecidas em req/s, uma etapa por taxa')
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos medidos por etapa')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Segundos iniciais descartados em cada etapa')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Pesos por operação (health, signatures, scan, update)')
+    parser.add_argument('--hit-rate', type=float, default=0.05, help='Fração dos /scan com hash de malware conhecido')
+    parser.add_argument('--preview-bytes', type=int, default=512, help='Tamanho do content_preview dos /scan')
+    parser.add_argument('--workers', type=int, default=256, help='Threads do gerador (requisições simultâneas)')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--stop-on-saturation', action='store_true',
+                        help='Interrompe a varredura na primeira taxa além do joelho')
+    parser.add_argument('--output', default=None, help='Arquivo JSON com as etapas')
+    parser.add_argument('--grafico', default=None, help='PNG com vazão e latência vs carga oferecida')
+    args = parser.parse_args()
+
+    generator = LoadGenerator(args.server, args.clients, parse_mix(args.mix), args.workers, args.timeout,
+                              args.hit_rate, args.preview_bytes, args.seed)
+    try:
+        requests.get(f'{generator.server_url}/health', timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        print(f"Servidor indisponível em {args.server}: {e}")
+        sys.exit(1)
+
+    print(f"{args.clients} clientes, mix {generator.mix}, {args.duration:g}s por etapa (+{args.warmup:g}s de aquecimento)\n")
+    steps = []
+    for rate in args.rates:
+        step = generator.run_step(rate, args.duration, args.warmup)
+        steps.append(step)
+        print(f"  {rate:>8g} req/s oferecidas → {step['throughput']:8.1f} req/s atendidas, "
+              f"p99 {step['p99_ms']:8.1f}ms, erros {step['error_rate'] * 100:5.1f}%, 429 {step['throttled_rate'] * 100:5.1f}%")
+        if args.stop_on_saturation and find_knee(steps) != rate:
+            break
+
+    knee = find_knee(steps)
+    print()
+    print(tabulate([[s['offered_rate'], f"{s['sent_rate']:.1f}", f"{s['throughput']:.1f}",
+                     f"{s['error_rate'] * 100:.2f}%", f"{s['throttled_rate'] * 100:.2f}%",
+                     f"{s['p50_ms']:.1f}", f"{s['p90_ms']:.1f}", f"{s['p99_ms']:.1f}", f"{s['max_ms']:.1f}",
+                     f"{s['queue_wait_p99_ms']:.1f}"] for s in steps],
+                   headers=['oferecida', 'enviada', 'vazão', 'erros', '429', 'p50 ms', 'p90 ms', 'p99 ms',
+                            'máx ms', 'espera thread p99'], tablefmt='grid'))
+    if knee is None:
+        print("\nSaturado já na menor taxa: reduza --rates")
+    else:
+        print(f"\nJoelho de saturação: ~{knee:g} req/s")
+    if any(s['scheduler_lag_ms'] > 50 for s in steps):
+        print("Aviso: o agendador do gerador atrasou chegadas em mais de 50ms; rode o gerador em outra máquina")
+    if any(s['queue_wait_p99_ms'] > 50 for s in steps):
+        print(f"Aviso: requisições esperaram por uma das {args.workers} threads do gerador (já contado na latência); "
+              f"aumente --workers para manter a malha aberta")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'server': args.server, 'clients': args.clients, 'mix': generator.mix,
+                       'duration': args.duration, 'warmup': args.warmup, 'knee': knee, 'steps': steps}, f, indent=2)
+        print(f"Resultados: {args.output}")
+    if args.grafico:
+        plot(steps, knee, args.grafico)
+        print(f"Gráfico: {args.grafico}")
+
+
+if __name__ == '__main__':
+    main()
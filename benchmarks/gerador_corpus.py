@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Gerador de corpus sintético para os benchmarks dos dois antivírus
+Cria N arquivos com tamanhos log-normais (e alguns outliers de vários GB),
+árvore de diretórios com profundidade e fan-out configuráveis, mistura de
+tipos de arquivo e infecções plantadas: malware conhecido pelo hash e padrões
+suspeitos (alguns depois do primeiro KB). Tudo sai de um RNG com semente, então
+a mesma linha de comando gera byte a byte o mesmo corpus.
+
+Saída:
+  <saida>/arquivos/           árvore a escanear
+  <saida>/manifest.json       gabarito: rótulo, ameaça, padrão, offset e MD5 de cada arquivo
+  <saida>/signatures_db.json  base do servidor com os hashes plantados (server.py --db)
+
+Uso: python3 benchmarks/gerador_corpus.py saida/ [--files 1000] [--seed 42] [--size-median 16KB]
+     [--size-sigma 1.6] [--outlier-rate 0.001] [--outlier-size 1GB:3GB] [--depth 3] [--fanout 6]
+     [--types txt=30,py=10,json=10,log=10,bin=15,png=10,pdf=15] [--infection-rate 0.02] [--pattern-rate 0.03]
+"""
+
+import sys
+import json
+import math
+import random
+import hashlib
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'distribuido'))
+
+from signature_store import default_database
+
+# Mesmo tamanho da prévia enviada em /scan: padrões depois dela só aparecem no scan completo
+PREVIEW_SIZE = 1024
+
+BLOCK_SIZE = 1024 * 1024
+
+DEFAULT_TYPES = 'txt=30,py=10,json=10,log=10,bin=15,png=10,pdf=15'
+
+# Sem parênteses nem palavras dos padrões suspeitos: arquivos limpos nunca casam por acaso
+WORDS = ('arquivo dados relatorio cliente servidor rede pacote sistema usuario senha configuracao '
+         'registro versao memoria processo tempo valor resultado lista tabela indice campo texto '
+         'documento pagina imagem modulo funcao classe objeto metodo teste entrada saida').split()
+
+MAGIC = {'png': b'\x89PNG\r\n\x1a\n', 'pdf': b'%PDF-1.7\n', 'bin': b'\x7fELF\x02\x01\x01\x00'}
+
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    """'16KB', '1.5GB' ou bytes"""
+    text = text.strip().upper()
+    for unit in ('GB', 'MB', 'KB', 'B'):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def parse_types(text):
+    mix = {}
+    for part in text.split(','):
+        ext, _, weight = part.partition('=')
+        mix[ext.strip().lstrip('.')] = float(weight or 1)
+    return mix
+
+
+def text_block(rng, ext):
+    """Bloco de 64 KB de texto no formato do tipo; os arquivos são fatias dele"""
+    lines = []
+    size = 0
+    while size < 64 * 1024:
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        if ext == 'py':
+            line = f'{rng.choice(WORDS)}_{rng.randint(0, 999)} = "{words}"'
+        elif ext == 'json':
+            line = f'{{"{rng.choice(WORDS)}": "{words}", "{rng.choice(WORDS)}": {rng.randint(0, 10 ** 6)}}},'
+        elif ext == 'log':
+            line = f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} INFO {words}'
+        else:
+            line = words.capitalize() + '.'
+        lines.append(line)
+        size += len(line) + 1
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class CorpusGenerator:
+    """Sorteia e grava o corpus; cada decisão usa o mesmo `random.Random(seed)`"""
+
+    def __init__(self, seed=42, files=1000, size_median=16 * 1024, size_sigma=1.6, max_size=64 * 1024 ** 2,
+                 outlier_rate=0.001, outlier_size=(1024 ** 3, 3 * 1024 ** 3), depth=3, fanout=6,
+                 types=None, infection_rate=0.02, pattern_rate=0.03, beyond_preview=0.3):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.files = files
+        self.size_median = size_median
+        self.size_sigma = size_sigma
+        self.max_size = max_size
+        self.outlier_rate = outlier_rate
+        self.outlier_size = outlier_size
+        self.depth = depth
+        self.fanout = fanout
+        self.types = types or parse_types(DEFAULT_TYPES)
+        self.infection_rate = infection_rate
+        self.pattern_rate = pattern_rate
+        self.beyond_preview = beyond_preview
+        self.patterns = default_database()['suspicious_patterns']
+        self.blocks = {}
+
+    def params(self):
+        return {
+            'seed': self.seed, 'files': self.files, 'size_median': self.size_median,
+            'size_sigma': self.size_sigma, 'max_size': self.max_size, 'outlier_rate': self.outlier_rate,
+            'outlier_size': list(self.outlier_size), 'depth': self.depth, 'fanout': self.fanout,
+            'types': self.types, 'infection_rate': self.infection_rate, 'pattern_rate': self.pattern_rate,
+            'beyond_preview': self.beyond_preview
+        }
+
+    def directories(self):
+        """Todos os diretórios da árvore (fanout^1 + ... + fanout^depth), como caminhos relativos"""
+        result = [Path('.')]
+        level = [Path('.')]
+        for depth in range(1, self.depth + 1):
+            level = [parent / f'dir_{depth}_{i}' for parent in level for i in range(self.fanout)]
+            result.extend(level)
+        return result
+
+    def draw_size(self):
+        if self.rng.random() < self.outlier_rate:
+            return self.rng.randint(*self.outlier_size)
+        size = int(self.rng.lognormvariate(math.log(self.size_median), self.size_sigma))
+        return max(1, min(size, self.max_size))
+
+    def block(self, ext):
+        block = self.blocks.get(ext)
+        if block is None:
+            if ext in MAGIC or ext not in ('txt', 'py', 'json', 'log'):
+                block = self.rng.randbytes(BLOCK_SIZE)
+            else:
+                block = text_block(self.rng, ext)
+            self.blocks[ext] = block
+        return block
+
+    def chunks(self, index, ext, size):
+        """Conteúdo do arquivo em pedaços: cabeçalho único + fatias do bloco do tipo"""
+        block = self.block(ext)
+        header = MAGIC.get(ext, b'') + f'# arquivo {index} semente {self.seed}\n'.encode('ascii')
+        start = self.rng.randrange(len(block))
+        remaining = size
+        piece = header[:remaining]
+        remaining -= len(piece)
+        yield piece
+        while remaining > 0:
+            piece = block[start:start + min(remaining, len(block) - start)]
+            remaining -= len(piece)
+            start = 0
+            yield piece
+
+    def write_file(self, path, chunks, pattern=None, offset=None):
+        """Grava os pedaços inserindo o padrão em `offset`; retorna o MD5 do arquivo final"""
+        md5 = hashlib.md5()
+        position = 0
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                end = position + len(chunk)
+                if pattern is not None and position <= offset < end:
+                    chunk = bytearray(chunk)
+                    head = chunk[offset - position:offset - position + len(pattern)]
+                    chunk[offset - position:offset - position + len(head)] = pattern[:len(head)]
+                    # Padrão que atravessa o fim do pedaço continua no próximo
+                    pattern, offset = pattern[len(head):] or None, end
+                    chunk = bytes(chunk)
+                md5.update(chunk)
+                f.write(chunk)
+                position = end
+        return md5.hexdigest()
+
+    def generate(self, output):
+        output = Path(output)
+        root = output / 'arquivos'
+        directories = self.directories()
+        for directory in directories:
+            (root / directory).mkdir(parents=True, exist_ok=True)
+
+        extensions = list(self.types)
+        weights = [self.types[e] for e in extensions]
+        entries = []
+        signatures = {}
+        total_bytes = 0
+        for index in range(self.files):
+            ext = self.rng.choices(extensions, weights)[0]
+            size = self.draw_size()
+            relative = self.rng.choice(directories) / f'arquivo_{index:06d}.{ext}'
+            roll = self.rng.random()
+            entry = {'path': relative.as_posix(), 'size': size, 'type': ext,
+                     'label': 'clean', 'threat': None, 'pattern': None, 'offset': None}
+            pattern = None
+            if roll < self.infection_rate:
+                # Malware "conhecido": conteúdo qualquer, cujo MD5 entra na base de assinaturas
+                entry['label'] = 'malware'
+                entry['size'] = size = max(size, 64)
+                entry['threat'] = f'Synthetic.{self.rng.choice(("Trojan", "Worm", "Ransom", "Spyware"))}.{index}'
+            elif roll < self.infection_rate + self.pattern_rate:
+                pattern = self.rng.choice(self.patterns)
+                entry['size'] = size = max(size, 128)
+                header = len(MAGIC.get(ext, b'')) + 40
+                if size > PREVIEW_SIZE + len(pattern) and self.rng.random() < self.beyond_preview:
+                    offset = self.rng.randrange(PREVIEW_SIZE, size - len(pattern))
+                else:
+                    offset = self.rng.randrange(header, min(size, PREVIEW_SIZE) - len(pattern))
+                entry.update(label='suspicious', threat='Suspicious.Pattern', pattern=pattern, offset=offset)
+                pattern = pattern.encode('utf-8')
+            entry['md5'] = self.write_file(root / relative, self.chunks(index, ext, size),
+                                           pattern, entry['offset'])
+            if entry['label'] == 'malware':
+                signatures[entry['md5']] = entry['threat']
+            total_bytes += size
+            entries.append(entry)
+
+        database = default_database()
+        database['_version'] = f'corpus-{self.seed}'
+        database['malware'].update(signatures)
+        with open(output / 'signatures_db.json', 'w') as f:
+            json.dump(database, f, indent=2)
+
+        manifest = {
+            'params': self.params(),
+            'root': 'arquivos',
+            'signatures': 'signatures_db.json',
+            'total_files': len(entries),
+            'total_bytes': total_bytes,
+            'labels': {label: sum(1 for e in entries if e['label'] == label)
+                       for label in ('clean', 'malware', 'suspicious')},
+            'files': entries
+        }
+        with open(output / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=1)
+        return manifest
+
+
+def load_manifest(path):
+    """Lê o manifest e acrescenta `root_path` (diretório escaneado, absoluto)"""
+    path = Path(path)
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    manifest['root_path'] = str((path.parent / manifest['root']).resolve())
+    return manifest
+
+
+def score(manifest, flagged):
+    """Precisão e recall de um scan contra o gabarito.
+
+    `flagged` são os caminhos marcados como ameaça (ex.: `threats_found` de
+    `scan_results`); qualquer rótulo diferente de 'clean' conta como positivo.
+    """
+    root = Path(manifest['root_path'])
+    flagged = {Path(p).resolve() for p in flagged}
+    counts = {'tp': 0, 'fp': 0, 'fn': 0, 'tn': 0}
+    recall_by_label = {}
+    for entry in manifest['files']:
+        positive = entry['label'] != 'clean'
+        detected = (root / entry['path']).resolve() in flagged
+        key = ('tp' if detected else 'fn') if positive else ('fp' if detected else 'tn')
+        counts[key] += 1
+        if positive:
+            hits, total = recall_by_label.get(entry['label'], (0, 0))
+            recall_by_label[entry['label']] = (hits + detected, total + 1)
+    precision = counts['tp'] / (counts['tp'] + counts['fp']) if counts['tp'] + counts['fp'] else 1.0
+    recall = counts['tp'] / (counts['tp'] + counts['fn']) if counts['tp'] + counts['fn'] else 1.0
+    return {
+        **counts,
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'recall_by_label': {label: hits / total for label, (hits, total) in recall_by_label.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help='Diretório de saída')
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--size-median', default='16KB', help='Mediana da distribuição log-normal')
+    parser.add_argument('--size-sigma', type=float, default=1.6, help='Desvio padrão do log do tamanho')
+    parser.add_argument('--max-size', default='64MB', help='Limite dos tamanhos log-normais (fora os outliers)')
+    parser.add_argument('--outlier-rate', type=float, default=0.001, help='Fração de arquivos gigantes (0 desativa)')
+    parser.add_argument('--outlier-size', default='1GB:3GB', help='Faixa de tamanho dos outliers, min:max')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=6)
+    parser.add_argument('--types', default=DEFAULT_TYPES, help='Pesos por extensão, ext=peso separados por vírgula')
+    parser.add_argument('--infection-rate', type=float, default=0.02, help='Fração de malware com hash conhecido')
+    parser.add_argument('--pattern-rate', type=float, default=0.03, help='Fração com padrão suspeito plantado')
+    parser.add_argument('--beyond-preview', type=float, default=0.3,
+                        help='Fração dos padrões plantados depois do primeiro KB')
+    args = parser.parse_args()
+
+    low, _, high = args.outlier_size.partition(':')
+    generator = CorpusGenerator(
+        seed=args.seed, files=args.files, size_median=parse_size(args.size_median), size_sigma=args.size_sigma,
+        max_size=parse_size(args.max_size), outlier_rate=args.outlier_rate,
+        outlier_size=(parse_size(low), parse_size(high or low)), depth=args.depth, fanout=args.fanout,
+        types=parse_types(args.types), infection_rate=args.infection_rate, pattern_rate=args.pattern_rate,
+        beyond_preview=args.beyond_preview)
+    manifest = generator.generate(args.output)
+    labels = manifest['labels']
+    print(f"{manifest['total_files']} arquivos, {manifest['total_bytes'] / 1024 / 1024:.1f} MB em {args.output}/arquivos")
+    print(f"Limpos: {labels['clean']}  malware (hash): {labels['malware']}  suspeitos (padrão): {labels['suspicious']}")
+    print(f"Gabarito: {args.output}/manifest.json   base do servidor: {args.output}/signatures_db.json")
+
+
+if __name__ == '__main__':
+    main()
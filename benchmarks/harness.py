@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Harness de benchmark em processo para os dois antivírus
+Importa `AntivirusLocal` e `AntivirusDistribuidoCliente`, roda cada um sobre o
+mesmo alvo (aquecimento + K repetições, cada repetição com uma instância nova)
+e lê as métricas direto de `scan_results`, sem subprocesso nem regex sobre a
+saída colorida. O resumo por métrica (média, desvio padrão, IC de 95% pela t
+de Student, mínimo e máximo) sai em JSON e alimenta os gráficos de comparacao.py.
+
+Com --manifest (gerado por gerador_corpus.py) cada repetição também recebe
+precisão, recall e F1 contra o gabarito.
+
+Uso: python3 benchmarks/harness.py [alvo] [--server http://localhost:5000] [--repetitions 5] [--warmup 1]
+     [--manifest corpus/manifest.json] [--concurrency 1] [--only local|distribuido] [--output resultados.json]
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import contextlib
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'distribuido'))
+sys.path.insert(0, str(ROOT / 'local'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import requests
+
+from antivirus_local import AntivirusLocal
+from client import AntivirusDistribuidoCliente
+from gerador_corpus import load_manifest, score
+
+# t de Student bicaudal 95% por graus de liberdade; acima de 30 usa a normal
+T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+        10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110,
+        18: 2.101, 19: 2.093, 20: 2.086, 25: 2.060, 30: 2.042}
+
+
+def t_critical(df):
+    if df > 30:
+        return 1.960
+    # Entre valores tabelados usa o do menor df (intervalo mais largo, conservador)
+    return T_95[max(k for k in T_95 if k <= df)]
+
+
+def summarize(values):
+    """Média, desvio padrão amostral e meia-largura do IC de 95% de uma lista de medidas"""
+    n = len(values)
+    mean = statistics.fmean(values)
+    stddev = statistics.stdev(values) if n > 1 else 0.0
+    half_width = t_critical(n - 1) * stddev / n ** 0.5 if n > 1 else 0.0
+    return {'n': n, 'mean': mean, 'stddev': stddev, 'ci95': half_width,
+            'ci95_low': mean - half_width, 'ci95_high': mean + half_width,
+            'min': min(values), 'max': max(values)}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def metrics_from_results(results):
+    """Mesmas chaves (e unidades) que comparacao.py extraía da saída de texto"""
+    total_mb = results['total_bytes_scanned'] / 1024 / 1024
+    total = results['total_files']
+    metrics = {
+        'total_files': total,
+        'clean_files': results['clean_files'],
+        'infected_files': results['infected_files'],
+        'suspicious_files': results['suspicious_files'],
+        'scan_time': results['scan_time'],
+        'scan_speed': results['scan_speed'],
+        'avg_time_per_file': results['avg_time_per_file'] * 1000,
+        'memory_used': results.get('memory_used', 0.0),
+        'total_data': total_mb,
+        'throughput': total_mb / results['scan_time'] if results['scan_time'] > 0 else 0.0,
+        'detection_rate': (results['infected_files'] + results['suspicious_files']) / total * 100 if total else 0.0,
+    }
+    if 'network_requests' in results:
+        metrics.update({
+            'network_requests': results['network_requests'],
+            'data_sent': results['network_bytes_sent'] / 1024,
+            'data_received': results['network_bytes_received'] / 1024,
+            'avg_latency': results['avg_network_latency'] * 1000,
+        })
+    # Tempo por fase em ms por arquivo (fase_hash, fase_rede...), comparável entre os dois scanners
+    for name, phase in results.get('phases', {}).items():
+        metrics[f'fase_{name}'] = phase['total_ms'] / total if total else 0.0
+    # Pico e percentis do amostrador de recursos (CPU em %, memória e E/S em MB)
+    resources = results.get('resources')
+    if resources:
+        stats = resources['stats']
+        metrics.update({
+            'rss_peak': stats['rss_mb']['peak'],
+            'cpu_mean': stats['cpu_percent']['mean'],
+            'cpu_p95': stats['cpu_percent']['p95'],
+            'cpu_peak': stats['cpu_percent']['peak'],
+            'fds_peak': stats['fds']['peak'],
+            'threads_peak': stats['threads']['peak'],
+            'io_read': resources['read_mb'],
+            'io_write': resources['write_mb'],
+        })
+    return metrics
+
+
+@contextlib.contextmanager
+def quiet():
+    """Descarta a saída por arquivo dos scanners (imprimir também custaria tempo)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def scanner_factories(server_url='http://localhost:5000', client_kwargs=None):
+    """Construtores de cada scanner; uma instância nova por repetição zera `scan_results`.
+
+    Cache de vereditos e fila offline ficam sempre desligados: uma repetição
+    não pode responder do cache nem reenviar trabalho pendente de outra.
+    """
+    kwargs = dict(client_kwargs or {}, cache_path=None, queue_path=None)
+    return {
+        'local': AntivirusLocal,
+        'distribuido': lambda: AntivirusDistribuidoCliente(server_url, **kwargs)
+    }
+
+
+def run_once(factory, target, manifest=None, samples=None):
+    with quiet():
+        scanner = factory()
+        start = time.perf_counter()
+        scanner.scan_directory(target)
+        wall_time = time.perf_counter() - start
+    metrics = metrics_from_results(scanner.scan_results)
+    if samples is not None and scanner.scan_results.get('resources'):
+        samples.append(scanner.scan_results['resources']['samples'])
+    # Inclui download de assinaturas e relatório, que scan_time não conta
+    metrics['wall_time'] = wall_time
+    # Percentis do tempo por arquivo (ms) e, no distribuído, da latência das respostas
+    for name, values in (('file', scanner.scan_times),
+                         ('latency', scanner.scan_results.get('server_response_times'))):
+        if values:
+            for p in (50, 95, 99):
+                metrics[f'{name}_p{p}'] = percentile(values, p / 100) * 1000
+    if manifest is not None:
+        quality = score(manifest, [t['file'] for t in scanner.scan_results['threats_found']])
+        metrics.update(precision=quality['precision'] * 100, recall=quality['recall'] * 100,
+                       f1=quality['f1'] * 100)
+    return metrics
+
+
+def run_benchmark(name, factory, target, repetitions=5, warmup=1, manifest=None):
+    """Aquecimento descartado + `repetitions` medidas; retorna as medidas e o resumo por métrica"""
+    for _ in range(warmup):
+        run_once(factory, target, manifest)
+    samples = []
+    runs = [run_once(factory, target, manifest, samples) for _ in range(max(1, repetitions))]
+    # Fases que só aparecem em algumas repetições (backoff, por exemplo) contam 0 nas outras
+    keys = dict.fromkeys(key for run in runs for key in run)
+    summary = {key: summarize([run.get(key, 0.0) for run in runs]) for key in keys}
+    # Séries de recursos da última repetição, para os gráficos ao longo do tempo
+    return {'name': name, 'runs': runs, 'summary': summary, 'resources': samples[-1] if samples else None}
+
+
+def throttling_warning(server_url, target):
+    """Aviso quando o limite por cliente do servidor vai frear o scan do alvo (None se não vai).
+
+    Cada repetição é um cliente novo com o burst inteiro; passando dele, o
+    distribuído fica preso em 429 + backoff e a medida deixa de ser do scan.
+    """
+    try:
+        admission = requests.get(f'{server_url}/stats', timeout=2).json().get('admission', {})
+    except (requests.RequestException, ValueError):
+        return None
+    rate, burst = admission.get('client_rate', 0), admission.get('client_burst', 0)
+    if not rate:
+        return None
+    files = 0
+    for _, _, names in os.walk(target):
+        files += len(names)
+        if files > burst:
+            return (f"Servidor limita cada cliente a {rate:g} req/s (burst {burst}) e o alvo tem mais de "
+                    f"{burst} arquivos: o distribuído será freado por 429. Inicie o servidor com --client-rate 0")
+    return None
+
+
+def run_comparison(target, server_url='http://localhost:5000', repetitions=5, warmup=1, manifest_path=None,
+                   client_kwargs=None, only=None, log=print):
+    manifest = load_manifest(manifest_path) if manifest_path else None
+    if manifest is not None and target is None:
+        target = manifest['root_path']
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'target': str(target),
+        'server': server_url,
+        'repetitions': repetitions,
+        'warmup': warmup,
+        'client_options': client_kwargs or {},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'scanners': {}
+    }
+    if not only or 'distribuido' in only:
+        warning = throttling_warning(server_url, target)
+        if warning:
+            report['warnings'] = [warning]
+            log(f"⚠ {warning}")
+    for name, factory in scanner_factories(server_url, client_kwargs).items():
+        if only and name not in only:
+            continue
+        report['scanners'][name] = run_benchmark(name, factory, target, repetitions, warmup, manifest)
+    return report
+
+
+def print_summary(report):
+    keys = ('scan_time', 'wall_time', 'scan_speed', 'avg_time_per_file', 'throughput', 'detection_rate',
+            'precision', 'recall')
+    print(f"{'scanner':<12} {'métrica':<18} {'média':>12} {'desvio':>10} {'IC 95%':>22}")
+    for name, result in report['scanners'].items():
+        for key in keys:
+            s = result['summary'].get(key)
+            if s is None:
+                continue
+            print(f"{name:<12} {key:<18} {s['mean']:>12.4f} {s['stddev']:>10.4f} "
+                  f"[{s['ci95_low']:>9.4f}, {s['ci95_high']:>9.4f}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', nargs='?', default=None,
+                        help='Diretório a escanear (padrão: test_files/, ou a árvore do --manifest)')
+    parser.add_argument('--server', default='http://localhost:5000')
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--manifest', default=None, help='Gabarito do gerador_corpus.py para precisão/recall')
+    parser.add_argument('--concurrency', type=int, default=1, help='Concorrência do cliente distribuído')
+    parser.add_argument('--only', choices=['local', 'distribuido'], action='append', default=None)
+    parser.add_argument('--output', default=None, help='Arquivo JSON de saída (padrão: imprime o JSON)')
+    args = parser.parse_args()
+
+    target = args.target or (None if args.manifest else str(ROOT / 'test_files'))
+    report = run_comparison(target, args.server, args.repetitions, args.warmup, args.manifest,
+                            {'concurrency': args.concurrency}, args.only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_summary(report)
+        print(f"\nResultados: {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
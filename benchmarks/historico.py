@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Histórico de benchmarks com detecção de regressões
+Cada relatório do harness (benchmarks/harness.py ou comparacao.py) vira uma
+linha de um arquivo JSON Lines, com a máquina, o commit e a configuração da
+execução e as medidas de todas as repetições. `comparar` aplica o teste t de
+Welch métrica a métrica contra uma execução de referência e sai com código 1
+se houver regressão significativa; `tendencias` desenha a evolução.
+
+Uso:
+  python3 benchmarks/historico.py registrar resultados.json [--rotulo v1.2]
+  python3 benchmarks/historico.py listar
+  python3 benchmarks/historico.py comparar [--base 12|v1.2] [--atual ultimo] [--limiar 5]
+  python3 benchmarks/historico.py tendencias [--metricas throughput,wall_time] [--grafico tendencias.png]
+"""
+
+import os
+import sys
+import json
+import socket
+import hashlib
+import platform
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+import psutil
+from colorama import Fore, init
+from tabulate import tabulate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import summarize, t_critical
+
+init(autoreset=True)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PATH = ROOT / 'graficos_comparativos' / 'historico.jsonl'
+
+# Sentido de melhora de cada métrica acompanhada; as demais ficam só no registro
+HIGHER_IS_BETTER = ('throughput', 'scan_speed', 'precision', 'recall', 'f1')
+LOWER_IS_BETTER = ('wall_time', 'scan_time', 'avg_time_per_file', 'file_p50', 'file_p95', 'file_p99',
+                   'latency_p50', 'latency_p95', 'latency_p99', 'avg_latency', 'memory_used',
+                   'network_requests', 'data_sent', 'rss_peak', 'cpu_p95')
+TREND_METRICS = ('throughput', 'wall_time', 'file_p99', 'memory_used')
+
+
+def machine_info():
+    """Identificação da máquina: resultados de máquinas diferentes não são comparáveis"""
+    cpu_model = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as f:
+            cpu_model = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')),
+                             cpu_model)
+    except OSError:
+        pass
+    frequency = psutil.cpu_freq()
+    return {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_model': cpu_model,
+        'cpus_logical': os.cpu_count(),
+        'cpus_physical': psutil.cpu_count(logical=False),
+        'cpu_max_mhz': frequency.max if frequency else None,
+        'memory_gb': round(psutil.virtual_memory().total / 1024 ** 3, 1),
+    }
+
+
+def git_revision():
+    """Commit atual (com '+' se a árvore tem alterações); None fora de um repositório git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+
+def config_key(record):
+    """Execuções só se comparam com a mesma carga: alvo, opções do cliente e scanners medidos"""
+    config = {'target': record['config']['target'], 'client_options': record['config']['client_options'],
+              'scanners': sorted(record['scanners'])}
+    return hashlib.md5(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class HistoryStore:
+    """Histórico append-only em JSON Lines; cada linha é uma execução completa do harness"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+
+    def load(self):
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Linha truncada por uma escrita interrompida: ignora e segue
+                    continue
+        return records
+
+    def append(self, report, label=None):
+        """Registra um relatório de harness.run_comparison; retorna o registro gravado"""
+        records = self.load()
+        record = {
+            'id': max((r['id'] for r in records), default=0) + 1,
+            'timestamp': report.get('timestamp') or datetime.now().isoformat(),
+            'label': label,
+            'commit': git_revision(),
+            'machine': machine_info(),
+            'config': {'target': report['target'], 'server': report.get('server'),
+                       'repetitions': report['repetitions'], 'warmup': report['warmup'],
+                       'client_options': report.get('client_options', {})},
+            'scanners': {name: {'runs': result['runs'], 'summary': result['summary']}
+                         for name, result in report['scanners'].items()},
+        }
+        record['config_key'] = config_key(record)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return record
+
+    def find(self, ref, records=None):
+        """Registro por id, por rótulo (o mais recente com ele) ou 'ultimo'"""
+        records = self.load() if records is None else records
+        if not records:
+            return None
+        if ref in (None, 'ultimo'):
+            return records[-1]
+        if str(ref).isdigit():
+            return next((r for r in records if r['id'] == int(ref)), None)
+        return next((r for r in reversed(records) if r.get('label') == ref), None)
+
+    def baseline_for(self, record, records=None):
+        """Execução anterior mais recente com a mesma configuração (de preferência na mesma máquina)"""
+        records = self.load() if records is None else records
+        earlier = [r for r in records if r['id'] < record['id'] and r['config_key'] == record['config_key']]
+        same_host = [r for r in earlier if r['machine']['hostname'] == record['machine']['hostname']]
+        candidates = same_host or earlier
+        return candidates[-1] if candidates else None
+
+
+def welch(a, b):
+    """Estatística t e graus de liberdade de Welch para médias com variâncias diferentes"""
+    sa, sb = summarize(a), summarize(b)
+    va, vb = sa['stddev'] ** 2 / sa['n'], sb['stddev'] ** 2 / sb['n']
+    se = (va + vb) ** 0.5
+    if se == 0:
+        return (float('inf') if sa['mean'] != sb['mean'] else 0.0), sa['n'] + sb['n'] - 2
+    df = (va + vb) ** 2 / ((va ** 2 / (sa['n'] - 1) if va else 0) + (vb ** 2 / (sb['n'] - 1) if vb else 0))
+    return (sb['mean'] - sa['mean']) / se, df
+
+
+def compare(baseline, current, threshold=0.05, metrics=None):
+    """Uma linha por scanner × métrica: médias, variação e se é regressão/melhora significativa.
+
+    Significativa = |t| de Welch acima do crítico de 95% e variação relativa de
+    pelo menos `threshold` (diferenças minúsculas com variância quase nula não
+    contam). Com uma repetição só de um dos lados não há teste: status 'sem teste'.
+    """
+    rows = []
+    tracked = metrics or HIGHER_IS_BETTER + LOWER_IS_BETTER
+    for scanner in sorted(set(baseline['scanners']) & set(current['scanners'])):
+        base_runs = baseline['scanners'][scanner]['runs']
+        curr_runs = current['scanners'][scanner]['runs']
+        for metric in tracked:
+            a = [run[metric] for run in base_runs if metric in run]
+            b = [run[metric] for run in curr_runs if metric in run]
+            if not a or not b:
+                continue
+            base_mean, curr_mean = summarize(a)['mean'], summarize(b)['mean']
+            change = (curr_mean - base_mean) / abs(base_mean) if base_mean else 0.0
+            if len(a) < 2 or len(b) < 2:
+                t, df, significant, status = None, None, False, 'sem teste'
+            else:
+                t, df = welch(a, b)
+                significant = abs(t) > t_critical(max(1, int(df))) and abs(change) >= threshold
+                worse = change < 0 if metric in HIGHER_IS_BETTER else change > 0
+                status = ('regressão' if worse else 'melhora') if significant else 'estável'
+            rows.append({'scanner': scanner, 'metric': metric, 'baseline': base_mean, 'current': curr_mean,
+                         'change': change, 't': t, 'df': df, 'significant': significant, 'status': status})
+    return rows
+
+
+def print_comparison(baseline, current, rows):
+    print(f"{Fore.CYAN}Referência #{baseline['id']} ({baseline['timestamp'][:19]}, {baseline.get('commit') or '?'}) "
+          f"→ atual #{current['id']} ({current['timestamp'][:19]}, {current.get('commit') or '?'})")
+    if baseline['machine']['hostname'] != current['machine']['hostname'] or \
+            baseline['machine']['cpu_model'] != current['machine']['cpu_model']:
+        print(f"{Fore.YELLOW}⚠ Máquinas diferentes: {baseline['machine']['hostname']} × {current['machine']['hostname']}")
+    colors = {'regressão': Fore.RED, 'melhora': Fore.GREEN}
+    table = [[r['scanner'], r['metric'], f"{r['baseline']:.4f}", f"{r['current']:.4f}", f"{r['change'] * 100:+.1f}%",
+              '-' if r['t'] is None else f"{r['t']:.2f}",
+              f"{colors.get(r['status'], '')}{r['status']}{Fore.RESET if r['status'] in colors else ''}"]
+             for r in rows]
+    print(tabulate(table, headers=['scanner', 'métrica', 'referência', 'atual', 'variação', 't', 'status'],
+                   tablefmt='grid'))
+    regressions = [r for r in rows if r['status'] == 'regressão']
+    if regressions:
+        names = ', '.join(f"{r['scanner']}/{r['metric']}" for r in regressions)
+        print(f"{Fore.RED}✗ {len(regressions)} regressão(ões) significativa(s): {names}")
+    else:
+        print(f"{Fore.GREEN}✓ Nenhuma regressão significativa")
+    return regressions
+
+
+def plot_trends(records, filename, metrics=TREND_METRICS):
+    """Média ± IC de 95% de cada métrica ao longo das execuções, uma linha por scanner"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(metrics), 1, figsize=(12, 3.2 * len(metrics)), sharex=True, squeeze=False)
+    fig.suptitle('Histórico de Benchmarks', fontsize=16, fontweight='bold')
+    labels = [f"#{r['id']}" + (f"\n{r['label']}" if r.get('label') else '') + (f"\n{r['commit']}" if r.get('commit') else '')
+              for r in records]
+    colors = {'local': '#2ecc71', 'distribuido': '#3498db'}
+    for ax, metric in zip(axes[:, 0], metrics):
+        for scanner in sorted({name for r in records for name in r['scanners']}):
+            points = [(i, r['scanners'][scanner]['summary'][metric]) for i, r in enumerate(records)
+                      if metric in r['scanners'].get(scanner, {}).get('summary', {})]
+            if not points:
+                continue
+            xs = [i for i, _ in points]
+            ax.errorbar(xs, [s['mean'] for _, s in points], yerr=[s['ci95'] for _, s in points], fmt='o-',
+                        capsize=4, linewidth=2, color=colors.get(scanner), label=scanner)
+        ax.set_ylabel(metric, fontweight='bold')
+        ax.grid(alpha=0.3, linestyle='--')
+        ax.legend(loc='best', fontsize=9)
+    axes[-1, 0].set_xticks(range(len(records)))
+    axes[-1, 0].set_xticklabels(labels, fontsize=8)
+    plt.tight_layout()
+    plt.savefig(filename, dpi=200, bbox_inches='tight')
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--historico', default=str(DEFAULT_PATH), help='Arquivo JSON Lines do histórico')
+    commands = parser.add_subparsers(dest='comando', required=True)
+
+    register = commands.add_parser('registrar', help='Acrescenta um JSON do harness ao histórico')
+    register.add_argument('resultados')
+    register.add_argument('--rotulo', default=None)
+
+    commands.add_parser('listar', help='Lista as execuções registradas')
+
+    diff = commands.add_parser('comparar', help='Testa regressões da execução atual contra uma referência')
+    diff.add_argument('--base', default=None, help='id ou rótulo (padrão: anterior com a mesma configuração)')
+    diff.add_argument('--atual', default='ultimo', help='id, rótulo ou "ultimo"')
+    diff.add_argument('--limiar', type=float, default=5.0, help='Variação mínima (%%) para contar como regressão')
+
+    trends = commands.add_parser('tendencias', help='Gráfico da evolução das métricas')
+    trends.add_argument('--metricas', default=','.join(TREND_METRICS))
+    trends.add_argument('--config', default=None, help='config_key a filtrar (padrão: a da última execução)')
+    trends.add_argument('--grafico', default=str(DEFAULT_PATH.parent / 'historico_tendencias.png'))
+    args = parser.parse_args()
+
+    store = HistoryStore(args.historico)
+    records = store.load()
+
+    if args.comando == 'registrar':
+        with open(args.resultados, 'r', encoding='utf-8') as f:
+            record = store.append(json.load(f), args.rotulo)
+        print(f"{Fore.GREEN}✓ Execução #{record['id']} registrada (configuração {record['config_key']})")
+        return
+
+    if not records:
+        print(f"{Fore.YELLOW}Histórico vazio: {store.path}")
+        sys.exit(1)
+
+    if args.comando == 'listar':
+        print(tabulate([[r['id'], r['timestamp'][:19], r.get('label') or '', r.get('commit') or '',
+                         r['machine']['hostname'], r['config_key'], r['config']['target'],
+                         r['config']['repetitions'], ', '.join(r['scanners'])] for r in records],
+                       headers=['id', 'data', 'rótulo', 'commit', 'máquina', 'config', 'alvo', 'rep.', 'scanners'],
+                       tablefmt='grid'))
+    elif args.comando == 'comparar':
+        current = store.find(args.atual, records)
+        baseline = store.find(args.base, records) if args.base else store.baseline_for(current, records)
+        if current is None or baseline is None:
+            print(f"{Fore.YELLOW}Sem execução de referência para comparar")
+            sys.exit(1)
+        if baseline['config_key'] != current['config_key']:
+            print(f"{Fore.YELLOW}⚠ Configurações diferentes ({baseline['config_key']} × {current['config_key']})")
+        regressions = print_comparison(baseline, current, compare(baseline, current, args.limiar / 100))
+        sys.exit(1 if regressions else 0)
+    else:
+        key = args.config or records[-1]['config_key']
+        selected = [r for r in records if r['config_key'] == key]
+        plot_trends(selected, args.grafico, args.metricas.split(','))
+        print(f"{Fore.GREEN}✓ {len(selected)} execuções (configuração {key}): {args.grafico}")
+
+
+if __name__ == '__main__':
+    main()
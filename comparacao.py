@@ -2,22 +2,31 @@
 """
 Análise Comparativa Completa com Gráficos - Antivírus Local vs Distribuído
 Executa testes, coleta métricas e gera visualizações comparativas
+
+Por padrão os scanners rodam no próprio processo pelo harness de
+benchmarks/harness.py (aquecimento + repetições, métricas lidas de
+`scan_results`); --subprocess volta a executar os scripts e ler a saída.
 """
 
 import subprocess
 import sys
 import re
+import json
+import argparse
 from pathlib import Path
 from colorama import Fore, init
 from tabulate import tabulate
 import matplotlib.pyplot as plt
 import matplotlib
+import matplotlib.ticker
 matplotlib.use('Agg')  # Backend sem GUI
 import numpy as np
 from datetime import datetime
 
 init(autoreset=True)
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
 class AnalisadorComparativoComGraficos:
     def __init__(self):
         self.results = {
@@ -26,6 +35,7 @@ class AnalisadorComparativoComGraficos:
         }
         self.graficos_dir = Path('graficos_comparativos')
         self.graficos_dir.mkdir(exist_ok=True)
+        self.historico = None
     
     def executar_teste_local(self):
         """Executa teste com antivírus local"""
@@ -67,7 +77,8 @@ class AnalisadorComparativoComGraficos:
         
         try:
             result = subprocess.run(
-                [sys.executable, 'distribuido/client.py', 'test_files/'],
+                # Sem cache nem fila offline: toda execução mede scans de verdade pela rede
+                [sys.executable, 'distribuido/client.py', 'test_files/', '--no-cache', '--no-offline-queue'],
                 capture_output=True, text=True, timeout=30
             )
             
@@ -81,6 +92,319 @@ class AnalisadorComparativoComGraficos:
             print(f"{Fore.RED}Erro: {e}")
             self.results['distribuido']['success'] = False
     
+    def executar_harness(self, alvo='test_files/', servidor='http://localhost:5000', repeticoes=5,
+                         aquecimento=1, manifest=None, opcoes_cliente=None):
+        """Mede os dois scanners em processo; as métricas são as médias das repetições"""
+        from harness import run_comparison, print_summary
+        import requests
+        
+        apenas = ['local', 'distribuido']
+        try:
+            requests.get(f'{servidor}/health', timeout=2)
+        except Exception:
+            print(f"{Fore.RED}✗ Servidor não está rodando!")
+            print(f"{Fore.YELLOW}Execute: python3 distribuido/server.py\n")
+            self.results['distribuido']['success'] = False
+            apenas = ['local']
+        
+        print(f"{Fore.CYAN}{'='*70}")
+        print(f"{Fore.CYAN}Executando {', '.join(apenas)}: {aquecimento} aquecimento(s) + {repeticoes} repetições")
+        print(f"{Fore.CYAN}{'='*70}\n")
+        relatorio = run_comparison(alvo, servidor, repeticoes, aquecimento, manifest, opcoes_cliente, apenas,
+                                   log=lambda aviso: print(f"{Fore.YELLOW}{aviso}\n"))
+        for tipo, resultado in relatorio['scanners'].items():
+            self.results[tipo]['metrics'] = {k: v['mean'] for k, v in resultado['summary'].items()}
+            self.results[tipo]['summary'] = resultado['summary']
+            self.results[tipo]['resources'] = resultado.get('resources')
+            self.results[tipo]['success'] = True
+        print_summary(relatorio)
+        
+        caminho = self.graficos_dir / 'benchmark.json'
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2)
+        print(f"\n{Fore.GREEN}✓ Medidas e intervalos de confiança salvos: {caminho}")
+        return relatorio
+    
+    def registrar_historico(self, relatorio, caminho, rotulo=None, limiar=0.05):
+        """Grava a execução no histórico e compara com a anterior de mesma configuração"""
+        from historico import HistoryStore, compare, print_comparison, plot_trends
+        
+        historico = HistoryStore(caminho)
+        registro = historico.append(relatorio, rotulo)
+        registros = historico.load()
+        print(f"\n{Fore.GREEN}✓ Execução #{registro['id']} registrada no histórico: {historico.path}")
+        self.historico = {'record': registro['id'], 'baseline': None, 'rows': []}
+        
+        referencia = historico.baseline_for(registro, registros)
+        if referencia is None:
+            print(f"{Fore.YELLOW}Primeira execução com esta configuração: nada para comparar ainda")
+            return
+        linhas = compare(referencia, registro, limiar)
+        print_comparison(referencia, registro, linhas)
+        self.historico.update(baseline=referencia['id'], rows=linhas)
+        
+        mesma_config = [r for r in registros if r['config_key'] == registro['config_key']]
+        grafico = self.graficos_dir / 'historico_tendencias.png'
+        plot_trends(mesma_config, grafico)
+        print(f"{Fore.GREEN}✓ Tendências: {grafico}")
+    
+    def executar_varredura_rede(self, alvo='test_files/', servidor='http://localhost:5000', perfis=None,
+                                repeticoes=3, aquecimento=1, manifest=None, opcoes_cliente=None):
+        """Mede o distribuído atrás do proxy de distribuido/netem_proxy.py em cada perfil de rede.
+        
+        O local não usa rede: é medido uma vez e vira a linha de referência.
+        """
+        from urllib.parse import urlparse
+        from harness import run_benchmark, scanner_factories
+        from gerador_corpus import load_manifest
+        sys.path.insert(0, str(Path(__file__).resolve().parent / 'distribuido'))
+        from netem_proxy import NetworkEmulatorProxy, PROFILES
+        
+        perfis = perfis or list(PROFILES)
+        dados_manifest = load_manifest(manifest) if manifest else None
+        if dados_manifest is not None and alvo is None:
+            alvo = dados_manifest['root_path']
+        destino = urlparse(servidor)
+        proxy = NetworkEmulatorProxy(destino.hostname or 'localhost', destino.port or 80).start_background()
+        
+        print(f"{Fore.CYAN}{'='*70}")
+        print(f"{Fore.CYAN}Varredura de rede: {', '.join(perfis)} ({aquecimento} aquecimento(s) + {repeticoes} repetições)")
+        print(f"{Fore.CYAN}{'='*70}\n")
+        fabricas = scanner_factories(proxy.url, opcoes_cliente)
+        local = run_benchmark('local', fabricas['local'], alvo, repeticoes, aquecimento, dados_manifest)
+        print(f"   local: {local['summary']['wall_time']['mean']:.3f}s")
+        
+        varredura = {'timestamp': datetime.now().isoformat(), 'target': str(alvo), 'server': servidor,
+                     'repetitions': repeticoes, 'local': local['summary'], 'profiles': []}
+        try:
+            for nome in perfis:
+                proxy.set_profile(nome)
+                antes = dict(proxy.stats)
+                resultado = run_benchmark(nome, fabricas['distribuido'], alvo, repeticoes, aquecimento, dados_manifest)
+                varredura['profiles'].append({
+                    'profile': PROFILES[nome].to_dict(),
+                    'summary': resultado['summary'],
+                    'proxy': {k: v - antes[k] for k, v in proxy.stats.items()}
+                })
+                print(f"   {PROFILES[nome]}: {resultado['summary']['wall_time']['mean']:.3f}s")
+        finally:
+            proxy.close()
+        
+        varredura['fit'] = self.ajuste_rtt(varredura)
+        caminho = self.graficos_dir / 'varredura_rede.json'
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(varredura, f, indent=2)
+        print(f"\n{Fore.GREEN}✓ Varredura salva: {caminho}")
+        return varredura
+    
+    @staticmethod
+    def ajuste_rtt(varredura):
+        """Reta tempo × RTT do distribuído e o RTT em que ela alcança o tempo do local.
+        
+        A inclinação (s por ms de RTT) × 1000 é o número de viagens de ida e volta
+        em série do scan. `break_even_rtt_ms` fica None quando não há cruzamento:
+        `never` = mais lento que o local mesmo sem latência, `always` = mais rápido
+        em todos os RTTs.
+        """
+        rtts = np.array([p['profile']['rtt_ms'] for p in varredura['profiles']])
+        tempos = np.array([p['summary']['wall_time']['mean'] for p in varredura['profiles']])
+        if len(set(rtts)) < 2:
+            return {'slope_s_per_ms': None, 'intercept_s': None, 'round_trips': None, 'break_even_rtt_ms': None,
+                    'pays_off': None}
+        inclinacao, intercepto = np.polyfit(rtts, tempos, 1)
+        local = varredura['local']['wall_time']['mean']
+        ajuste = {'slope_s_per_ms': float(inclinacao), 'intercept_s': float(intercepto),
+                  'round_trips': float(inclinacao * 1000), 'break_even_rtt_ms': None}
+        if intercepto >= local:
+            ajuste['pays_off'] = 'never'
+        elif inclinacao <= 0:
+            ajuste['pays_off'] = 'always'
+        else:
+            ajuste['break_even_rtt_ms'] = float((local - intercepto) / inclinacao)
+            ajuste['pays_off'] = 'below_break_even'
+        return ajuste
+    
+    def gerar_grafico_rede(self, varredura):
+        """Tempo e vazão do distribuído por perfil de rede contra a referência local"""
+        print(f"{Fore.CYAN}📊 Gerando gráfico da varredura de rede...")
+        
+        perfis = varredura['profiles']
+        rtts = [max(p['profile']['rtt_ms'], 0.1) for p in perfis]
+        rotulos = [p['profile']['name'] for p in perfis]
+        local = varredura['local']
+        
+        fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+        fig.suptitle('Distribuído sob Condições de Rede vs Local', fontsize=16, fontweight='bold')
+        
+        for ax, chave, titulo, unidade in ((axes[0], 'wall_time', 'Tempo Total do Scan', 'Tempo (s)'),
+                                           (axes[1], 'throughput', 'Taxa de Transferência', 'MB/segundo')):
+            medias = [p['summary'][chave]['mean'] for p in perfis]
+            erros = [p['summary'][chave]['ci95'] for p in perfis]
+            ax.errorbar(rtts, medias, yerr=erros, fmt='o-', color='#3498db', linewidth=2, capsize=5,
+                        label='Distribuído')
+            ax.axhline(local[chave]['mean'], color='#2ecc71', linestyle='--', linewidth=2, label='Local')
+            ax.axhspan(local[chave]['ci95_low'], local[chave]['ci95_high'], color='#2ecc71', alpha=0.15)
+            for x, y, nome in zip(rtts, medias, rotulos):
+                ax.annotate(nome, (x, y), textcoords='offset points', xytext=(0, 8), ha='center', fontsize=9)
+            ax.set_xscale('log')
+            ax.set_yscale('log')
+            ax.set_xlabel('RTT do perfil (ms, escala log)', fontweight='bold')
+            ax.set_ylabel(f'{unidade}, escala log', fontweight='bold')
+            ax.set_title(titulo, fontweight='bold')
+            ax.grid(alpha=0.3, linestyle='--')
+        
+        ajuste = varredura['fit']
+        equilibrio = ajuste['break_even_rtt_ms']
+        if equilibrio:
+            for ax in axes:
+                ax.axvline(max(equilibrio, 0.1), color='#e74c3c', linestyle=':', linewidth=2,
+                           label=f'Equilíbrio ~{equilibrio:.0f}ms')
+        for ax in axes:
+            ax.legend(loc='best')
+        
+        plt.tight_layout()
+        filename = self.graficos_dir / 'rede_comparison.png'
+        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        plt.close()
+        
+        print(f"{Fore.GREEN}✓ Salvo: {filename}")
+        if ajuste['round_trips'] is not None:
+            print(f"{Fore.WHITE}Cada ms de RTT custa {ajuste['slope_s_per_ms']:.3f}s ao scan "
+                  f"(~{ajuste['round_trips']:.0f} viagens de ida e volta em série)")
+        if ajuste['pays_off'] == 'never':
+            print(f"{Fore.YELLOW}⚠ O distribuído é mais lento que o local mesmo sem latência: "
+                  f"compensa só pela detecção, não pelo tempo")
+        elif ajuste['pays_off'] == 'always':
+            print(f"{Fore.GREEN}O distribuído é mais rápido que o local em todos os perfis medidos")
+        elif equilibrio is not None:
+            print(f"{Fore.WHITE}O distribuído deixa de compensar em tempo a partir de ~{equilibrio:.0f}ms de RTT")
+    
+    def executar_varredura_escala(self, servidor='http://localhost:5000', eixos=None, grade_completa=False,
+                                  repeticoes=1, workdir=None):
+        """Vazão dos dois scanners variando arquivos, tamanho, workers e clientes (benchmarks/escalabilidade.py)"""
+        from escalabilidade import run_sweep, sweep_points, DEFAULT_AXES
+        
+        eixos = {**DEFAULT_AXES, **(eixos or {})}
+        print(f"{Fore.CYAN}{'='*70}")
+        print(f"{Fore.CYAN}Varredura de escalabilidade: {len(sweep_points(eixos, grade_completa))} pontos "
+              f"({'grade completa' if grade_completa else 'um eixo por vez'}, {repeticoes} repetição(ões))")
+        print(f"{Fore.CYAN}{'='*70}\n")
+        escala = run_sweep(servidor, eixos, grade_completa, repeticoes, workdir)
+        
+        caminho = self.graficos_dir / 'escalabilidade.json'
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(escala, f, indent=2)
+        print(f"\n{Fore.GREEN}✓ Varredura salva: {caminho}")
+        return escala
+        
+    @staticmethod
+    def eixo_log(ax, eixo):
+        """Eixo x log; workers e clientes em base 2 com os valores por extenso"""
+        if eixo in ('workers', 'clients'):
+            ax.set_xscale('log', base=2)
+            ax.xaxis.set_major_formatter(matplotlib.ticker.ScalarFormatter())
+        else:
+            ax.set_xscale('log')
+    
+    def gerar_grafico_escala(self, escala):
+        """Curvas de vazão por eixo (log-log) e eficiência paralela de workers e clientes"""
+        from escalabilidade import EFFICIENCY_FLOOR
+        print(f"{Fore.CYAN}📊 Gerando gráfico de escalabilidade...")
+        
+        curvas = escala['curves']
+        cores = {'local': '#2ecc71', 'distribuido': '#3498db'}
+        nomes = {'local': 'Local', 'distribuido': 'Distribuído'}
+        eixos = (('files', 'Arquivos no corpus'), ('size', 'Tamanho mediano (KB)'),
+                 ('workers', 'Workers'), ('clients', 'Clientes simultâneos'))
+        
+        fig, axes = plt.subplots(2, 4, figsize=(22, 10))
+        fig.suptitle('Escalabilidade: Local vs Distribuído', fontsize=16, fontweight='bold')
+        
+        for coluna, (eixo, rotulo) in enumerate(eixos):
+            ax = axes[0][coluna]
+            for scanner in ('local', 'distribuido'):
+                serie = curvas[eixo].get(scanner)
+                if not serie:
+                    continue
+                x = [e['value'] / 1024 if eixo == 'size' else e['value'] for e in serie]
+                ax.errorbar(x, [e['files_per_s'] for e in serie], yerr=[e['ci95'] for e in serie], fmt='o-',
+                            color=cores[scanner], linewidth=2, capsize=5, label=nomes[scanner])
+                if eixo in ('workers', 'clients'):
+                    # Escala ideal: vazão do primeiro ponto multiplicada pelo fator
+                    ax.plot(x, [serie[0]['files_per_s'] * v / x[0] for v in x], ':', color=cores[scanner],
+                            alpha=0.6, label=f'{nomes[scanner]} ideal')
+            self.eixo_log(ax, eixo)
+            ax.set_yscale('log')
+            ax.set_xlabel(f'{rotulo} (escala log)', fontweight='bold')
+            ax.set_ylabel('Arquivos/segundo, escala log', fontweight='bold')
+            ax.set_title(f'Vazão × {rotulo}', fontweight='bold')
+            ax.grid(alpha=0.3, linestyle='--', which='both')
+            ax.legend(loc='best', fontsize=9)
+        
+            ax = axes[1][coluna]
+            for scanner in ('local', 'distribuido'):
+                serie = curvas[eixo].get(scanner)
+                if not serie:
+                    continue
+                x = [e['value'] / 1024 if eixo == 'size' else e['value'] for e in serie]
+                if eixo in ('workers', 'clients'):
+                    ax.plot(x, [e['efficiency'] * 100 for e in serie], 'o-', color=cores[scanner], linewidth=2,
+                            label=nomes[scanner])
+                    saturacao = curvas[eixo].get(f'{scanner}_saturation')
+                    if saturacao:
+                        ax.axvline(saturacao, color=cores[scanner], linestyle='--', alpha=0.5)
+                else:
+                    ax.plot(x, [e['mb_per_s'] for e in serie], 'o-', color=cores[scanner], linewidth=2,
+                            label=nomes[scanner])
+            self.eixo_log(ax, eixo)
+            if eixo in ('workers', 'clients'):
+                ax.axhline(EFFICIENCY_FLOOR * 100, color='#e74c3c', linestyle=':', linewidth=2,
+                           label=f'Limite {EFFICIENCY_FLOOR:.0%}')
+                ax.set_ylabel('Eficiência paralela (%)', fontweight='bold')
+                ax.set_title(f'Eficiência × {rotulo}', fontweight='bold')
+                ax.set_ylim(bottom=0)
+            else:
+                ax.set_yscale('log')
+                ax.set_ylabel('MB/segundo, escala log', fontweight='bold')
+                ax.set_title(f'Taxa de Transferência × {rotulo}', fontweight='bold')
+            ax.set_xlabel(f'{rotulo} (escala log)', fontweight='bold')
+            ax.grid(alpha=0.3, linestyle='--', which='both')
+            ax.legend(loc='best', fontsize=9)
+        
+        plt.tight_layout()
+        filename = self.graficos_dir / 'escalabilidade_comparison.png'
+        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        plt.close()
+        print(f"{Fore.GREEN}✓ Salvo: {filename}")
+        
+        linhas = []
+        for eixo, rotulo in eixos[2:]:
+            for scanner in ('local', 'distribuido'):
+                for e in curvas[eixo].get(scanner, []):
+                    linhas.append([rotulo, nomes[scanner], e['value'], f"{e['files_per_s']:.1f}",
+                                   f"{e['speedup']:.2f}x", f"{e['efficiency'] * 100:.0f}%"])
+        if linhas:
+            print(tabulate(linhas, headers=['Eixo', 'Scanner', 'n', 'Arquivos/s', 'Speedup', 'Eficiência'],
+                           tablefmt='fancy_grid'))
+        for eixo, rotulo in eixos[2:]:
+            for scanner in ('local', 'distribuido'):
+                chave = f'{scanner}_saturation'
+                if chave not in curvas[eixo]:
+                    continue
+                serie = curvas[eixo][scanner]
+                saturacao = curvas[eixo][chave]
+                if saturacao is None:
+                    print(f"{Fore.YELLOW}⚠ {nomes[scanner]} não escala em {rotulo.lower()}")
+                elif saturacao < serie[-1]['value']:
+                    print(f"{Fore.YELLOW}⚠ {nomes[scanner]} para de escalar em {rotulo.lower()} depois de "
+                          f"{saturacao} (eficiência < {EFFICIENCY_FLOOR:.0%})")
+                else:
+                    print(f"{Fore.GREEN}{nomes[scanner]} escala até {saturacao} {rotulo.lower()} medidos")
+    
+    def erro(self, tipo, chave):
+        """Meia-largura do IC de 95% da métrica (0 quando veio de uma execução só)"""
+        return self.results[tipo].get('summary', {}).get(chave, {}).get('ci95', 0.0)
+    
     def extrair_metricas(self, tipo, output):
         """Extrai métricas do output usando regex"""
         patterns = {
@@ -112,6 +436,12 @@ class AnalisadorComparativoComGraficos:
             if match:
                 metrics[key] = float(match.group(1))
         
+        # Tabela "TEMPO POR FASE": total em ms vira ms por arquivo, como no harness
+        tabela = output.split('TEMPO POR FASE:', 1)[1] if 'TEMPO POR FASE:' in output else ''
+        for nome, total_ms in re.findall(r'^\s+(\S+)\s+\d+\s+([\d.]+)\s+[\d.]+\s+[\d.]+\s+[\d.]+%$',
+                                         tabela.split('\n\n', 1)[0], re.M):
+            metrics[f'fase_{nome}'] = float(total_ms) / metrics['total_files'] if metrics.get('total_files') else 0.0
+        
         self.results[tipo]['metrics'] = metrics
     
     def gerar_grafico_performance(self):
@@ -129,7 +459,8 @@ class AnalisadorComparativoComGraficos:
         tipos = ['Local', 'Distribuído']
         tempos = [local.get('scan_time', 0), dist.get('scan_time', 0)]
         colors = ['#2ecc71', '#3498db']
-        bars1 = ax1.bar(tipos, tempos, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5)
+        bars1 = ax1.bar(tipos, tempos, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5,
+                        yerr=[self.erro('local', 'scan_time'), self.erro('distribuido', 'scan_time')], capsize=6)
         ax1.set_ylabel('Tempo (segundos)', fontweight='bold')
         ax1.set_title('Tempo Total de Scan', fontweight='bold')
         ax1.grid(axis='y', alpha=0.3, linestyle='--')
@@ -143,7 +474,8 @@ class AnalisadorComparativoComGraficos:
         # 2. Velocidade (arquivos/segundo)
         ax2 = axes[0, 1]
         velocidades = [local.get('scan_speed', 0), dist.get('scan_speed', 0)]
-        bars2 = ax2.bar(tipos, velocidades, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5)
+        bars2 = ax2.bar(tipos, velocidades, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5,
+                        yerr=[self.erro('local', 'scan_speed'), self.erro('distribuido', 'scan_speed')], capsize=6)
         ax2.set_ylabel('Arquivos/segundo', fontweight='bold')
         ax2.set_title('Velocidade de Processamento', fontweight='bold')
         ax2.grid(axis='y', alpha=0.3, linestyle='--')
@@ -156,7 +488,9 @@ class AnalisadorComparativoComGraficos:
         # 3. Tempo médio por arquivo
         ax3 = axes[1, 0]
         tempo_medio = [local.get('avg_time_per_file', 0), dist.get('avg_time_per_file', 0)]
-        bars3 = ax3.bar(tipos, tempo_medio, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5)
+        bars3 = ax3.bar(tipos, tempo_medio, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5,
+                        yerr=[self.erro('local', 'avg_time_per_file'), self.erro('distribuido', 'avg_time_per_file')],
+                        capsize=6)
         ax3.set_ylabel('Tempo (milissegundos)', fontweight='bold')
         ax3.set_title('Tempo Médio por Arquivo', fontweight='bold')
         ax3.grid(axis='y', alpha=0.3, linestyle='--')
@@ -169,7 +503,8 @@ class AnalisadorComparativoComGraficos:
         # 4. Throughput (MB/s)
         ax4 = axes[1, 1]
         throughput = [local.get('throughput', 0), dist.get('throughput', 0)]
-        bars4 = ax4.bar(tipos, throughput, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5)
+        bars4 = ax4.bar(tipos, throughput, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5,
+                        yerr=[self.erro('local', 'throughput'), self.erro('distribuido', 'throughput')], capsize=6)
         ax4.set_ylabel('MB/segundo', fontweight='bold')
         ax4.set_title('Taxa de Transferência', fontweight='bold')
         ax4.grid(axis='y', alpha=0.3, linestyle='--')
@@ -203,7 +538,7 @@ class AnalisadorComparativoComGraficos:
         bars1 = ax1.bar(['Local', 'Distribuído'], memoria, color=colors, alpha=0.8, 
                        edgecolor='black', linewidth=1.5)
         ax1.set_ylabel('Memória (MB)', fontweight='bold')
-        ax1.set_title('Uso de Memória RAM', fontweight='bold')
+        ax1.set_title('Crescimento de Memória (pico - início)', fontweight='bold')
         ax1.grid(axis='y', alpha=0.3, linestyle='--')
         
         for bar, mem in zip(bars1, memoria):
@@ -247,6 +582,54 @@ class AnalisadorComparativoComGraficos:
         
         print(f"{Fore.GREEN}✓ Salvo: {filename}")
     
+    def gerar_grafico_recursos_tempo(self):
+        """Séries do amostrador de recursos (última repetição de cada scanner) ao longo do scan"""
+        print(f"{Fore.CYAN}📊 Gerando gráfico de recursos ao longo do tempo...")
+        
+        series = {tipo: self.results[tipo].get('resources') for tipo in ('local', 'distribuido')}
+        series = {tipo: amostras for tipo, amostras in series.items() if amostras and len(amostras['t']) > 1}
+        if not series:
+            print(f"{Fore.YELLOW}⚠ Sem amostras de recursos (modo --subprocess ou amostrador desligado)")
+            return
+        
+        nomes = {'local': 'Local', 'distribuido': 'Distribuído'}
+        cores = {'local': '#2ecc71', 'distribuido': '#3498db'}
+        paineis = [('cpu_percent', 'CPU (%)', 'CPU (100% = um núcleo)'),
+                   ('rss_mb', 'RSS (MB)', 'Memória Residente'),
+                   ('read_mb', 'MB/s', 'Leitura'),
+                   ('write_mb', 'MB/s', 'Escrita'),
+                   ('fds', 'Descritores', 'Descritores Abertos'),
+                   ('threads', 'Threads', 'Threads')]
+        
+        fig, axes = plt.subplots(2, 3, figsize=(18, 9))
+        fig.suptitle('Recursos ao Longo do Scan: Local vs Distribuído', fontsize=16, fontweight='bold')
+        
+        for ax, (chave, unidade, titulo) in zip(axes.flat, paineis):
+            for tipo, amostras in series.items():
+                t = np.array(amostras['t'])
+                valores = np.array(amostras[chave], dtype=float)
+                if chave in ('read_mb', 'write_mb'):
+                    # E/S é acumulada: a taxa sai da diferença entre amostras
+                    t, valores = t[1:], np.diff(valores) / np.maximum(np.diff(t), 1e-9)
+                elif chave == 'cpu_percent':
+                    # Primeira amostra de CPU é só a referência
+                    t, valores = t[1:], valores[1:]
+                ax.step(t, valores, where='post', color=cores[tipo], linewidth=1.5, label=nomes[tipo])
+                ax.axhline(np.percentile(valores, 95), color=cores[tipo], linestyle=':', alpha=0.7,
+                           label=f'{nomes[tipo]} p95')
+            ax.set_xlabel('Tempo desde o início do scan (s)', fontweight='bold')
+            ax.set_ylabel(unidade, fontweight='bold')
+            ax.set_title(titulo, fontweight='bold')
+            ax.grid(alpha=0.3, linestyle='--')
+            ax.legend(loc='best', fontsize=8)
+        
+        plt.tight_layout()
+        filename = self.graficos_dir / 'recursos_tempo.png'
+        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        plt.close()
+        
+        print(f"{Fore.GREEN}✓ Salvo: {filename}")
+    
     def gerar_grafico_deteccao(self):
         """Gera gráfico de eficácia de detecção"""
         print(f"{Fore.CYAN}📊 Gerando gráfico de detecção...")
@@ -444,6 +827,61 @@ class AnalisadorComparativoComGraficos:
         
         print(f"{Fore.GREEN}✓ Salvo: {filename}")
     
+    def gerar_grafico_fases(self):
+        """Barras empilhadas do tempo por fase (ms por arquivo e fração do total)"""
+        print(f"{Fore.CYAN}📊 Gerando gráfico de fases...")
+        
+        local = self.results['local']['metrics']
+        dist = self.results['distribuido']['metrics']
+        
+        # Mesma ordem e cor de cada fase nas duas barras, maiores embaixo
+        fases = sorted({k for m in (local, dist) for k in m if k.startswith('fase_')},
+                       key=lambda k: local.get(k, 0) + dist.get(k, 0), reverse=True)
+        if not fases:
+            print(f"{Fore.YELLOW}⚠ Sem medição por fase (scanners rodaram com as fases desligadas)")
+            return
+        
+        fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+        fig.suptitle('Tempo por Fase: Local vs Distribuído', fontsize=16, fontweight='bold')
+        tipos = ['Local', 'Distribuído']
+        cores = plt.cm.tab20(np.linspace(0, 1, max(len(fases), 2)))
+        totais = [sum(m.get(k, 0) for k in fases) for m in (local, dist)]
+        
+        base_abs = np.zeros(2)
+        base_pct = np.zeros(2)
+        for fase, cor in zip(fases, cores):
+            valores = np.array([local.get(fase, 0), dist.get(fase, 0)])
+            pct = np.array([v / t * 100 if t else 0 for v, t in zip(valores, totais)])
+            nome = fase[len('fase_'):]
+            axes[0].bar(tipos, valores, bottom=base_abs, color=cor, edgecolor='black', linewidth=0.8, label=nome)
+            axes[1].bar(tipos, pct, bottom=base_pct, color=cor, edgecolor='black', linewidth=0.8)
+            # Rótulo só nos segmentos que cabem
+            for i in range(2):
+                if pct[i] >= 5:
+                    axes[1].text(i, base_pct[i] + pct[i] / 2, f'{nome}\n{pct[i]:.0f}%', ha='center', va='center',
+                                 fontsize=8, fontweight='bold')
+            base_abs += valores
+            base_pct += pct
+        
+        axes[0].set_ylabel('Tempo por arquivo (ms)', fontweight='bold')
+        axes[0].set_title('Tempo Absoluto por Fase', fontweight='bold')
+        axes[0].grid(axis='y', alpha=0.3, linestyle='--')
+        for i, total in enumerate(totais):
+            axes[0].text(i, total, f'{total:.3f}ms', ha='center', va='bottom', fontweight='bold')
+        axes[0].legend(loc='upper left', fontsize=9)
+        
+        axes[1].set_ylabel('Fração do tempo medido (%)', fontweight='bold')
+        axes[1].set_title('Composição do Tempo por Arquivo', fontweight='bold')
+        axes[1].set_ylim(0, 100)
+        axes[1].grid(axis='y', alpha=0.3, linestyle='--')
+        
+        plt.tight_layout()
+        filename = self.graficos_dir / 'fases_comparison.png'
+        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        plt.close()
+        
+        print(f"{Fore.GREEN}✓ Salvo: {filename}")
+    
     def gerar_tabela_comparativa(self):
         """Gera tabela textual comparativa"""
         print(f"\n{Fore.CYAN}{'='*70}")
@@ -462,6 +900,9 @@ class AnalisadorComparativoComGraficos:
             ('Velocidade', 'scan_speed', 'arq/s', lambda x: f"{x:.2f}"),
             ('Tempo/Arquivo', 'avg_time_per_file', 'ms', lambda x: f"{x:.2f}"),
             ('Memória', 'memory_used', 'MB', lambda x: f"{x:.2f}"),
+            ('Pico de RSS', 'rss_peak', 'MB', lambda x: f"{x:.1f}"),
+            ('CPU p95', 'cpu_p95', '%', lambda x: f"{x:.1f}"),
+            ('Threads (pico)', 'threads_peak', '', lambda x: f"{x:.0f}"),
             ('Throughput', 'throughput', 'MB/s', lambda x: f"{x:.2f}"),
             ('Taxa Detecção', 'detection_rate', '%', lambda x: f"{x:.1f}"),
         ]
@@ -530,6 +971,21 @@ class AnalisadorComparativoComGraficos:
             if 'avg_latency' in dist:
                 f.write(f"⚠ Latência de rede adiciona ~{dist['avg_latency']:.1f}ms por arquivo\n")
             
+            if self.historico is not None:
+                f.write("\n" + "="*70 + "\n")
+                f.write(f"HISTÓRICO (execução #{self.historico['record']}):\n")
+                f.write("="*70 + "\n\n")
+                if self.historico['baseline'] is None:
+                    f.write("  Primeira execução com esta configuração\n")
+                else:
+                    f.write(f"  Referência: execução #{self.historico['baseline']}\n")
+                    for linha in self.historico['rows']:
+                        if linha['status'] in ('regressão', 'melhora'):
+                            f.write(f"  {linha['status'].upper()}: {linha['scanner']}/{linha['metric']} "
+                                    f"{linha['baseline']:.4f} → {linha['current']:.4f} ({linha['change'] * 100:+.1f}%)\n")
+                    if not any(l['status'] == 'regressão' for l in self.historico['rows']):
+                        f.write("  Nenhuma regressão significativa\n")
+            
             f.write("\n" + "="*70 + "\n")
             f.write("GRÁFICOS GERADOS:\n")
             f.write("="*70 + "\n\n")
@@ -538,10 +994,60 @@ class AnalisadorComparativoComGraficos:
             f.write("  • deteccao_comparison.png - Eficácia de Detecção\n")
             f.write("  • radar_comparison.png - Análise Multidimensional\n")
             f.write("  • pizza_comparison.png - Proporções de Status\n")
+            f.write("  • fases_comparison.png - Tempo por Fase (stat, leitura, hash, rede...)\n")
+            f.write("  • recursos_tempo.png - CPU, Memória, E/S, Descritores e Threads ao Longo do Scan\n")
         
         print(f"{Fore.GREEN}✓ Relatório salvo: {relatorio_path}")
 
 def main():
+    parser = argparse.ArgumentParser(description='Análise comparativa: antivírus local vs distribuído')
+    parser.add_argument('alvo', nargs='?', default=None, help='Diretório a escanear (padrão: test_files/)')
+    parser.add_argument('--servidor', default='http://localhost:5000')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Repetições medidas de cada scanner')
+    parser.add_argument('--aquecimento', type=int, default=1, help='Execuções descartadas antes das medidas')
+    parser.add_argument('--manifest', default=None,
+                        help='Gabarito do benchmarks/gerador_corpus.py (acrescenta precisão/recall)')
+    parser.add_argument('--concorrencia', type=int, default=1, help='Concorrência do cliente distribuído')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='Modo antigo: executa os scripts e extrai as métricas da saída')
+    parser.add_argument('--historico', default='graficos_comparativos/historico.jsonl',
+                        help='Histórico JSON Lines onde cada execução é registrada e comparada com a anterior')
+    parser.add_argument('--sem-historico', action='store_true', help='Não registrar nem comparar com o histórico')
+    parser.add_argument('--rotulo', default=None, help='Rótulo da execução no histórico (ex.: versão)')
+    parser.add_argument('--perfis-rede', default=None, metavar='PERFIS',
+                        help='Varre perfis do distribuido/netem_proxy.py (ex.: lan,filial,wan,movel ou "todos")')
+    parser.add_argument('--varredura-escala', action='store_true',
+                        help='Curvas de escalabilidade (arquivos, tamanho, workers, clientes) em corpora gerados')
+    parser.add_argument('--escala-arquivos', default='100,1000,10000', help='Eixo de arquivos da varredura')
+    parser.add_argument('--escala-tamanhos', default='4KB,64KB,1MB', help='Eixo de tamanho mediano da varredura')
+    parser.add_argument('--escala-workers', default='1,2,4,8', help='Eixo de workers da varredura')
+    parser.add_argument('--escala-clientes', default='1,2,4,8', help='Eixo de clientes da varredura')
+    parser.add_argument('--grade-completa', action='store_true',
+                        help='Mede o produto cartesiano dos eixos em vez de um eixo por vez')
+    parser.add_argument('--escala-repeticoes', type=int, default=1, help='Repetições de cada ponto da varredura')
+    args = parser.parse_args()
+    alvo = args.alvo or (None if args.manifest else 'test_files/')
+
+    if args.varredura_escala:
+        from escalabilidade import parse_list
+        from gerador_corpus import parse_size
+        analisador = AnalisadorComparativoComGraficos()
+        eixos = {'files': parse_list(args.escala_arquivos), 'size': parse_list(args.escala_tamanhos, parse_size),
+                 'workers': parse_list(args.escala_workers), 'clients': parse_list(args.escala_clientes)}
+        escala = analisador.executar_varredura_escala(args.servidor, eixos, args.grade_completa,
+                                                      max(1, args.escala_repeticoes))
+        analisador.gerar_grafico_escala(escala)
+        return
+
+    if args.perfis_rede:
+        analisador = AnalisadorComparativoComGraficos()
+        perfis = None if args.perfis_rede == 'todos' else args.perfis_rede.split(',')
+        varredura = analisador.executar_varredura_rede(alvo, args.servidor, perfis, max(1, args.repeticoes),
+                                                       args.aquecimento, args.manifest,
+                                                       {'concurrency': args.concorrencia})
+        analisador.gerar_grafico_rede(varredura)
+        return
+    
     print(f"{Fore.CYAN}{'='*70}")
     print(f"{Fore.CYAN}ANÁLISE COMPARATIVA COM GRÁFICOS")
     print(f"{Fore.CYAN}Antivírus Local vs Distribuído")
@@ -550,8 +1056,14 @@ def main():
     analisador = AnalisadorComparativoComGraficos()
     
     # Executar testes
-    analisador.executar_teste_local()
-    analisador.executar_teste_distribuido()
+    if args.subprocess:
+        analisador.executar_teste_local()
+        analisador.executar_teste_distribuido()
+    else:
+        relatorio = analisador.executar_harness(alvo, args.servidor, max(1, args.repeticoes), args.aquecimento,
+                                                args.manifest, {'concurrency': args.concorrencia})
+        if not args.sem_historico:
+            analisador.registrar_historico(relatorio, args.historico, args.rotulo)
     
     if not analisador.results['distribuido']['success']:
         print(f"\n{Fore.RED}✗ Não foi possível completar análise distribuída")
@@ -571,6 +1083,8 @@ def main():
     analisador.gerar_grafico_deteccao()
     analisador.gerar_grafico_radar()
     analisador.gerar_grafico_pizza()
+    analisador.gerar_grafico_fases()
+    analisador.gerar_grafico_recursos_tempo()
     analisador.gerar_relatorio_final()
     
     print(f"\n{Fore.GREEN}{'='*70}")
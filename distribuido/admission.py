@@ -0,0 +1,113 @@
+# Controle de admissão do servidor/Fila de trabalho limitada e token bucket por cliente, rejeitando com 429
+
+
+import math
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Balde de fichas: `rate` fichas por segundo, acumulando no máximo `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now=None):
+        """Retorna (admitido, segundos até haver uma ficha)"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Limita o trabalho simultâneo e a taxa de cada cliente.
+
+    Até `max_concurrent` requisições executam ao mesmo tempo e até `max_queue`
+    esperam no máximo `queue_timeout` segundos por uma vaga; o resto é
+    rejeitado na hora com um Retry-After estimado pelo tempo médio de serviço.
+    """
+
+    def __init__(self, max_concurrent=32, max_queue=64, queue_timeout=2.0,
+                 client_rate=50.0, client_burst=100, max_clients=10000):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+        self.waiting = 0
+        self.running = 0
+        self.service_time = 0.005  # média móvel exponencial em segundos
+        self.stats = {'admitted': 0, 'rejected_rate': 0, 'rejected_queue': 0, 'rejected_timeout': 0}
+
+    def _bucket(self, client_id):
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self.buckets[client_id] = bucket
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_id)
+        return bucket
+
+    def _queue_delay(self):
+        backlog = self.waiting + self.running
+        return backlog * self.service_time / self.max_concurrent
+
+    def admit(self, client_id):
+        """Retorna (admitido, retry_after em segundos, motivo da rejeição)"""
+        if self.client_rate > 0:
+            with self.lock:
+                ok, wait = self._bucket(client_id).try_acquire()
+            if not ok:
+                self.stats['rejected_rate'] += 1
+                return False, wait, 'rate'
+
+        with self.lock:
+            if self.slots.acquire(blocking=False):
+                self.running += 1
+                self.stats['admitted'] += 1
+                return True, 0.0, None
+            if self.waiting >= self.max_queue:
+                self.stats['rejected_queue'] += 1
+                return False, max(self._queue_delay(), self.service_time), 'queue'
+            self.waiting += 1
+
+        acquired = self.slots.acquire(timeout=self.queue_timeout)
+        with self.lock:
+            self.waiting -= 1
+            if not acquired:
+                self.stats['rejected_timeout'] += 1
+                return False, max(self._queue_delay(), self.service_time), 'timeout'
+            self.running += 1
+            self.stats['admitted'] += 1
+        return True, 0.0, None
+
+    def release(self, elapsed):
+        with self.lock:
+            self.running -= 1
+            self.service_time = 0.9 * self.service_time + 0.1 * elapsed
+        self.slots.release()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, waiting=self.waiting, running=self.running,
+                        service_time=self.service_time, tracked_clients=len(self.buckets),
+                        client_rate=self.client_rate, client_burst=self.client_burst)
+
+
+def retry_after_header(seconds):
+    """Retry-After só aceita segundos inteiros; o valor exato vai no corpo JSON"""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,136 @@
+# Logging assíncrono do servidor/Eventos vão para um buffer circular em memória e uma thread os escreve em lote
+
+
+import sys
+import time
+import random
+import atexit
+import threading
+from collections import deque
+from colorama import Fore, Style
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+LEVEL_COLORS = {
+    'DEBUG': Fore.WHITE,
+    'INFO': Fore.GREEN,
+    'WARNING': Fore.YELLOW,
+    'ERROR': Fore.RED
+}
+
+class AsyncLogger:
+    """Logger estruturado que nunca bloqueia quem registra o evento.
+
+    O handler apenas anexa uma tupla ao buffer (deque.append é atômico no
+    CPython); formatação e escrita no stdout ficam com a thread de escrita.
+    Quando o buffer enche, os eventos mais antigos são descartados e contados.
+    """
+
+    def __init__(self, level='INFO', capacity=10000, clean_sample_rate=1.0,
+                 flush_interval=0.05, batch_size=512, stream=None, synchronous=False):
+        self.level = LEVELS.get(level.upper(), 20)
+        self.capacity = capacity
+        self.clean_sample_rate = clean_sample_rate
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.stream = stream or sys.stdout
+        self.synchronous = synchronous
+        self.buffer = deque(maxlen=capacity)
+        self.stats = {
+            'logged': 0,
+            'written': 0,
+            'dropped': 0,
+            'sampled_out': 0,
+            'filtered': 0,
+            'batches': 0
+        }
+        self._stop = threading.Event()
+        self._writer = None
+        if not synchronous:
+            self.start()
+
+    def start(self):
+        """Inicia a thread de escrita"""
+        if self._writer and self._writer.is_alive():
+            return
+        self._stop.clear()
+        self._writer = threading.Thread(target=self._run, name='async-logger', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def log(self, level, message, sampled=False, color=None, **fields):
+        """Registra um evento; `sampled=True` aplica a amostragem de eventos limpos"""
+        if LEVELS.get(level, 20) < self.level:
+            self.stats['filtered'] += 1
+            return
+        if sampled and self.clean_sample_rate < 1.0 and random.random() >= self.clean_sample_rate:
+            self.stats['sampled_out'] += 1
+            return
+
+        event = (time.time(), level, color, message, fields)
+        self.stats['logged'] += 1
+
+        if self.synchronous:
+            self._write([event])
+            return
+
+        if len(self.buffer) >= self.capacity:
+            self.stats['dropped'] += 1
+        self.buffer.append(event)
+
+    def debug(self, message, **fields):
+        self.log('DEBUG', message, **fields)
+
+    def info(self, message, **fields):
+        self.log('INFO', message, **fields)
+
+    def warning(self, message, **fields):
+        self.log('WARNING', message, **fields)
+
+    def error(self, message, **fields):
+        self.log('ERROR', message, **fields)
+
+    def format_event(self, event):
+        """Formata um evento como linha colorida com campos chave=valor"""
+        timestamp, level, color, message, fields = event
+        clock = time.strftime('%H:%M:%S', time.localtime(timestamp))
+        color = color or LEVEL_COLORS.get(level, '')
+        extras = ' '.join(f'{key}={value}' for key, value in fields.items())
+        line = f"{color}[{clock}] {level:<7} {message}"
+        if extras:
+            line += f" {Style.DIM}{extras}"
+        return line + Style.RESET_ALL
+
+    def _write(self, events):
+        try:
+            self.stream.write('\n'.join(self.format_event(e) for e in events) + '\n')
+            self.stream.flush()
+        except Exception:
+            # Falha no console nunca deve derrubar o servidor
+            pass
+        self.stats['written'] += len(events)
+        self.stats['batches'] += 1
+
+    def _drain(self):
+        """Esvazia o buffer em lotes de até `batch_size` eventos"""
+        while self.buffer:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.buffer.popleft())
+            except IndexError:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def close(self):
+        """Para a thread de escrita garantindo que o buffer seja escrito"""
+        self._stop.set()
+        if self._writer and self._writer.is_alive() and self._writer is not threading.current_thread():
+            self._writer.join(timeout=2)
+        self._drain()
@@ -0,0 +1,79 @@
+# Backpressure do cliente/Backoff com jitter para respostas 429 e concorrência adaptativa (AIMD)
+
+
+import random
+import threading
+
+
+def backoff_delay(attempt, retry_after=None, base=0.1, cap=10.0):
+    """Atraso antes da nova tentativa: full jitter exponencial, nunca abaixo do Retry-After.
+
+    O jitter espalha as novas tentativas de clientes rejeitados ao mesmo tempo,
+    evitando que todos voltem juntos e sejam rejeitados de novo.
+    """
+    ceiling = min(cap, base * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    if retry_after:
+        delay = retry_after + random.uniform(0, retry_after * 0.5)
+    return min(delay, cap)
+
+
+def parse_retry_after(response):
+    """Usa o valor exato do corpo JSON quando existe, senão o cabeçalho Retry-After"""
+    try:
+        value = response.json().get('retry_after')
+        if value is not None:
+            return float(value)
+    except Exception:
+        pass
+    try:
+        return float(response.headers.get('Retry-After', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limite de requisições em andamento ajustado por AIMD.
+
+    Cada sucesso aumenta o limite em 1/limite (≈ +1 por janela completa);
+    cada 429 ou timeout o reduz pela metade, até `min_limit`.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.stats = {'increases': 0, 'decreases': 0, 'peak_limit': float(initial)}
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def on_success(self):
+        with self.condition:
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.stats['increases'] += 1
+                self.stats['peak_limit'] = max(self.stats['peak_limit'], self.limit)
+                self.condition.notify_all()
+
+    def on_overload(self):
+        with self.condition:
+            self.limit = max(self.min_limit, self.limit / 2)
+            self.stats['decreases'] += 1
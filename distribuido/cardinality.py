@@ -0,0 +1,222 @@
+# Contagem de clientes em memória constante/HyperLogLog em janelas deslizantes e top-K de clientes mais ativos
+
+
+import math
+import time
+import hashlib
+import threading
+
+
+class HyperLogLog:
+    """Estimador de cardinalidade com 2^p registradores de 1 byte (erro ~1.04/sqrt(2^p))"""
+
+    def __init__(self, p=11):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        if self.m >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    @staticmethod
+    def _hash64(item):
+        digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def position(self, item):
+        """(registrador, posto) do item: o posto é a posição do primeiro bit 1 após o índice"""
+        h = self._hash64(item)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        return index, (64 - self.p) - rest.bit_length() + 1
+
+    def add(self, item):
+        index, rank = self.position(item)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Une outro sketch a este (máximo registrador a registrador)"""
+        registers = self.registers
+        for i, value in enumerate(other.registers):
+            if value > registers[i]:
+                registers[i] = value
+
+    def count(self):
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        if estimate <= 2.5 * self.m:
+            zeros = self.registers.count(0)
+            if zeros:
+                # Correção para cardinalidades pequenas (linear counting)
+                estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def clear(self):
+        self.registers = bytearray(self.m)
+
+
+class SlidingWindowHLL:
+    """Janela deslizante formada por `buckets` sketches que giram no tempo.
+
+    A união dos sketches da janela é mantida pronta: refeita só quando a janela
+    gira e atualizada registrador a registrador a cada `add`. A estimativa fica
+    guardada até algum registrador da união subir, então `/stats` e `/metrics`
+    não refazem 2^p registradores por bucket a cada consulta.
+    """
+
+    def __init__(self, window_seconds, buckets, p=11):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self.p = p
+        self.slots = [(None, HyperLogLog(p)) for _ in range(buckets)]
+        self.merged = None
+        self.merged_epoch = None
+        self.estimate = None
+
+    def _slot(self, epoch):
+        index = epoch % len(self.slots)
+        slot_epoch, sketch = self.slots[index]
+        if slot_epoch != epoch:
+            sketch.clear()
+            self.slots[index] = (epoch, sketch)
+        return sketch
+
+    def add(self, item, now=None):
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        sketch = self._slot(epoch)
+        index, rank = sketch.position(item)
+        if rank > sketch.registers[index]:
+            sketch.registers[index] = rank
+        if self.merged is None:
+            return
+        if epoch != self.merged_epoch:
+            # A janela girou: a união é refeita na próxima contagem
+            self.merged = None
+        elif rank > self.merged.registers[index]:
+            self.merged.registers[index] = rank
+            self.estimate = None
+
+    def count(self, now=None):
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        if self.merged is None or current != self.merged_epoch:
+            merged = HyperLogLog(self.p)
+            for epoch, sketch in self.slots:
+                if epoch is not None and 0 <= current - epoch < len(self.slots):
+                    merged.merge(sketch)
+            self.merged, self.merged_epoch, self.estimate = merged, current, None
+        if self.estimate is None:
+            self.estimate = self.merged.count()
+        return self.estimate
+
+
+class TopK:
+    """Top-K aproximado pelo algoritmo Space-Saving (no máximo `k` contadores)"""
+
+    def __init__(self, k=10):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, item):
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.k:
+            self.counts[item] = 1
+            self.errors[item] = 0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            self.errors.pop(victim)
+            self.counts[item] = floor + 1
+            self.errors[item] = floor
+
+    def items(self):
+        ranking = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)
+        return [{'client_id': item, 'requests': count, 'error': self.errors[item]}
+                for item, count in ranking]
+
+    def clear(self):
+        self.counts = {}
+        self.errors = {}
+
+
+class SlidingWindowTopK:
+    """Top-K da janela: uma tabela Space-Saving por bucket, unidas na consulta.
+
+    Um item ausente de uma tabela cheia pode ter ocorrido até o menor contador
+    dela; esse piso entra na contagem e no erro, mantendo
+    contagem - erro <= real <= contagem para a janela inteira.
+    """
+
+    def __init__(self, window_seconds, buckets, k=10):
+        self.k = k
+        self.bucket_seconds = window_seconds / buckets
+        self.slots = [(None, TopK(k)) for _ in range(buckets)]
+
+    def add(self, item, now=None):
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        index = epoch % len(self.slots)
+        slot_epoch, table = self.slots[index]
+        if slot_epoch != epoch:
+            table.clear()
+            self.slots[index] = (epoch, table)
+        table.add(item)
+
+    def items(self, now=None):
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        tables = [table for epoch, table in self.slots
+                  if epoch is not None and 0 <= current - epoch < len(self.slots) and table.counts]
+        counts, errors = {}, {}
+        for item in {item for table in tables for item in table.counts}:
+            counts[item] = errors[item] = 0
+            for table in tables:
+                floor = min(table.counts.values()) if len(table.counts) >= table.k else 0
+                counts[item] += table.counts.get(item, floor)
+                errors[item] += table.errors.get(item, floor)
+        ranking = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:self.k]
+        return [{'client_id': item, 'requests': count, 'error': errors[item]}
+                for item, count in ranking]
+
+
+# Janelas reportadas em /stats: nome -> (duração em segundos, número de buckets)
+DEFAULT_WINDOWS = {
+    '1m': (60, 6),
+    '1h': (3600, 12),
+    '24h': (86400, 24)
+}
+
+
+class ClientActivityTracker:
+    """Substitui o set de client_ids: memória e tamanho de /stats independem do número de clientes"""
+
+    def __init__(self, windows=None, top_k=10, p=11):
+        windows = windows or DEFAULT_WINDOWS
+        self.windows = {name: SlidingWindowHLL(seconds, buckets, p)
+                        for name, (seconds, buckets) in windows.items()}
+        # O ranking cobre a maior janela, a mesma de `active_clients` em /stats
+        self.top_window = max(windows, key=lambda name: windows[name][0])
+        self.top = SlidingWindowTopK(*windows[self.top_window], k=top_k) if top_k else None
+        self.lock = threading.Lock()
+
+    def record(self, client_id, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            for window in self.windows.values():
+                window.add(client_id, now)
+            if self.top is not None:
+                self.top.add(client_id, now)
+
+    def active(self, now=None):
+        """Estimativa de clientes distintos ativos em cada janela"""
+        with self.lock:
+            return {name: window.count(now) for name, window in self.windows.items()}
+
+    def top_clients(self, now=None):
+        """Clientes com mais requisições na janela `top_window`"""
+        if self.top is None:
+            return []
+        with self.lock:
+            return self.top.items(now)
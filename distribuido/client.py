@@ -2,21 +2,72 @@
 
 
 import os
+import sys
+import json
+import asyncio
 import hashlib
+import threading
 import time
-import psutil
 import requests
 import uuid
 from pathlib import Path
 from colorama import Fore, Style, init
+from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from backpressure import AdaptiveConcurrencyLimiter, backoff_delay, parse_retry_after
+from framed_protocol import FramedClient, ServerBusy, HEADER, OP_SCAN, encode_scan_request, decode_verdict
+from server_pool import ServerPool
+from sharding import HashRing
+from transport import HttpTransport, CircuitOpenError
+from stream_scan import StreamScanner, STREAM_CHUNK
+from verdict_cache import VerdictCache
+from offline_queue import OfflineQueue
+from coalescer import AdaptiveCoalescer
+from range_lookup import RangeCache
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from instrumentacao import PhaseTimer, ResourceSampler, zero_clock
 
 init(autoreset=True)
 
+# Tamanho da prévia enviada em /scan; arquivos maiores podem ir para /scan/stream
+PREVIEW_SIZE = 1024
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
 class AntivirusDistribuidoCliente:
-    def __init__(self, server_url='http://localhost:5000'):
-        self.server_url = server_url
+    def __init__(self, server_url='http://localhost:5000', max_stream_size=50 * 1024 * 1024,
+                 request_timeout=10, max_retries=5, transport='http', tcp_port=5001, concurrency=1,
+                 hybrid=False, freshness_interval=30.0, cache_path=None, queue_path=None,
+                 coalesce=False, target_p99=0.5, range_prefix=None, phases=True,
+                 resources=True):
+        # Aceita um único URL ou uma lista (primário + réplicas)
+        urls = [server_url] if isinstance(server_url, str) else list(server_url)
+        self.pool = ServerPool(urls)
+        self.server_url = self.pool.servers[0]['url']
+        # Anel de shards, descoberto no /health quando o servidor roda particionado
+        self.ring = None
+        self.transport = transport
+        self.tcp_port = tcp_port
+        self.max_stream_size = max_stream_size
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        # Arquivos em andamento ao mesmo tempo (acima de 1 usa o modo asyncio)
+        self.concurrency = max(1, concurrency)
+        self.limiter = AdaptiveConcurrencyLimiter(max_limit=max(64, self.concurrency))
+        # Sessão keep-alive compartilhada, com circuit breaker por servidor
+        self.http = HttpTransport(pool_size=max(16, self.concurrency), read_timeout=request_timeout)
+        # Contadores de rede são atualizados pelas threads do modo concorrente
+        self.stats_lock = threading.Lock()
         self.client_id = str(uuid.uuid4())[:8]
         self.signatures = {}
+        # Modo híbrido: veredito local com as assinaturas baixadas, servidor só para o que sobrar
+        self.hybrid = hybrid
+        self.freshness_interval = freshness_interval
+        self.signature_sources = {}
+        self.freshness_checked_at = 0.0
+        self.freshness_lock = threading.Lock()
         self.scan_results = {
             'total_files': 0,
             'infected_files': 0,
@@ -30,118 +81,662 @@ class AntivirusDistribuidoCliente:
             'network_requests': 0,
             'network_bytes_sent': 0,
             'network_bytes_received': 0,
+            'stream_uploads': 0,
+            'stream_bytes_sent': 0,
+            'throttled_requests': 0,
+            'backoff_time': 0,
+            'fallback_scans': 0,
+            'local_verdicts': 0,
+            'network_calls_avoided': 0,
+            'freshness_checks': 0,
+            'queued_offline': 0,
+            'late_verdicts': 0,
+            'late_hash_only': 0,
+            'late_threats': [],
+            'range_requests': 0,
             'avg_network_latency': 0,
             'detection_methods': {'hash': 0, 'pattern': 0, 'behavioral': 0, 'cloud': 0},
             'threat_severity': {'critical': 0, 'high': 0, 'medium': 0, 'low': 0},
             'file_types_scanned': {},
             'server_response_times': [],
             'largest_file': {'name': '', 'size': 0},
-            'smallest_file': {'name': '', 'size': float('inf')}
+            'smallest_file': {'name': '', 'size': float('inf')},
+            'phases': {},
+            'resources': {}
         }
         self.scan_times = []
+        # Tempo por fase de cada arquivo (stat, leitura, hash, serialização, rede, saída...)
+        self.phases = PhaseTimer(enabled=phases)
+        # Amostras de CPU, memória, E/S, descritores e threads durante o scan
+        self.resources = resources
+        
+        self.framed_clients = {}
+        
+        # Vereditos de execuções anteriores (validados contra a versão da base no /health)
+        self.cache = VerdictCache(cache_path) if cache_path else None
+        # Arquivos processados com o servidor fora do ar, reconciliados quando ele volta
+        self.offline_queue = OfflineQueue(queue_path) if queue_path else None
+        # Consultas agrupadas em lotes para /scan/batch, com janela ajustada ao p99 alvo
+        self.coalescer = AdaptiveCoalescer(self.send_scan_batch, target_p99=target_p99) if coalesce else None
+        # Consulta por prefixo do hash: faixas cacheáveis resolvidas localmente (None desativa)
+        self.range_cache = RangeCache(range_prefix) if range_prefix else None
+        self.range_checked_at = 0.0
         
         print(f"{Fore.CYAN}Cliente ID: {self.client_id}")
         self.check_server_connection()
     
+    def count(self, key, amount=1):
+        with self.stats_lock:
+            self.scan_results[key] += amount
+    
     def check_server_connection(self):
-        """Verifica conexão com o servidor"""
-        try:
-            response = requests.get(f'{self.server_url}/health', timeout=5)
-            if response.status_code == 200:
-                info = response.json()
-                print(f"{Fore.GREEN}Conectado ao servidor")
-                print(f"  Versão: {info['version']}")
-                print(f"  Assinaturas: {info['total_signatures']}")
-                print(f"  Última atualização: {info['last_update']}")
-                return True
-        except Exception as e:
-            print(f"{Fore.RED}✗ Erro ao conectar ao servidor: {e}")
+        """Verifica conexão com os servidores"""
+        connected = False
+        versions = set()
+        for url in self.pool.candidates():
+            try:
+                response = self.http.get(f'{url}/health', timeout=5)
+                if response.status_code == 200:
+                    info = response.json()
+                    versions.add((info.get('version'), info.get('last_update')))
+                    self.pool.update_health(url, info)
+                    self.pool.mark_success(url)
+                    print(f"{Fore.GREEN}Conectado ao servidor {url} ({info.get('role', 'primary')})")
+                    if not connected:
+                        print(f"  Versão: {info['version']}")
+                        print(f"  Assinaturas: {info['total_signatures']}")
+                        print(f"  Última atualização: {info['last_update']}")
+                    replication = info.get('replication') or {}
+                    if replication.get('role') == 'replica':
+                        print(f"  Atraso de replicação: {replication.get('lag_entries', 0)} alterações")
+                    shard = info.get('shard')
+                    if shard and self.ring is None:
+                        self.ring = HashRing(shard['nodes'], shard['vnodes'])
+                        for node in self.ring.nodes:
+                            self.pool.add(node)
+                        print(f"  Base particionada em {len(self.ring.nodes)} shards")
+                    connected = True
+            except Exception as e:
+                self.pool.mark_failure(url)
+                print(f"{Fore.RED}✗ Erro ao conectar ao servidor {url}: {e}")
+        if not connected:
             print(f"{Fore.YELLOW}⚠ Certifique-se de que o servidor está rodando!")
-            return False
+        if self.cache is not None:
+            self.cache.validate(sorted([list(v) for v in versions]) if connected else None)
+            if self.cache.stats['invalidated']:
+                print(f"{Fore.YELLOW}Base do servidor mudou: {self.cache.stats['invalidated']} vereditos em cache descartados")
+        return connected
+    
+    def candidates_for(self, file_hash=None):
+        """Servidores na ordem de tentativa; com shards, o dono do hash vem primeiro"""
+        urls = self.pool.candidates()
+        if self.ring is None or not file_hash:
+            return urls
+        owner = self.ring.owner(file_hash)
+        if not self.pool.available(owner):
+            # Dono fora do ar: qualquer outro nó repassa a consulta
+            return [u for u in urls if u != owner] + [owner]
+        return [owner] + [u for u in urls if u != owner]
     
     def download_signatures(self):
         """Baixa assinaturas do servidor"""
-        try:
-            response = requests.get(
-                f'{self.server_url}/signatures',
-                params={'client_id': self.client_id},
-                timeout=5
-            )
-            if response.status_code == 200:
-                self.signatures = response.json()
-                print(f"{Fore.GREEN}Assinaturas atualizadas: {len(self.signatures.get('malware', {}))} assinaturas")
-                return True
-        except Exception as e:
-            print(f"{Fore.RED} Erro ao baixar assinaturas: {e}")
+        if self.ring is not None:
+            return self.download_sharded_signatures()
+        for url in self.pool.candidates():
+            try:
+                response = self.http.get(
+                    f'{url}/signatures',
+                    params={'client_id': self.client_id},
+                    timeout=5
+                )
+                if response.status_code == 200:
+                    self.pool.mark_success(url)
+                    self.signatures = response.json()
+                    self.signature_sources = {url: self.signatures.get('_last_update')}
+                    self.freshness_checked_at = time.monotonic()
+                    print(f"{Fore.GREEN}Assinaturas atualizadas: {len(self.signatures.get('malware', {}))} assinaturas")
+                    return True
+            except Exception as e:
+                self.pool.mark_failure(url)
+                print(f"{Fore.RED} Erro ao baixar assinaturas de {url}: {e}")
+        return False
+    
+    def download_sharded_signatures(self):
+        """Cada shard exporta só as suas faixas; a base local é a união de todos"""
+        merged = None
+        sources = {}
+        for node in self.ring.nodes:
+            try:
+                response = self.http.get(f'{node}/signatures', params={'client_id': self.client_id}, timeout=5)
+                response.raise_for_status()
+            except Exception as e:
+                self.pool.mark_failure(node)
+                print(f"{Fore.RED} Erro ao baixar assinaturas do shard {node}: {e}")
+                return False
+            self.pool.mark_success(node)
+            part = response.json()
+            sources[node] = part.get('_last_update')
+            if merged is None:
+                merged = part
+            else:
+                merged.setdefault('malware', {}).update(part.get('malware', {}))
+        self.signatures = merged
+        self.signature_sources = sources
+        self.freshness_checked_at = time.monotonic()
+        print(f"{Fore.GREEN}Assinaturas atualizadas: {len(merged.get('malware', {}))} assinaturas "
+              f"de {len(self.ring.nodes)} shards")
+        return True
+    
+    def refresh_range_info(self):
+        """Versão da base e padrões suspeitos para o modo por prefixo (GET /range)"""
+        for url in self.pool.candidates():
+            try:
+                response = self.http.get(f'{url}/range', timeout=5)
+                response.raise_for_status()
+            except Exception as e:
+                self.pool.mark_failure(url)
+                print(f"{Fore.RED} Erro ao consultar {url}/range: {e}")
+                continue
+            self.pool.mark_success(url)
+            info = response.json()
+            self.range_cache.prefix_length = min(info['prefix_max'], max(info['prefix_min'],
+                                                                         self.range_cache.prefix_length))
+            self.range_cache.set_version(info['version'], info['suspicious_patterns'])
+            self.range_checked_at = time.monotonic()
+            return True
         return False
     
-    def calculate_hash(self, filepath):
-        """Calcula o hash MD5 de um arquivo"""
+    def post_with_backpressure(self, path, data_factory=None, route_key=None, **kwargs):
+        """POST que respeita 429/Retry-After com backoff, ajusta a concorrência e faz failover"""
+        kwargs.setdefault('timeout', self.request_timeout)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            url = self.reachable(self.candidates_for(route_key))
+            if data_factory:
+                kwargs['data'] = data_factory()
+            self.count('network_requests')
+            try:
+                with self.phases.phase('rede'), self.limiter:
+                    response = self.http.post(f'{url}{path}', **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Servidor fora do ar ou travado: quarentena e próxima tentativa em outro servidor
+                if isinstance(e, requests.Timeout):
+                    self.limiter.on_overload()
+                self.pool.mark_failure(url)
+                last_error = e
+                continue
+            
+            if response.status_code != 429:
+                self.limiter.on_success()
+                self.pool.mark_success(url)
+                return response
+            
+            self.limiter.on_overload()
+            self.count('throttled_requests')
+            if attempt == self.max_retries:
+                return response
+            delay = backoff_delay(attempt, parse_retry_after(response))
+            self.count('backoff_time', delay)
+            with self.phases.phase('backoff'):
+                time.sleep(delay)
+        raise last_error or requests.ConnectionError('Nenhum servidor disponível')
+    
+    def reachable(self, urls):
+        """Primeiro servidor com circuito fechado; sem nenhum, falha sem tocar na rede"""
+        for url in urls:
+            if self.http.allows(url):
+                return url
+        raise CircuitOpenError('Circuito aberto para todos os servidores')
+    
+    def framed_client(self, url):
+        """Conexão TCP persistente com o servidor (uma por URL)"""
+        client = self.framed_clients.get(url)
+        if client is None:
+            host = urlparse(url).hostname or 'localhost'
+            client = FramedClient(host, self.tcp_port, self.client_id, timeout=self.request_timeout)
+            self.framed_clients[url] = client
+        return client
+    
+    @staticmethod
+    def hash_and_preview(filepath, max_size=PREVIEW_SIZE, phases=None):
+        """MD5 e prévia com uma única abertura e leitura do arquivo (leitura e hash somados em `phases`)"""
         md5 = hashlib.md5()
+        clock = phases.clock if phases is not None else zero_clock
+        read_ns = hash_ns = 0
+        t0 = clock()
         try:
             with open(filepath, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
+                chunk = f.read(STREAM_CHUNK)
+                preview = chunk[:max_size]
+                while chunk:
+                    t1 = clock()
+                    read_ns += t1 - t0
                     md5.update(chunk)
-            return md5.hexdigest()
-        except Exception as e:
-            return None
-    
-    def get_content_preview(self, filepath, max_size=1024):
-        """Obtém uma prévia do conteúdo do arquivo"""
-        try:
-            with open(filepath, 'rb') as f:
-                return f.read(max_size).decode('utf-8', errors='ignore')
-        except:
-            return ''
+                    t0 = clock()
+                    hash_ns += t0 - t1
+                    chunk = f.read(STREAM_CHUNK)
+                read_ns += clock() - t0
+        except OSError:
+            return None, ''
+        finally:
+            if phases is not None:
+                phases.add('leitura', read_ns)
+                phases.add('hash', hash_ns)
+        return md5.hexdigest(), preview.decode('utf-8', errors='ignore')
     
     def scan_file_remote(self, filepath):
         """Envia arquivo para análise no servidor com métricas detalhadas"""
         request_start = time.time()
         
-        file_hash = self.calculate_hash(filepath)
+        file_hash, content_preview = self.hash_and_preview(filepath, phases=self.phases)
         if not file_hash:
             return None
         
-        content_preview = self.get_content_preview(filepath)
+        with self.phases.phase('cache'):
+            cached = self.cache.get_by_hash(file_hash) if self.cache else None
+        if cached is not None:
+            # Conteúdo já analisado com a mesma base (arquivo renomeado ou tocado)
+            cached.update(hash=file_hash, cached=True)
+            return cached
         
-        # Calcular tamanho da requisição
-        request_data = {
-            'hash': file_hash,
-            'name': str(filepath),
-            'client_id': self.client_id,
-            'content_preview': content_preview
-        }
-        import json
-        request_size = len(json.dumps(request_data).encode('utf-8'))
-        self.scan_results['network_bytes_sent'] += request_size
+        if self.range_cache is not None:
+            result = self.scan_file_range(file_hash, content_preview, request_start)
+            return result or self.scan_file_fallback(filepath, file_hash, content_preview)
+        
+        if self.transport == 'tcp':
+            result = self.scan_file_framed(filepath, file_hash, content_preview, request_start)
+            if result:
+                result['hash'] = file_hash
+            return result or self.scan_file_fallback(filepath, file_hash, content_preview)
+        
+        if self.coalescer is not None and not self.coalescer.closed:
+            return self.scan_file_coalesced(filepath, file_hash, content_preview, request_start)
+        
+        # Corpo serializado uma vez: o mesmo bytes é enviado e contabilizado
+        with self.phases.phase('serialização'):
+            body = json.dumps({
+                'hash': file_hash,
+                'name': str(filepath),
+                'client_id': self.client_id,
+                'content_preview': content_preview
+            }, separators=(',', ':')).encode('utf-8')
+        self.count('network_bytes_sent', len(body))
         
         try:
-            self.scan_results['network_requests'] += 1
-            response = requests.post(
-                f'{self.server_url}/scan',
-                json=request_data,
-                timeout=10
-            )
+            response = self.post_with_backpressure('/scan', data=body, headers=JSON_HEADERS, route_key=file_hash)
             
             request_time = time.time() - request_start
             self.scan_results['server_response_times'].append(request_time)
             
             if response.status_code == 200:
                 response_size = len(response.content)
-                self.scan_results['network_bytes_received'] += response_size
-                return response.json()
+                self.count('network_bytes_received', response_size)
+                with self.phases.phase('serialização'):
+                    result = response.json()
+                result['hash'] = file_hash
+                return result
+        except CircuitOpenError:
+            pass
         except Exception as e:
             print(f"{Fore.RED}✗ Erro ao escanear {filepath}: {e}")
         
+        return self.scan_file_fallback(filepath, file_hash, content_preview)
+    
+    def send_scan_batch(self, items):
+        """Envia um lote montado pelo coalescer; retorna os vereditos na mesma ordem"""
+        body = json.dumps({'client_id': self.client_id, 'items': items}, separators=(',', ':')).encode('utf-8')
+        self.count('network_bytes_sent', len(body))
+        response = self.post_with_backpressure('/scan/batch', data=body, headers=JSON_HEADERS)
+        if response.status_code != 200:
+            raise requests.HTTPError(f'/scan/batch respondeu {response.status_code}', response=response)
+        self.count('network_bytes_received', len(response.content))
+        return response.json()['results']
+    
+    def scan_file_coalesced(self, filepath, file_hash, content_preview, request_start):
+        """Consulta entregue ao coalescer; espera o veredito do lote em que ela for enviada"""
+        item = {'hash': file_hash, 'name': str(filepath), 'content_preview': content_preview}
+        size = len(file_hash) + len(item['name']) + len(content_preview.encode('utf-8')) + 48
+        try:
+            # A espera inclui o lote encher e o envio (feito por outra thread): conta como rede
+            with self.phases.phase('rede'):
+                result = self.coalescer.submit(item, size).result(self.request_timeout * (self.max_retries + 2))
+            self.scan_results['server_response_times'].append(time.time() - request_start)
+            result['hash'] = file_hash
+            return result
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            print(f"{Fore.RED}✗ Erro ao escanear {filepath}: {e}")
+        return self.scan_file_fallback(filepath, file_hash, content_preview)
+    
+    def local_verdict(self, file_hashes, found, malware=None):
+        """Mesmo formato de /scan, a partir das assinaturas baixadas (ou de uma faixa de /range)"""
+        if malware is None:
+            malware = self.signatures.get('malware', {})
+        for file_hash in file_hashes:
+            threat = malware.get(file_hash)
+            if threat:
+                return {'clean': False, 'threat': threat, 'severity': 'critical', 'method': 'hash_signature',
+                        'recommendations': ['Deletar arquivo imediatamente']}
+        if found:
+            return {'clean': False, 'threat': 'Suspicious.Pattern', 'severity': 'medium',
+                    'method': 'pattern_matching',
+                    'recommendations': [f'Padrão suspeito encontrado: {p}' for p in found]}
+        return {'clean': True, 'threat': None, 'severity': 'none', 'method': None, 'recommendations': []}
+    
+    def scan_file_range(self, file_hash, content_preview, request_start):
+        """Veredito pelo prefixo do hash: a faixa inteira vem do servidor (ou do cache) e é resolvida aqui"""
+        if time.monotonic() - self.range_checked_at >= self.freshness_interval:
+            # Base atualizada no servidor descarta as faixas em cache
+            self.range_checked_at = time.monotonic()
+            self.refresh_range_info()
+        prefix, suffix = self.range_cache.split(file_hash)
+        matches = self.range_cache.get(prefix)
+        if matches is None:
+            matches = self.fetch_range(prefix, file_hash)
+            if matches is None:
+                return None
+            self.scan_results['server_response_times'].append(time.time() - request_start)
+        threat = matches.get(suffix)
+        with self.phases.phase('padrões'):
+            found = [p for p in self.range_cache.patterns if p in content_preview]
+        result = self.local_verdict([file_hash], found, {file_hash: threat} if threat else {})
+        result['hash'] = file_hash
+        return result
+    
+    def fetch_range(self, prefix, file_hash):
+        """GET /range/<prefixo>?v=<versão>: URL igual para todos os clientes, servível por caches HTTP"""
+        path = f'/range/{prefix}'
+        for url in self.candidates_for(file_hash):
+            if not self.http.allows(url):
+                continue
+            self.count('network_requests')
+            self.count('range_requests')
+            # Sem corpo: o que sai do cliente é só o prefixo e a versão na URL
+            self.count('network_bytes_sent', len(path) + len(self.range_cache.version or '') + 3)
+            try:
+                with self.phases.phase('rede'):
+                    response = self.http.get(f'{url}{path}', params={'v': self.range_cache.version},
+                                             timeout=self.request_timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.pool.mark_failure(url)
+                continue
+            if response.status_code != 200:
+                self.pool.mark_failure(url)
+                continue
+            self.pool.mark_success(url)
+            self.count('network_bytes_received', len(response.content))
+            with self.phases.phase('serialização'):
+                data = response.json()
+            self.range_cache.put(prefix, data['version'], data['matches'])
+            return data['matches']
         return None
     
-    def scan_file(self, filepath):
-        """Escaneia um arquivo individual com métricas detalhadas"""
-        file_start_time = time.time()
+    def scan_file_fallback(self, filepath, file_hash, content_preview):
+        """Servidor indisponível: entra na fila offline e recebe veredito provisório das assinaturas baixadas"""
+        queued = self.enqueue_offline(filepath, file_hash, content_preview)
+        if not self.signatures:
+            return {'queued': True} if queued else None
+        self.count('fallback_scans')
+        with self.phases.phase('padrões'):
+            found = [p for p in self.signatures.get('suspicious_patterns', []) if p in content_preview]
+        result = self.local_verdict([file_hash], found)
+        # Veredito provisório: não vai para o cache
+        result.update(hash=file_hash, fallback=True)
+        return result
+    
+    def enqueue_offline(self, filepath, file_hash, content_preview):
+        if self.offline_queue is None:
+            return False
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return False
+        self.offline_queue.append(filepath, file_hash, st.st_size, st.st_mtime_ns, content_preview)
+        self.count('queued_offline')
+        return True
+    
+    def reconcile_offline_queue(self, batch_size=200):
+        """Envia a fila offline em lotes para /scan/batch e registra os vereditos atrasados.
+        
+        Arquivos inalterados (tamanho, mtime e hash relido) vão só com hash e
+        prévia; arquivos alterados depois de entrar na fila são analisados de novo;
+        arquivos apagados vão com o hash e a prévia guardados na fila. Entradas
+        gravadas sem prévia (versões antigas da fila) só têm o hash: o veredito
+        delas é marcado `hash_only` e contado à parte.
+        """
+        if self.offline_queue is None or not self.offline_queue.has_pending():
+            return
+        print(f"\n{Fore.CYAN}Reconciliando fila offline com o servidor...")
+        for entries, offset in self.offline_queue.batches(batch_size):
+            items, rescan = [], []
+            for entry in entries:
+                try:
+                    st = os.stat(entry['p'])
+                except OSError:
+                    items.append((entry, entry.get('v')))
+                    continue
+                file_hash, preview = self.hash_and_preview(entry['p']) if st.st_size == entry['s'] else (None, '')
+                if st.st_mtime_ns == entry['m'] and file_hash == entry['h']:
+                    items.append((entry, preview))
+                else:
+                    rescan.append((entry['p'], st.st_size))
+            
+            if items:
+                payload = {'client_id': self.client_id, 'items': [
+                    {'hash': e['h'], 'name': e['p'], 'content_preview': preview or ''} for e, preview in items]}
+                try:
+                    response = self.post_with_backpressure('/scan/batch', json=payload)
+                except (requests.ConnectionError, requests.Timeout):
+                    print(f"{Fore.YELLOW}⚠ Servidor ainda indisponível; fila offline mantida")
+                    return
+                if response.status_code != 200:
+                    print(f"{Fore.YELLOW}⚠ Reconciliação recusada ({response.status_code}); fila offline mantida")
+                    return
+                for (entry, preview), verdict in zip(items, response.json()['results']):
+                    if preview is None:
+                        # Sem prévia os padrões não foram aplicados: limpo aqui quer dizer só "hash desconhecido"
+                        verdict['hash_only'] = True
+                        self.scan_results['late_hash_only'] += 1
+                        self.record_late_verdict(entry['p'], verdict)
+                        continue
+                    if self.cache is not None:
+                        self.cache.put(self.cache.identity(entry['p']), entry['h'], verdict)
+                    self.record_late_verdict(entry['p'], verdict)
+            
+            for filepath, file_size in rescan:
+                result = self.analyze_file(filepath, file_size)
+                if result and not result.get('fallback') and not result.get('queued'):
+                    self.record_late_verdict(filepath, result)
+            
+            self.offline_queue.commit(offset)
+        print(f"{Fore.GREEN}Fila offline reconciliada: {self.scan_results['late_verdicts']} vereditos atrasados")
+    
+    def record_late_verdict(self, filepath, verdict):
+        self.scan_results['late_verdicts'] += 1
+        if not verdict.get('clean'):
+            print(f"{Fore.RED}AMEAÇA DETECTADA (veredito atrasado): {filepath}")
+            print(f"  Tipo: {verdict['threat']}")
+            self.scan_results['late_threats'].append({'file': str(filepath), 'threat': verdict['threat'],
+                                                      'severity': verdict.get('severity', 'medium')})
+    
+    def signatures_fresh(self):
+        """A cópia local ainda é a base atual do(s) servidor(es)? Confere no /health a cada `freshness_interval`"""
+        if not self.signatures or not self.signature_sources:
+            return False
+        with self.freshness_lock:
+            if time.monotonic() - self.freshness_checked_at < self.freshness_interval:
+                return True
+            self.freshness_checked_at = time.monotonic()
+            for url, last_update in self.signature_sources.items():
+                self.count('freshness_checks')
+                try:
+                    info = self.http.get(f'{url}/health', timeout=5).json()
+                except Exception:
+                    return False
+                if info.get('last_update') != last_update:
+                    # Base mudou no servidor: baixar de novo antes de decidir localmente
+                    return self.download_signatures()
+            return True
+    
+    def scan_file_local(self, filepath, file_size):
+        """Veredito local do modo híbrido; None quando só o servidor pode decidir.
+        
+        Ameaças encontradas localmente são definitivas. Um arquivo limpo só é
+        decidido aqui se a cópia das assinaturas está em dia e o conteúdo
+        inteiro foi lido (até `max_stream_size`, o mesmo limite do streaming);
+        o resto segue para o servidor.
+        """
+        if not self.signatures:
+            return None
+        patterns = self.signatures.get('suspicious_patterns', [])
+        whole = file_size is not None and file_size <= max(self.max_stream_size, PREVIEW_SIZE)
+        scanner = StreamScanner(patterns)
+        clock = self.phases.clock
+        read_ns = scan_ns = 0
+        t0 = clock()
+        try:
+            with open(filepath, 'rb') as f:
+                # Cada update do StreamScanner calcula os hashes e procura os padrões de uma vez
+                update = scanner.update if whole else scanner.md5.update
+                chunk = f.read(STREAM_CHUNK if whole else PREVIEW_SIZE)
+                if not whole:
+                    t1 = clock()
+                    read_ns += t1 - t0
+                    scanner.update(chunk)
+                    t0 = clock()
+                    scan_ns += t0 - t1
+                    chunk = f.read(STREAM_CHUNK)
+                while chunk:
+                    t1 = clock()
+                    read_ns += t1 - t0
+                    update(chunk)
+                    t0 = clock()
+                    scan_ns += t0 - t1
+                    chunk = f.read(STREAM_CHUNK)
+                read_ns += clock() - t0
+                hashes = scanner.digests() if whole else [scanner.md5.hexdigest()]
+        except OSError:
+            return None
+        finally:
+            self.phases.add('leitura', read_ns)
+            self.phases.add('hash+padrões', scan_ns)
+        
+        # Conferir a versão antes do veredito: uma base nova baixada agora já vale para este arquivo
+        with self.phases.phase('rede'):
+            fresh = whole and self.signatures_fresh()
+        result = self.local_verdict(hashes, scanner.matches)
+        if result['clean'] and not fresh:
+            return None
+        result['hash'] = hashes[0]
+        self.count('local_verdicts')
+        # Evitou o /scan e, para arquivos grandes, também o upload em streaming
+        avoided = 2 if whole and self.needs_full_scan(result, file_size) else 1
+        self.count('network_calls_avoided', avoided)
+        return result
+    
+    def scan_file_framed(self, filepath, file_hash, content_preview, request_start):
+        """Consulta pelo protocolo TCP binário (conexão persistente, sem HTTP/JSON)"""
+        if not file_hash:
+            # Arquivo ilegível: não há o que consultar
+            return None
+        with self.phases.phase('serialização'):
+            payload = encode_scan_request(file_hash, str(filepath), content_preview.encode('utf-8'))
+        for attempt in range(self.max_retries + 1):
+            try:
+                url = self.reachable(self.candidates_for(file_hash))
+            except CircuitOpenError:
+                return None
+            breaker = self.http.breaker(url)
+            if not breaker.allow():
+                continue
+            self.count('network_requests')
+            self.count('network_bytes_sent', HEADER.size + len(payload))
+            try:
+                with self.phases.phase('rede'), self.limiter:
+                    _, reply = self.framed_client(url).call(OP_SCAN, payload, timeout=self.request_timeout)
+            except (ConnectionError, OSError, TimeoutError):
+                breaker.record_failure()
+                self.pool.mark_failure(url)
+                continue
+            except ServerBusy as busy:
+                self.limiter.on_overload()
+                self.count('throttled_requests')
+                if attempt == self.max_retries:
+                    break
+                delay = backoff_delay(attempt, busy.retry_after)
+                self.count('backoff_time', delay)
+                with self.phases.phase('backoff'):
+                    time.sleep(delay)
+                continue
+            except Exception as e:
+                print(f"{Fore.RED}✗ Erro ao escanear {filepath}: {e}")
+                break
+            
+            breaker.record_success()
+            self.limiter.on_success()
+            self.pool.mark_success(url)
+            self.scan_results['server_response_times'].append(time.time() - request_start)
+            self.count('network_bytes_received', HEADER.size + len(reply))
+            with self.phases.phase('serialização'):
+                return decode_verdict(reply)
+        
+        return None
+    
+    def needs_full_scan(self, result, file_size):
+        """Arquivo limpo pelo hash mas maior que a prévia: padrões podem estar além do 1º KB"""
+        return (result is not None and result.get('clean')
+                and self.max_stream_size
+                and PREVIEW_SIZE < file_size <= self.max_stream_size)
+    
+    def read_chunks(self, filepath, chunk_size=64 * 1024):
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                self.count('stream_bytes_sent', len(chunk))
+                self.count('network_bytes_sent', len(chunk))
+                yield chunk
+    
+    def scan_file_stream(self, filepath):
+        """Envia o conteúdo completo em streaming para /scan/stream (o arquivo já passou por /scan)"""
+        request_start = time.time()
+        try:
+            self.count('stream_uploads')
+            response = self.post_with_backpressure(
+                '/scan/stream',
+                params={'name': str(filepath), 'client_id': self.client_id, 'rescan': 1},
+                data_factory=lambda: self.read_chunks(filepath),
+                headers={'Content-Type': 'application/octet-stream'},
+                timeout=max(60, self.request_timeout)
+            )
+            self.scan_results['server_response_times'].append(time.time() - request_start)
+            
+            if response.status_code == 200:
+                self.count('network_bytes_received', len(response.content))
+                with self.phases.phase('serialização'):
+                    return response.json()
+        except Exception as e:
+            print(f"{Fore.RED}✗ Erro no scan completo de {filepath}: {e}")
+        
+        return None
+    
+    @staticmethod
+    def file_size(filepath):
+        try:
+            return Path(filepath).stat().st_size
+        except OSError:
+            return None
+    
+    def stat_file(self, filepath):
+        with self.phases.phase('stat', root=True):
+            return self.file_size(filepath)
+    
+    def track_file(self, filepath, file_size):
+        """Contabiliza arquivo, tamanho e extensão; retorna o tamanho (0 se não foi possível ler)"""
         self.scan_results['total_files'] += 1
         
         try:
-            file_size = Path(filepath).stat().st_size
+            if file_size is None:
+                raise OSError(filepath)
             self.scan_results['total_bytes_scanned'] += file_size
             
             # Rastrear maior e menor arquivo
@@ -155,11 +750,46 @@ class AntivirusDistribuidoCliente:
             self.scan_results['file_types_scanned'][file_ext] = self.scan_results['file_types_scanned'].get(file_ext, 0) + 1
         except:
             file_size = 0
+        return file_size
+    
+    def analyze_file(self, filepath, file_size):
+        """Análise remota (hash + /scan, e streaming se necessário); pode rodar em outra thread"""
+        with self.phases.phase('outros', root=True):
+            return self._analyze_file(filepath, file_size)
+    
+    def _analyze_file(self, filepath, file_size):
+        identity = None
+        if self.cache is not None:
+            with self.phases.phase('cache'):
+                identity = self.cache.identity(filepath)
+                cached = self.cache.get(identity)
+            if cached is not None:
+                cached['cached'] = True
+                return cached
         
-        # Análise remota
-        result = self.scan_file_remote(filepath)
+        result = self.scan_file_local(filepath, file_size) if self.hybrid else None
+        if result is None:
+            result = self.scan_file_remote(filepath)
+            if self.needs_full_scan(result, file_size or 0) and not result.get('cached'):
+                streamed = self.scan_file_stream(filepath)
+                if streamed:
+                    streamed['hash'] = result.get('hash')
+                    result = streamed
         
-        if result:
+        if self.cache is not None and result and not result.get('fallback') and not result.get('queued'):
+            with self.phases.phase('cache'):
+                self.cache.put(identity, result.get('hash'), result)
+        return result
+    
+    def record_result(self, filepath, file_size, result):
+        """Imprime e contabiliza o resultado de um arquivo"""
+        with self.phases.phase('saída', root=True):
+            self._record_result(filepath, file_size, result)
+    
+    def _record_result(self, filepath, file_size, result):
+        if result and result.get('queued'):
+            print(f"{Fore.YELLOW}⏳ Na fila offline: {filepath}")
+        elif result:
             if not result['clean']:
                 severity = result.get('severity', 'medium')
                 
@@ -198,39 +828,111 @@ class AntivirusDistribuidoCliente:
                 self.scan_results['clean_files'] += 1
         else:
             print(f"{Fore.YELLOW}⚠ Não foi possível analisar: {filepath}")
+    
+    def scan_file(self, filepath):
+        """Escaneia um arquivo individual com métricas detalhadas"""
+        file_start_time = time.time()
+        with self.phases.phase('contabilização', root=True):
+            file_size = self.track_file(filepath, self.stat_file(filepath))
+            result = self.analyze_file(filepath, file_size)
+            self.record_result(filepath, file_size, result)
         
         # Registrar tempo
         file_scan_time = time.time() - file_start_time
         self.scan_times.append(file_scan_time)
     
+    async def scan_files_async(self, filepaths):
+        """Hash e consultas de vários arquivos em paralelo, resultados registrados na ordem original.
+        
+        Cada arquivo ocupa uma thread do executor (stat, hash e requisição bloqueantes);
+        no máximo `concurrency` arquivos ficam em andamento e a janela de tarefas
+        pendentes é limitada, então diretórios enormes não viram milhões de tarefas.
+        Ao final o coalescer (se houver) é encerrado; consultas seguintes vão uma a uma.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='scan')
+        
+        async def analyze(filepath):
+            async with semaphore:
+                start = time.time()
+                file_size = await loop.run_in_executor(executor, self.stat_file, filepath)
+                result = await loop.run_in_executor(executor, self.analyze_file, filepath, file_size)
+                return file_size, result, time.time() - start
+        
+        async def record(filepath, task):
+            file_size, result, elapsed = await task
+            with self.phases.phase('contabilização', root=True):
+                file_size = self.track_file(filepath, file_size)
+            self.record_result(filepath, file_size, result)
+            self.scan_times.append(elapsed)
+        
+        window = deque()
+        try:
+            for filepath in filepaths:
+                window.append((filepath, asyncio.ensure_future(analyze(filepath))))
+                if len(window) >= self.concurrency * 4:
+                    await record(*window.popleft())
+            while window:
+                await record(*window.popleft())
+        finally:
+            executor.shutdown(wait=False)
+            if self.coalescer is not None:
+                self.coalescer.close()
+    
+    def iter_files(self, directory):
+        path = Path(directory)
+        if path.is_file():
+            yield path
+            return
+        for root, dirs, files in os.walk(path):
+            for file in files:
+                yield Path(root) / file
+    
     def scan_directory(self, directory):
         """Escaneia um diretório recursivamente"""
         print(f"\n{Fore.CYAN}{'='*70}")
         print(f"{Fore.CYAN}ANTIVÍRUS DISTRIBUÍDO - Iniciando Scan")
         print(f"{Fore.CYAN}{'='*70}\n")
         
-        # Baixar assinaturas atualizadas
-        self.download_signatures()
+        # Baixar assinaturas atualizadas (no modo por prefixo, só versão e padrões)
+        if self.range_cache is None or self.hybrid:
+            self.download_signatures()
+        if self.range_cache is not None:
+            self.refresh_range_info()
+        # Vereditos pendentes de uma execução anterior sem servidor
+        self.reconcile_offline_queue()
         print()
         
         start_time = time.time()
-        process = psutil.Process()
-        start_memory = process.memory_info().rss / 1024 / 1024  # MB
+        sampler = ResourceSampler(enabled=self.resources).start()
         
-        path = Path(directory)
-        if path.is_file():
-            self.scan_file(path)
+        if self.concurrency > 1:
+            asyncio.run(self.scan_files_async(self.iter_files(directory)))
         else:
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    filepath = Path(root) / file
-                    self.scan_file(filepath)
+            for filepath in self.iter_files(directory):
+                self.scan_file(filepath)
         
         end_time = time.time()
-        end_memory = process.memory_info().rss / 1024 / 1024  # MB
+        resources = sampler.stop()
         
         self.scan_results['scan_time'] = end_time - start_time
-        self.scan_results['memory_used'] = end_memory - start_memory
+        # Crescimento até o pico, não a diferença fim - início (que perde o pico e pode ser negativa)
+        self.scan_results['memory_used'] = resources['rss_growth_mb']
+        self.scan_results['resources'] = resources
+        
+        if self.offline_queue is not None:
+            if self.scan_results['queued_offline']:
+                # Servidor pode ter voltado durante o scan
+                self.reconcile_offline_queue()
+            self.offline_queue.close()
+        
+        if self.coalescer is not None:
+            # Lotes ainda pendentes saem agora; sem isso a thread e o executor do coalescer sobrevivem ao scan
+            self.coalescer.close()
+        if self.cache is not None:
+            self.cache.save()
+        self.scan_results['phases'] = self.phases.snapshot()
         
         # Calcular métricas adicionais
         if self.scan_results['scan_time'] > 0:
@@ -265,19 +967,77 @@ class AntivirusDistribuidoCliente:
             print(f"   Arquivo mais rápido: {min(self.scan_times)*1000:.2f}ms")
             print(f"   Arquivo mais lento: {max(self.scan_times)*1000:.2f}ms")
         
+        # Fases
+        if self.scan_results['phases']:
+            print(f"\n{Fore.WHITE}TEMPO POR FASE:")
+            for line in self.phases.table_lines(self.scan_results['phases']):
+                print(line)
+            if self.concurrency > 1:
+                print(f"   (somado entre as {self.concurrency} threads de análise; passa do tempo total do scan)")
+        
         # Rede
         print(f"\n{Fore.WHITE}ESTATÍSTICAS DE REDE:")
         print(f"   Requisições ao servidor: {self.scan_results['network_requests']}")
         print(f"   Dados enviados: {self.scan_results['network_bytes_sent']/1024:.2f} KB")
         print(f"   Dados recebidos: {self.scan_results['network_bytes_received']/1024:.2f} KB")
+        if self.scan_results['stream_uploads']:
+            print(f"   Scans completos (streaming): {self.scan_results['stream_uploads']} "
+                  f"({self.scan_results['stream_bytes_sent']/1024:.2f} KB)")
         print(f"   Latência média: {self.scan_results['avg_network_latency']*1000:.2f}ms")
+        if len(self.pool.servers) > 1:
+            print(f"   Failovers: {self.pool.stats['failovers']}")
+            for server in self.pool.summary():
+                status = 'ok' if server['healthy'] else 'falhou'
+                print(f"   {server['url']} ({server['role'] or '?'}, {status}): {server['requests']} requisições")
+        connections = self.http.connection_stats()
+        if connections['requests']:
+            reuse = connections['connections_reused'] / connections['requests'] * 100
+            print(f"   Conexões HTTP abertas: {connections['connections_opened']} "
+                  f"(reutilização: {reuse:.1f}% de {connections['requests']} requisições)")
+        if connections['circuit_opened']:
+            print(f"   Circuit breaker: aberto {connections['circuit_opened']}x, "
+                  f"{connections['short_circuited']} requisições evitadas")
+        if self.hybrid:
+            print(f"   Vereditos locais (modo híbrido): {self.scan_results['local_verdicts']} "
+                  f"({self.scan_results['network_calls_avoided']} chamadas de rede evitadas, "
+                  f"{self.scan_results['freshness_checks']} verificações da base)")
+        if self.coalescer is not None and self.coalescer.stats['batches']:
+            batching = self.coalescer.snapshot()
+            print(f"   Lotes (/scan/batch): {batching['batches']} com média de {batching['avg_batch']:.1f} consultas "
+                  f"(envio por tamanho: {batching['flush_count'] + batching['flush_bytes']}, "
+                  f"por prazo: {batching['flush_deadline']})")
+            print(f"   Janela final: {batching['window']} consultas, prazo {batching['deadline_ms']:.1f}ms, "
+                  f"p99 por veredito {batching['p99_ms']:.1f}ms (alvo {self.coalescer.target_p99*1000:.0f}ms)")
+        if self.range_cache is not None:
+            ranges = self.range_cache.stats
+            print(f"   Consultas por prefixo (/range): {self.scan_results['range_requests']} faixas baixadas, "
+                  f"{ranges['hits']} arquivos resolvidos com faixas em cache "
+                  f"(prefixo de {self.range_cache.prefix_length} dígitos)")
+        if self.cache is not None and self.cache.active:
+            cache = self.cache.stats
+            print(f"   Cache de vereditos: {cache['hits']} arquivos inalterados, {cache['hash_hits']} pelo hash, "
+                  f"{cache['stores']} novos vereditos gravados")
+        if self.scan_results['fallback_scans']:
+            print(f"   {Fore.YELLOW}Scans com base local (servidor indisponível): {self.scan_results['fallback_scans']}")
+        if self.scan_results['queued_offline'] or self.scan_results['late_verdicts']:
+            print(f"   Fila offline: {self.scan_results['queued_offline']} arquivos enfileirados, "
+                  f"{self.scan_results['late_verdicts']} vereditos atrasados recebidos "
+                  f"({len(self.scan_results['late_threats'])} ameaças)")
+            if self.scan_results['late_hash_only']:
+                print(f"   {Fore.YELLOW}Vereditos atrasados só pelo hash (arquivo apagado, fila sem prévia): "
+                      f"{self.scan_results['late_hash_only']}")
+        if self.scan_results['throttled_requests']:
+            print(f"   Requisições limitadas (429): {self.scan_results['throttled_requests']} "
+                  f"(backoff total: {self.scan_results['backoff_time']:.2f}s)")
         if self.scan_results['server_response_times']:
             print(f"   Resposta mais rápida: {min(self.scan_results['server_response_times'])*1000:.2f}ms")
             print(f"   Resposta mais lenta: {max(self.scan_results['server_response_times'])*1000:.2f}ms")
         
         # Recursos
         print(f"\n{Fore.WHITE}USO DE RECURSOS:")
-        print(f"   Memória utilizada: {self.scan_results['memory_used']:.2f} MB")
+        print(f"   Memória utilizada: {self.scan_results['memory_used']:.2f} MB (pico - início)")
+        for line in ResourceSampler.table_lines(self.scan_results['resources']):
+            print(line)
         total_mb = self.scan_results['total_bytes_scanned'] / 1024 / 1024
         print(f"   Total de dados escaneados: {total_mb:.2f} MB")
         if self.scan_results['scan_time'] > 0:
@@ -340,33 +1100,84 @@ class AntivirusDistribuidoCliente:
     
     def print_server_stats(self):
         """Imprime estatísticas do servidor"""
-        try:
-            response = requests.get(f'{self.server_url}/stats', timeout=5)
-            if response.status_code == 200:
-                stats = response.json()
-                print(f"\n{Fore.CYAN}{'='*70}")
-                print(f"{Fore.CYAN}ESTATÍSTICAS DO SERVIDOR")
-                print(f"{Fore.CYAN}{'='*70}\n")
-                print(f"Total de scans processados: {stats['total_scans']}")
-                print(f"Ameaças detectadas (global): {stats['threats_detected']}")
-                print(f"Clientes ativos: {stats['active_clients']}")
-        except:
-            pass
+        for url in self.pool.candidates():
+            try:
+                response = self.http.get(f'{url}/stats', timeout=5)
+                if response.status_code == 200:
+                    stats = response.json()
+                    print(f"\n{Fore.CYAN}{'='*70}")
+                    print(f"{Fore.CYAN}ESTATÍSTICAS DO SERVIDOR ({url})")
+                    print(f"{Fore.CYAN}{'='*70}\n")
+                    print(f"Total de scans processados: {stats['total_scans']}")
+                    print(f"Ameaças detectadas (global): {stats['threats_detected']}")
+                    print(f"Clientes ativos: {stats['active_clients']}")
+                    return
+            except:
+                pass
 
 def main():
     import sys
+    import argparse
     
-    if len(sys.argv) < 2:
-        print("Uso: python client.py <diretório ou arquivo>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Cliente do antivírus distribuído')
+    parser.add_argument('target', help='Diretório ou arquivo a escanear')
+    parser.add_argument('--server', action='append', default=None,
+                        help='URL do servidor; repita (ou separe por vírgula) para primário + réplicas')
+    parser.add_argument('--max-stream-mb', type=float, default=50,
+                        help='Limite para enviar o arquivo completo quando o hash não decide (0 desativa)')
+    parser.add_argument('--transport', choices=['http', 'tcp'], default='http',
+                        help='tcp usa o protocolo binário com quadros em conexão persistente')
+    parser.add_argument('--tcp-port', type=int, default=5001)
+    parser.add_argument('--timeout', type=float, default=10, help='Timeout de cada requisição (s)')
+    parser.add_argument('--max-retries', type=int, default=5, help='Novas tentativas após 429')
+    parser.add_argument('--hybrid', action='store_true',
+                        help='Decide localmente com as assinaturas baixadas e consulta o servidor só quando necessário')
+    parser.add_argument('--freshness-interval', type=float, default=30.0,
+                        help='No modo híbrido, intervalo entre verificações da versão da base (s)')
+    parser.add_argument('--cache', default=None, metavar='PATH',
+                        help='Cache de vereditos entre execuções (ex.: distribuido/verdict_cache.json); '
+                             'desligado por padrão, senão a segunda execução não consulta o servidor')
+    parser.add_argument('--no-cache', action='store_true', help='Ignora --cache (força scan pela rede)')
+    parser.add_argument('--offline-queue', default=None, metavar='PATH',
+                        help='Fila em disco dos arquivos processados com o servidor fora do ar '
+                             '(ex.: distribuido/offline_queue.jsonl); desligada por padrão')
+    parser.add_argument('--no-offline-queue', action='store_true', help='Ignora --offline-queue')
+    parser.add_argument('--coalesce', action='store_true',
+                        help='Agrupa consultas em lotes adaptativos (implica --concurrency 64 se não informado)')
+    parser.add_argument('--target-p99-ms', type=float, default=500,
+                        help='Latência p99 por veredito buscada pelo agrupamento adaptativo')
+    parser.add_argument('--range-lookup', action='store_true',
+                        help='Consulta por prefixo do hash (/range): respostas cacheáveis, veredito resolvido localmente')
+    parser.add_argument('--range-prefix', type=int, default=5,
+                        help='Dígitos hexadecimais do prefixo enviado no modo --range-lookup')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Arquivos analisados em paralelo (acima de 1 usa o modo asyncio)')
+    parser.add_argument('--no-phases', action='store_true',
+                        help='Desliga a medição de tempo por fase (stat, leitura, hash, rede...)')
+    parser.add_argument('--no-resources', action='store_true',
+                        help='Desliga o amostrador de CPU, memória, E/S, descritores e threads')
+    args = parser.parse_args()
+    if args.coalesce and args.concurrency == 1:
+        # Sem vários arquivos em andamento não há o que agrupar
+        args.concurrency = 64
     
-    target = sys.argv[1]
+    target = args.target
+    servers = [u for value in (args.server or ['http://localhost:5000']) for u in value.split(',') if u]
     
     if not os.path.exists(target):
         print(f"{Fore.RED}Erro: {target} não existe!")
         sys.exit(1)
     
-    av = AntivirusDistribuidoCliente()
+    av = AntivirusDistribuidoCliente(servers, max_stream_size=int(args.max_stream_mb * 1024 * 1024),
+                                     request_timeout=args.timeout, max_retries=args.max_retries,
+                                     transport=args.transport, tcp_port=args.tcp_port,
+                                     concurrency=args.concurrency, hybrid=args.hybrid,
+                                     freshness_interval=args.freshness_interval,
+                                     cache_path=None if args.no_cache else args.cache,
+                                     queue_path=None if args.no_offline_queue else args.offline_queue,
+                                     coalesce=args.coalesce, target_p99=args.target_p99_ms / 1000,
+                                     range_prefix=args.range_prefix if args.range_lookup else None,
+                                     phases=not args.no_phases, resources=not args.no_resources)
     av.scan_directory(target)
 
 if __name__ == '__main__':
@@ -0,0 +1,167 @@
+# Agrupamento adaptativo de consultas/Estilo Nagle: junta consultas pendentes em lotes com prazo derivado da latência medida
+
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+class AdaptiveCoalescer:
+    """Junta consultas em lotes e envia quando o lote enche ou o prazo vence.
+
+    O lote é enviado ao atingir `window` itens, `max_bytes` bytes, ou quando o
+    item mais antigo espera mais que o prazo, `delay_factor` × RTT médio dos
+    lotes (limitado a [min_delay, max_delay]). A cada `tune_every` vereditos o
+    p99 da latência por item (submit → resposta) é comparado a `target_p99`.
+    Acima do alvo, a causa decide: se os itens esperam mais na fila de envio
+    (todos os lotes em voo) do que esperando o lote encher, a janela dobra
+    para escoar mais por requisição; senão janela e prazo caem pela metade.
+    Bem abaixo do alvo, ambos crescem aos poucos. Links lentos acabam com lotes
+    grandes, e poucos arquivos não esperam um lote que nunca enche.
+    """
+
+    def __init__(self, send_batch, max_items=200, max_bytes=256 * 1024, target_p99=0.5,
+                 min_delay=0.001, max_delay=0.2, max_in_flight=4, tune_every=50):
+        self.send_batch = send_batch
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.target_p99 = target_p99
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.tune_every = tune_every
+        self.window = min(8, max_items)
+        self.delay_factor = 0.5
+        self.rtt = None
+        self.pending = []
+        self.pending_bytes = 0
+        self.oldest = None
+        self.latencies = deque(maxlen=500)
+        # (espera até o envio do lote, espera por uma vaga de envio) por item
+        self.delays = deque(maxlen=500)
+        self.since_tune = 0
+        self.condition = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='coalescer')
+        self.stats = {'batches': 0, 'items': 0, 'flush_count': 0, 'flush_bytes': 0, 'flush_deadline': 0,
+                      'window_increases': 0, 'window_decreases': 0}
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='coalescer', daemon=True)
+        self.thread.start()
+
+    def deadline(self):
+        """Espera máxima do item mais antigo antes do envio"""
+        if self.rtt is None:
+            return self.min_delay
+        return min(self.max_delay, max(self.min_delay, self.rtt * self.delay_factor))
+
+    def submit(self, item, size):
+        """Enfileira uma consulta; o Future recebe o veredito correspondente"""
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('Coalescer encerrado')
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.append((item, future, time.monotonic()))
+            self.pending_bytes += size
+            if len(self.pending) >= self.window:
+                self._flush('flush_count')
+            elif self.pending_bytes >= self.max_bytes:
+                self._flush('flush_bytes')
+            else:
+                self.condition.notify()
+        return future
+
+    def _flush(self, reason):
+        """Chamado com o lock: entrega o lote atual ao executor"""
+        batch, self.pending, self.pending_bytes = self.pending, [], 0
+        self.oldest = None
+        self.stats[reason] += 1
+        self.stats['batches'] += 1
+        self.stats['items'] += len(batch)
+        self.executor.submit(self._send, batch, time.monotonic())
+
+    def _run(self):
+        with self.condition:
+            while not self.closed:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                remaining = self.oldest + self.deadline() - time.monotonic()
+                if remaining <= 0:
+                    self._flush('flush_deadline')
+                else:
+                    self.condition.wait(remaining)
+
+    def _send(self, batch, flushed_at):
+        start = time.monotonic()
+        try:
+            results = self.send_batch([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finished = time.monotonic()
+        elapsed = finished - start
+        with self.condition:
+            self.rtt = elapsed if self.rtt is None else 0.8 * self.rtt + 0.2 * elapsed
+            for _, _, submitted in batch:
+                self.latencies.append(finished - submitted)
+                self.delays.append((flushed_at - submitted, start - flushed_at))
+            self.since_tune += len(batch)
+            if self.since_tune >= self.tune_every:
+                self._tune()
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+        if len(results) != len(batch):
+            # Resposta com menos (ou mais) vereditos que consultas: os sem par não podem ficar esperando
+            error = RuntimeError(f'Lote de {len(batch)} consultas respondido com {len(results)} vereditos')
+            for _, future, _ in batch[len(results):]:
+                future.set_exception(error)
+
+    def _tune(self):
+        """AIMD sobre janela e prazo, guiado pelo p99 da latência por veredito"""
+        self.since_tune = 0
+        p99 = percentile(self.latencies, 0.99)
+        if p99 > self.target_p99:
+            batching_wait = sum(w for w, _ in self.delays)
+            queue_wait = sum(q for _, q in self.delays)
+            if queue_wait > batching_wait:
+                self.window = min(self.max_items, self.window * 2)
+                self.stats['window_increases'] += 1
+            else:
+                self.window = max(1, self.window // 2)
+                self.delay_factor = max(0.05, self.delay_factor / 2)
+                self.stats['window_decreases'] += 1
+        elif p99 < self.target_p99 * 0.7:
+            self.window = min(self.max_items, self.window + max(1, self.window // 4))
+            self.delay_factor = min(2.0, self.delay_factor + 0.1)
+            self.stats['window_increases'] += 1
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                **self.stats,
+                'window': self.window,
+                'deadline_ms': self.deadline() * 1000,
+                'rtt_ms': (self.rtt or 0.0) * 1000,
+                'p99_ms': percentile(self.latencies, 0.99) * 1000,
+                'avg_batch': self.stats['items'] / self.stats['batches'] if self.stats['batches'] else 0.0
+            }
+
+    def close(self):
+        """Envia o que estiver pendente e encerra as threads; chamadas repetidas não fazem nada"""
+        with self.condition:
+            if self.closed:
+                return
+            if self.pending:
+                self._flush('flush_deadline')
+            self.closed = True
+            self.condition.notify_all()
+        self.executor.shutdown(wait=True)
+        self.thread.join()
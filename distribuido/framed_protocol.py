@@ -0,0 +1,279 @@
+# Protocolo TCP com quadros/Conexões persistentes, quadros com prefixo de tamanho e respostas fora de ordem por ID
+
+
+import struct
+import socket
+import threading
+import socketserver
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Cabeçalho: tamanho do payload (4 bytes), ID da requisição (4 bytes), opcode (1 byte)
+HEADER = struct.Struct('!IIB')
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+OP_HELLO = 0x01      # payload: client_id (utf-8)
+OP_PING = 0x02       # payload vazio
+OP_SCAN = 0x03       # payload: ver encode_scan_request
+OP_OK = 0x80         # resposta genérica
+OP_VERDICT = 0x83    # payload: ver encode_verdict
+OP_BUSY = 0xFE       # payload: retry_after em milissegundos (!I)
+OP_ERROR = 0xFF      # payload: mensagem (utf-8)
+
+SEVERITIES = ['none', 'low', 'medium', 'high', 'critical']
+METHODS = [None, 'hash_signature', 'pattern_matching']
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ServerBusy(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Servidor ocupado, tentar novamente em {retry_after:.3f}s')
+        self.retry_after = retry_after
+
+
+def encode_frame(request_id, opcode, payload=b''):
+    return HEADER.pack(len(payload), request_id, opcode) + payload
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Conexão encerrada')
+        data += chunk
+    return bytes(data)
+
+
+def read_frame(sock):
+    """Lê um quadro completo e retorna (request_id, opcode, payload)"""
+    length, request_id, opcode = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f'Payload de {length} bytes excede o limite')
+    return request_id, opcode, _recv_exact(sock, length) if length else b''
+
+
+def encode_scan_request(file_hash, name, preview):
+    """Digest em binário (metade do hexadecimal), digest e nome com prefixo de 2 bytes e prévia bruta"""
+    if not file_hash:
+        raise ValueError('Requisição de scan sem hash (arquivo ilegível?)')
+    try:
+        digest = bytes.fromhex(file_hash)
+        kind = 0
+    except ValueError:
+        digest = file_hash.encode('utf-8')
+        kind = 1
+    if len(digest) > 0xFFFF:
+        raise ValueError(f'Hash de {len(digest)} bytes excede o limite do quadro')
+    name_raw = name.encode('utf-8')[:0xFFFF]
+    return struct.pack('!BH', kind, len(digest)) + digest + struct.pack('!H', len(name_raw)) + name_raw + preview
+
+
+def decode_scan_request(payload):
+    kind, digest_len = struct.unpack_from('!BH', payload)
+    offset = 3
+    digest = payload[offset:offset + digest_len]
+    offset += digest_len
+    (name_len,) = struct.unpack_from('!H', payload, offset)
+    offset += 2
+    name = payload[offset:offset + name_len].decode('utf-8', errors='ignore')
+    preview = payload[offset + name_len:]
+    file_hash = digest.hex() if kind == 0 else digest.decode('utf-8', errors='ignore')
+    return file_hash, name, preview
+
+
+def encode_verdict(result):
+    """Severidade e método em 1 byte cada, ameaça e padrões separados por NUL"""
+    patterns = [r.split(': ', 1)[1] for r in result.get('recommendations', []) if r.startswith('Padrão')]
+    body = '\0'.join([result.get('threat') or ''] + patterns).encode('utf-8')
+    return struct.pack('!BB', SEVERITIES.index(result.get('severity', 'none')),
+                       METHODS.index(result.get('method'))) + body
+
+
+def decode_verdict(payload):
+    """Reconstrói o mesmo dict devolvido por /scan"""
+    severity, method = struct.unpack_from('!BB', payload)
+    parts = payload[2:].decode('utf-8').split('\0')
+    threat = parts[0] or None
+    method = METHODS[method]
+    if method == 'hash_signature':
+        recommendations = ['Deletar arquivo imediatamente']
+    else:
+        recommendations = [f'Padrão suspeito encontrado: {p}' for p in parts[1:]]
+    return {
+        'clean': threat is None,
+        'threat': threat,
+        'severity': SEVERITIES[severity],
+        'method': method,
+        'recommendations': recommendations
+    }
+
+
+class _FramedHandler(socketserver.BaseRequestHandler):
+    """Uma thread lê os quadros da conexão; o pool executa e responde assim que cada um termina"""
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        write_lock = threading.Lock()
+        state = {'client_id': 'unknown'}
+        server = self.server
+
+        def respond(request_id, opcode, payload):
+            frame = encode_frame(request_id, opcode, payload)
+            with write_lock:
+                try:
+                    sock.sendall(frame)
+                except OSError:
+                    pass
+
+        def run(request_id, opcode, payload):
+            try:
+                reply_op, reply = server.dispatch(opcode, payload, state)
+            except ServerBusy as busy:
+                reply_op, reply = OP_BUSY, struct.pack('!I', int(busy.retry_after * 1000))
+            except Exception as e:
+                reply_op, reply = OP_ERROR, str(e).encode('utf-8')
+            respond(request_id, reply_op, reply)
+
+        while True:
+            try:
+                request_id, opcode, payload = read_frame(sock)
+            except (ConnectionError, OSError, ProtocolError, struct.error):
+                return
+            if opcode == OP_HELLO:
+                state['client_id'] = payload.decode('utf-8', errors='ignore') or 'unknown'
+                respond(request_id, OP_OK, b'')
+            elif opcode == OP_PING:
+                respond(request_id, OP_OK, b'')
+            else:
+                server.pool.submit(run, request_id, opcode, payload)
+
+
+class FramedServer(socketserver.ThreadingTCPServer):
+    """Listener TCP; `dispatch(opcode, payload, state)` retorna (opcode, payload) da resposta"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, dispatch, workers=16):
+        super().__init__(address, _FramedHandler)
+        self.dispatch = dispatch
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='framed')
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever, name='framed-server', daemon=True)
+        thread.start()
+        return thread
+
+
+class FramedClient:
+    """Conexão persistente com pipelining: várias requisições em voo casadas pelo ID"""
+
+    def __init__(self, host, port, client_id='unknown', timeout=10):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+        self.pending = {}
+        self.next_id = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def connect(self):
+        with self.connect_lock:
+            if self.sock is not None:
+                return
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # HELLO antes de publicar o socket: um submit() concorrente não pode mandar SCAN
+            # antes dele (o servidor atribuiria a requisição ao cliente 'unknown')
+            try:
+                sock.sendall(encode_frame(0, OP_HELLO, self.client_id.encode('utf-8')))
+                _, opcode, payload = read_frame(sock)
+            except (OSError, ProtocolError) as e:
+                sock.close()
+                raise ConnectionError(f'Falha no HELLO: {e}')
+            if opcode != OP_OK:
+                sock.close()
+                raise ProtocolError(payload.decode('utf-8', errors='ignore') or f'HELLO recusado ({opcode})')
+            sock.settimeout(None)
+            self.sock = sock
+            threading.Thread(target=self._reader, args=(sock,), name='framed-reader', daemon=True).start()
+
+    def _reader(self, sock):
+        try:
+            while True:
+                request_id, opcode, payload = read_frame(sock)
+                self.bytes_received += HEADER.size + len(payload)
+                with self.lock:
+                    future = self.pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result((opcode, payload))
+        except Exception as e:
+            self._fail(sock, e)
+
+    def _fail(self, sock, error):
+        with self.lock:
+            if self.sock is sock:
+                self.sock = None
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f'Conexão perdida: {error}'))
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def submit(self, opcode, payload=b''):
+        """Envia sem esperar a resposta; retorna um Future com (opcode, payload)"""
+        if self.sock is None:
+            self.connect()
+        future = Future()
+        with self.lock:
+            # O ID 0 fica para o HELLO
+            self.next_id = self.next_id % 0xFFFFFFFF + 1
+            request_id = future.request_id = self.next_id
+            self.pending[request_id] = future
+            sock = self.sock
+        frame = encode_frame(request_id, opcode, payload)
+        try:
+            with self.send_lock:
+                sock.sendall(frame)
+        except (OSError, AttributeError) as e:
+            with self.lock:
+                self.pending.pop(request_id, None)
+            raise ConnectionError(f'Falha ao enviar: {e}')
+        self.bytes_sent += len(frame)
+        return future
+
+    def call(self, opcode, payload=b'', timeout=None):
+        future = self.submit(opcode, payload)
+        try:
+            opcode, payload = future.result(timeout or self.timeout)
+        except FutureTimeout:
+            # Resposta que chegar depois é descartada pelo leitor; sem isso `pending` só cresceria
+            with self.lock:
+                self.pending.pop(future.request_id, None)
+            # No Python 3.10 o TimeoutError de concurrent.futures não é o embutido
+            raise TimeoutError(f'Sem resposta em {timeout or self.timeout}s') from None
+        if opcode == OP_ERROR:
+            raise ProtocolError(payload.decode('utf-8', errors='ignore'))
+        if opcode == OP_BUSY:
+            raise ServerBusy(struct.unpack('!I', payload)[0] / 1000)
+        return opcode, payload
+
+    def scan(self, file_hash, name, preview, timeout=None):
+        _, payload = self.call(OP_SCAN, encode_scan_request(file_hash, name, preview), timeout)
+        return decode_verdict(payload)
+
+    def close(self):
+        if self.sock is not None:
+            self._fail(self.sock, 'fechada pelo cliente')
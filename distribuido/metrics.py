@@ -0,0 +1,140 @@
+# Métricas do servidor/Contadores, gauges e histogramas exportados no formato texto do Prometheus
+
+
+import bisect
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Buckets de latência em segundos e de tamanho de resposta em bytes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def header(self):
+        return [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [f'{self.name}{_format_labels(self.labels, k)} {_format_value(v)}'
+                                for k, v in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self.lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Agrupa as métricas e os coletores calculados apenas na hora do scrape"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, description, labels=()):
+        return self._register(Counter(name, description, labels))
+
+    def gauge(self, name, description, labels=()):
+        return self._register(Gauge(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """`collector()` retorna [(nome, tipo, descrição, {labels: valor})] lido no momento do scrape"""
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, kind, description, samples in collector():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples.items():
+                    label_names = [k for k, _ in labels]
+                    label_values = [v for _, v in labels]
+                    lines.append(f'{name}{_format_labels(label_names, label_values)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
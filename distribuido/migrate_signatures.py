@@ -0,0 +1,51 @@
+# Migração da base de assinaturas/Converte signatures_db.json para o backend SQLite
+
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from colorama import Fore, init
+from signature_store import SqliteSignatureStore
+
+init(autoreset=True)
+
+
+def main():
+    base_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description='Migra signatures_db.json para SQLite')
+    parser.add_argument('source', nargs='?', default=str(base_dir / 'signatures_db.json'))
+    parser.add_argument('target', nargs='?', default=str(base_dir / 'signatures_db.sqlite3'))
+    parser.add_argument('--force', action='store_true', help='Sobrescreve o arquivo SQLite existente')
+    args = parser.parse_args()
+
+    source, target = Path(args.source), Path(args.target)
+    if not source.exists():
+        print(f"{Fore.RED}Erro: {source} não existe!")
+        sys.exit(1)
+    if target.exists():
+        if not args.force:
+            print(f"{Fore.RED}Erro: {target} já existe (use --force para sobrescrever)")
+            sys.exit(1)
+        for suffix in ('', '-wal', '-shm'):
+            Path(str(target) + suffix).unlink(missing_ok=True)
+
+    start = time.time()
+    with open(source, 'r') as f:
+        database = json.load(f)
+
+    store = SqliteSignatureStore(target, seed=False)
+    total = store.import_database(database)
+    skipped = len(database.get('malware', {})) - total
+    store.connection().execute('PRAGMA optimize')
+    store.close()
+
+    print(f"{Fore.GREEN}✓ {total} assinaturas migradas para {target} em {time.time() - start:.2f}s")
+    if skipped:
+        print(f"{Fore.YELLOW}⚠ {skipped} entradas ignoradas (digest não hexadecimal)")
+    print(f"  Inicie o servidor com: python3 distribuido/server.py --backend sqlite --db {target}")
+
+
+if __name__ == '__main__':
+    main()
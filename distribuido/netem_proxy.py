@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Emulador de rede local entre o cliente e o servidor
+Proxy TCP que repassa os bytes nos dois sentidos aplicando latência, jitter,
+limite de banda e travadas de retransmissão (o que a perda de pacotes vira
+para a aplicação em TCP). Serve para medir o cliente distribuído em condições
+de filial/WAN sem sair do localhost.
+
+Uso:
+  python3 distribuido/netem_proxy.py --listen 5100 --target localhost:5000 --profile filial
+  python3 distribuido/netem_proxy.py --target localhost:5000 --rtt-ms 80 --jitter-ms 10 --bandwidth-mbit 5 --loss 0.01
+  python3 distribuido/client.py test_files/ --server http://localhost:5100
+"""
+
+import time
+import queue
+import random
+import socket
+import argparse
+import threading
+import socketserver
+from colorama import Fore, init
+
+init(autoreset=True)
+
+# Pedaço máximo repassado de uma vez: define a granularidade do limite de banda
+CHUNK = 16 * 1024
+# Payload de um segmento TCP típico, para converter taxa de perda por pacote em chance de travada
+MSS = 1448
+
+
+class NetworkProfile:
+    """Condições de um enlace: RTT e jitter (ms), banda (Mbit/s, 0 = ilimitada) e perda por segmento.
+
+    A latência é dividida igualmente entre ida e volta. Cada segmento perdido
+    vira uma travada de `stall_ms` (o RTO mínimo do TCP é 200ms), já que o TCP
+    entrega em ordem e segura tudo o que vem depois até a retransmissão.
+    """
+
+    def __init__(self, name, rtt_ms=0.0, jitter_ms=0.0, bandwidth_mbit=0.0, loss=0.0, stall_ms=200.0):
+        self.name = name
+        self.rtt_ms = rtt_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth_mbit = bandwidth_mbit
+        self.loss = loss
+        self.stall_ms = stall_ms
+
+    def to_dict(self):
+        return {'name': self.name, 'rtt_ms': self.rtt_ms, 'jitter_ms': self.jitter_ms,
+                'bandwidth_mbit': self.bandwidth_mbit, 'loss': self.loss, 'stall_ms': self.stall_ms}
+
+    def __repr__(self):
+        banda = f'{self.bandwidth_mbit:g} Mbit/s' if self.bandwidth_mbit else 'banda livre'
+        return (f'{self.name}: RTT {self.rtt_ms:g}ms ±{self.jitter_ms:g}ms, {banda}, '
+                f'perda {self.loss * 100:g}%')
+
+
+# Perfis usados pela varredura do comparacao.py, do mais próximo ao mais distante
+PROFILES = {
+    'localhost': NetworkProfile('localhost'),
+    'lan': NetworkProfile('lan', rtt_ms=1, jitter_ms=0.2, bandwidth_mbit=1000),
+    'filial': NetworkProfile('filial', rtt_ms=30, jitter_ms=5, bandwidth_mbit=50, loss=0.001),
+    'wan': NetworkProfile('wan', rtt_ms=80, jitter_ms=15, bandwidth_mbit=10, loss=0.005),
+    'movel': NetworkProfile('movel', rtt_ms=150, jitter_ms=40, bandwidth_mbit=4, loss=0.01),
+    'satelite': NetworkProfile('satelite', rtt_ms=600, jitter_ms=50, bandwidth_mbit=2, loss=0.01),
+}
+
+
+class _Link:
+    """Um sentido da conexão: leitura imediata, entrega agendada pelo perfil atual do proxy"""
+
+    def __init__(self, proxy, source, destination, direction):
+        self.proxy = proxy
+        self.source = source
+        self.destination = destination
+        self.direction = direction
+        self.pending = queue.Queue()
+        self.link_free_at = 0.0
+        self.last_delivery = 0.0
+        self.rng = random.Random()
+
+    def schedule(self, size):
+        """Instante de entrega: fila do enlace (banda) + metade do RTT ± jitter + travadas de perda"""
+        profile = self.proxy.profile
+        now = time.monotonic()
+        if profile.bandwidth_mbit:
+            # Serialização no enlace: pedaços saem um atrás do outro na taxa configurada
+            self.link_free_at = max(self.link_free_at, now) + size * 8 / (profile.bandwidth_mbit * 1e6)
+            sent = self.link_free_at
+        else:
+            sent = now
+        delay = profile.rtt_ms / 2 + self.rng.uniform(-profile.jitter_ms, profile.jitter_ms)
+        if profile.loss:
+            segments = max(1, -(-size // MSS))
+            if self.rng.random() < 1 - (1 - profile.loss) ** segments:
+                delay += profile.stall_ms
+                self.proxy.count('stalls')
+        # TCP entrega em ordem: jitter nunca passa um pedaço na frente do anterior
+        self.last_delivery = max(self.last_delivery, sent + max(0.0, delay) / 1000)
+        return self.last_delivery
+
+    def read_loop(self):
+        try:
+            while True:
+                chunk = self.source.recv(CHUNK)
+                if not chunk:
+                    break
+                self.pending.put((self.schedule(len(chunk)), chunk))
+        except OSError:
+            pass
+        self.pending.put((None, None))
+
+    def write_loop(self):
+        try:
+            while True:
+                deliver_at, chunk = self.pending.get()
+                if chunk is None:
+                    # Fim do sentido: repassa o FIN para o outro lado
+                    self.destination.shutdown(socket.SHUT_WR)
+                    break
+                wait = deliver_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self.destination.sendall(chunk)
+                self.proxy.count(f'bytes_{self.direction}', len(chunk))
+        except OSError:
+            # Destino fechou: derruba a origem para o outro lado perceber
+            try:
+                self.source.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _ProxyHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        proxy = self.server.proxy
+        client = self.request
+        try:
+            upstream = socket.create_connection(proxy.target, timeout=10)
+        except OSError as e:
+            print(f"{Fore.RED}✗ Proxy sem conexão com {proxy.target[0]}:{proxy.target[1]}: {e}")
+            return
+        upstream.settimeout(None)
+        for sock in (client, upstream):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        proxy.count('connections')
+        # Abrir a conexão também custa um RTT (handshake) no enlace emulado
+        time.sleep(proxy.profile.rtt_ms / 1000)
+
+        links = [_Link(proxy, client, upstream, 'up'), _Link(proxy, upstream, client, 'down')]
+        threads = [threading.Thread(target=loop, daemon=True)
+                   for link in links for loop in (link.read_loop, link.write_loop)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        upstream.close()
+
+
+class _ProxyServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class NetworkEmulatorProxy:
+    """Proxy TCP com perfil de rede trocável em tempo de execução (`set_profile`).
+
+    Conexões keep-alive já abertas passam a usar o novo perfil no pedaço seguinte.
+    """
+
+    def __init__(self, target_host='localhost', target_port=5000, listen_port=0, profile=None,
+                 listen_host='127.0.0.1'):
+        self.target = (target_host, target_port)
+        self.profile = profile or PROFILES['localhost']
+        self.stats = {'connections': 0, 'bytes_up': 0, 'bytes_down': 0, 'stalls': 0}
+        self.lock = threading.Lock()
+        self.server = _ProxyServer((listen_host, listen_port), _ProxyHandler)
+        self.server.proxy = self
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def url(self):
+        return f'http://{self.server.server_address[0]}:{self.port}'
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def set_profile(self, profile):
+        self.profile = PROFILES[profile] if isinstance(profile, str) else profile
+
+    def start_background(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='netem-proxy', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_target(value):
+    host, _, port = value.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listen', type=int, default=5100, help='Porta local do proxy')
+    parser.add_argument('--target', default='localhost:5000', help='host:porta do servidor real')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=None, help='Perfil pronto')
+    parser.add_argument('--rtt-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--bandwidth-mbit', type=float, default=0.0, help='0 = sem limite')
+    parser.add_argument('--loss', type=float, default=0.0, help='Fração de segmentos perdidos (0.01 = 1%%)')
+    parser.add_argument('--stall-ms', type=float, default=200.0, help='Travada por segmento perdido (RTO)')
+    args = parser.parse_args()
+
+    if args.profile:
+        profile = PROFILES[args.profile]
+    else:
+        profile = NetworkProfile('custom', args.rtt_ms, args.jitter_ms, args.bandwidth_mbit, args.loss, args.stall_ms)
+    host, port = parse_target(args.target)
+    proxy = NetworkEmulatorProxy(host, port, args.listen, profile)
+    print(f"{Fore.CYAN}Proxy {proxy.url} → {host}:{port}")
+    print(f"{Fore.CYAN}Perfil {profile}")
+    try:
+        proxy.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.server.server_close()
+        print(f"\nConexões: {proxy.stats['connections']}, enviados: {proxy.stats['bytes_up'] / 1024:.1f} KB, "
+              f"recebidos: {proxy.stats['bytes_down'] / 1024:.1f} KB, travadas: {proxy.stats['stalls']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# Fila offline do cliente/Arquivos já processados localmente aguardando veredito do servidor, em disco
+
+
+import os
+import json
+import threading
+from pathlib import Path
+
+
+class OfflineQueue:
+    """Fila append-only em JSON Lines com um arquivo de progresso ao lado.
+
+    Cada linha guarda caminho, tamanho, mtime, MD5 e a prévia enviada ao
+    servidor (chaves curtas, ~150 bytes mais a prévia): se o arquivo for
+    apagado antes da reconciliação, os padrões ainda são aplicados sobre ela
+    e o veredito atrasado é o mesmo do scan on-line. A reconciliação avança um offset em bytes,
+    gravado de forma atômica após cada lote confirmado pelo servidor; se o
+    processo morrer no meio, a próxima execução continua do último lote.
+    O fsync é feito a cada `sync_every` entradas e ao fechar. Uma linha
+    truncada por queda durante a escrita é descartada: a próxima escrita
+    começa em linha nova e a leitura avança o offset por cima dela.
+    """
+
+    def __init__(self, path, sync_every=64):
+        self.path = Path(path)
+        self.offset_path = self.path.with_suffix(self.path.suffix + '.offset')
+        self.sync_every = sync_every
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced = 0
+        self.appended = 0
+
+    def _read_offset(self):
+        try:
+            return int(self.offset_path.read_text().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def append(self, filepath, file_hash, size, mtime_ns, preview):
+        # Caminho absoluto: a reconciliação pode rodar a partir de outro diretório
+        line = json.dumps({'p': str(Path(filepath).resolve()), 'h': file_hash, 's': size, 'm': mtime_ns,
+                           'v': preview}, separators=(',', ':')) + '\n'
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'a')
+                if self.file.tell() and not self._ends_with_newline():
+                    # Fragmento de uma execução que caiu no meio da linha: sem isso a entrada nova grudaria nele
+                    self.file.write('\n')
+            self.file.write(line)
+            self.file.flush()
+            self.appended += 1
+            self.unsynced += 1
+            if self.unsynced >= self.sync_every:
+                os.fsync(self.file.fileno())
+                self.unsynced = 0
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def sync(self):
+        with self.lock:
+            if self.file is not None and self.unsynced:
+                os.fsync(self.file.fileno())
+                self.unsynced = 0
+
+    def batches(self, size=200):
+        """Entradas pendentes em lotes: (entradas, offset após o lote); caminho repetido vale a última"""
+        self.sync()
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            yielded = self._read_offset()
+            f.seek(yielded)
+            batch = {}
+            for raw in iter(f.readline, b''):
+                try:
+                    # Linha incompleta no fim do arquivo (queda durante a escrita) ou corrompida: ignorada
+                    entry = json.loads(raw) if raw.endswith(b'\n') else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    continue
+                batch.pop(entry['p'], None)
+                batch[entry['p']] = entry
+                if len(batch) >= size:
+                    yielded = f.tell()
+                    yield list(batch.values()), yielded
+                    batch = {}
+            if batch or f.tell() > yielded:
+                # Lote vazio quando só restavam linhas descartadas: o offset ainda avança
+                yield list(batch.values()), f.tell()
+
+    def has_pending(self):
+        try:
+            return self.path.stat().st_size > self._read_offset()
+        except OSError:
+            return False
+
+    def commit(self, offset):
+        """Marca como reconciliado tudo até `offset`; fila esvaziada é apagada"""
+        with self.lock:
+            size = self.path.stat().st_size if self.path.exists() else 0
+            if offset >= size:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                for path in (self.path, self.offset_path):
+                    if path.exists():
+                        path.unlink()
+                return
+            tmp = self.offset_path.with_suffix('.tmp')
+            tmp.write_text(str(offset))
+            os.replace(tmp, self.offset_path)
+
+    def close(self):
+        self.sync()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
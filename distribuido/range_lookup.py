@@ -0,0 +1,58 @@
+# Consulta por prefixo de hash/Faixas de digests baixadas do servidor e resolvidas localmente pelo cliente
+
+
+import threading
+from collections import OrderedDict
+
+
+class RangeCache:
+    """Faixas de /range/<prefixo> já baixadas, válidas para uma versão da base.
+
+    Cada faixa é um dict sufixo → nome da ameaça; o veredito por hash sai
+    daqui sem nova requisição para qualquer arquivo cujo digest caia em uma
+    faixa conhecida. Quando a versão muda (resposta do servidor com outra
+    `version`), todas as faixas são descartadas de uma vez.
+    """
+
+    def __init__(self, prefix_length=5, max_buckets=65536):
+        self.prefix_length = prefix_length
+        self.max_buckets = max_buckets
+        self.version = None
+        self.patterns = []
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidated': 0}
+
+    def split(self, digest):
+        return digest[:self.prefix_length], digest[self.prefix_length:]
+
+    def set_version(self, version, patterns=None):
+        """Adota a versão informada pelo servidor; versão diferente descarta as faixas"""
+        with self.lock:
+            if patterns is not None:
+                self.patterns = patterns
+            if version != self.version:
+                self.stats['invalidated'] += len(self.buckets)
+                self.buckets.clear()
+                self.version = version
+
+    def get(self, prefix):
+        with self.lock:
+            bucket = self.buckets.get(prefix)
+            if bucket is None:
+                self.stats['misses'] += 1
+                return None
+            self.buckets.move_to_end(prefix)
+            self.stats['hits'] += 1
+            return bucket
+
+    def put(self, prefix, version, matches):
+        with self.lock:
+            if version != self.version:
+                # Base mudou entre duas consultas: faixas antigas não valem mais
+                self.stats['invalidated'] += len(self.buckets)
+                self.buckets.clear()
+                self.version = version
+            self.buckets[prefix] = matches
+            while len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
@@ -0,0 +1,158 @@
+# Replicação primário/réplica/Log de alterações no primário e réplicas que o acompanham por long-polling
+
+
+import time
+import uuid
+import threading
+from collections import deque
+
+import requests
+
+
+class ChangeLog:
+    """Alterações recentes da base numeradas em sequência.
+
+    O `epoch` muda a cada início do primário: uma réplica que vê outro epoch,
+    ou que pede uma sequência já descartada, precisa de um snapshot completo.
+
+    Uma réplica também pode ser seguida (encadeamento primário → R1 → R2).
+    Quando R1 instala um snapshot a base dela é trocada inteira, sem passar
+    pelo log; por isso `new_epoch()` abre um epoch novo e descarta as entradas,
+    e quem segue R1 faz o próprio snapshot em vez de divergir em silêncio.
+    """
+
+    def __init__(self, capacity=100000):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.entries = deque(maxlen=capacity)
+        self.seq = 0
+        self.condition = threading.Condition()
+
+    def append(self, digest, threat_name, updated_at):
+        return self._append({'hash': digest, 'threat_name': threat_name, 'updated_at': updated_at})
+
+    def append_delete(self, start, end, updated_at):
+        """Faixa [start, end) do anel removida (passou a outro shard): as réplicas apagam a mesma faixa"""
+        return self._append({'op': 'delete_range', 'start': start, 'end': end, 'updated_at': updated_at})
+
+    def _append(self, entry):
+        with self.condition:
+            self.seq += 1
+            entry['seq'] = self.seq
+            entry['ts'] = time.time()
+            self.entries.append(entry)
+            self.condition.notify_all()
+            return self.seq
+
+    def new_epoch(self):
+        """A base foi substituída por inteiro (snapshot): o log anterior não a descreve mais"""
+        with self.condition:
+            self.epoch = uuid.uuid4().hex[:12]
+            self.entries.clear()
+            self.condition.notify_all()
+            return self.epoch
+
+    def since(self, seq, wait=0.0, limit=5000):
+        """Alterações após `seq`; espera até `wait` segundos se não houver nenhuma"""
+        with self.condition:
+            epoch = self.epoch
+            if seq >= self.seq and wait > 0:
+                self.condition.wait_for(lambda: self.seq > seq or self.epoch != epoch, timeout=wait)
+            oldest = self.entries[0]['seq'] if self.entries else self.seq + 1
+            if seq + 1 < oldest and seq < self.seq:
+                return {'epoch': self.epoch, 'seq': self.seq, 'reset': True, 'changes': []}
+            changes = [e for e in self.entries if e['seq'] > seq][:limit]
+            return {'epoch': self.epoch, 'seq': self.seq, 'reset': False, 'changes': changes}
+
+
+class ReplicaFollower:
+    """Mantém a base local de uma réplica em dia com o primário"""
+
+    def __init__(self, primary_url, signatures_db, logger, poll_wait=20.0, retry_delay=2.0):
+        self.primary_url = primary_url.rstrip('/')
+        self.signatures_db = signatures_db
+        self.logger = logger
+        self.poll_wait = poll_wait
+        self.retry_delay = retry_delay
+        self.session = requests.Session()
+        self.epoch = None
+        self.applied_seq = 0
+        self.primary_seq = 0
+        self.connected = False
+        self.last_caught_up = None
+        self.last_apply_delay = 0.0
+        self.stats = {'snapshots': 0, 'changes_applied': 0, 'errors': 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='replica-follower', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Sincronização completa: posição atual do log, depois a base inteira"""
+        position = self.session.get(f'{self.primary_url}/replication/changes',
+                                    params={'since': 2 ** 62}, timeout=10).json()
+        database = self.session.get(f'{self.primary_url}/signatures',
+                                    params={'client_id': 'replica'}, timeout=300).json()
+        self.signatures_db.reset(database)
+        self.epoch = position['epoch']
+        self.applied_seq = position['seq']
+        self.primary_seq = position['seq']
+        self.stats['snapshots'] += 1
+        self.logger.info('Réplica sincronizada (snapshot)', primary=self.primary_url,
+                         signatures=self.signatures_db.count(), seq=self.applied_seq)
+
+    def poll(self):
+        response = self.session.get(f'{self.primary_url}/replication/changes',
+                                    params={'since': self.applied_seq, 'wait': self.poll_wait},
+                                    timeout=self.poll_wait + 10)
+        data = response.json()
+        if data['epoch'] != self.epoch or data['reset'] or data['seq'] < self.applied_seq:
+            self.snapshot()
+            return
+        changes = data['changes']
+        if changes:
+            self.signatures_db.apply_changes(changes)
+            self.applied_seq = changes[-1]['seq']
+            self.last_apply_delay = time.time() - changes[-1]['ts']
+            self.stats['changes_applied'] += len(changes)
+        self.primary_seq = data['seq']
+        if self.applied_seq >= self.primary_seq:
+            self.last_caught_up = time.time()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.epoch is None:
+                    self.snapshot()
+                self.connected = True
+                self.poll()
+            except Exception as e:
+                self.connected = False
+                self.stats['errors'] += 1
+                self.logger.warning('Falha ao replicar do primário', primary=self.primary_url, error=e)
+                self._stop.wait(self.retry_delay)
+
+    def status(self):
+        caught_up = self.connected and self.applied_seq >= self.primary_seq
+        if caught_up:
+            lag_seconds = 0.0
+        elif self.last_caught_up is not None:
+            lag_seconds = time.time() - self.last_caught_up
+        else:
+            lag_seconds = None
+        return {
+            'role': 'replica',
+            'primary': self.primary_url,
+            'connected': self.connected,
+            'epoch': self.epoch,
+            'applied_seq': self.applied_seq,
+            'primary_seq': self.primary_seq,
+            'lag_entries': max(0, self.primary_seq - self.applied_seq),
+            'lag_seconds': lag_seconds,
+            'last_apply_delay': self.last_apply_delay,
+            **self.stats
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Rebalanceamento dos shards de assinaturas
+Compara o anel atual com o novo e move apenas as faixas de hashes que trocam de dono:
+copia cada faixa para o novo dono, publica o novo anel em todos os nós e só então
+remove as faixas da origem (consultas continuam corretas durante todo o processo).
+
+Uso:
+  python3 distribuido/reshard.py --old URL,URL --new URL,URL,URL [--dry-run]
+  python3 distribuido/reshard.py --new URL,URL --load distribuido/signatures_db.json
+"""
+
+import sys
+import json
+import argparse
+import requests
+from colorama import Fore, init
+
+from sharding import HashRing, plan_rebalance, moved_fraction
+
+init(autoreset=True)
+
+
+def load_database(ring, path, session):
+    """Distribui uma base completa (formato signatures_db.json) entre os donos"""
+    with open(path, 'r') as f:
+        database = json.load(f)
+    per_node = {node: {} for node in ring.nodes}
+    for digest, threat_name in database.get('malware', {}).items():
+        per_node[ring.owner(digest)][digest] = threat_name
+    for node, items in per_node.items():
+        session.post(f'{node}/shard/import', json={'items': items}, timeout=300).raise_for_status()
+        print(f"{Fore.GREEN}{node}: {len(items)} assinaturas")
+
+
+def rebalance(old_ring, new_ring, session, dry_run=False):
+    moves = plan_rebalance(old_ring, new_ring)
+    print(f"{len(moves)} faixas mudam de dono ({moved_fraction(moves):.1%} do espaço de hashes)")
+    for source, share in sorted(old_ring.ownership().items()):
+        print(f"  antes  {source}: {share:.1%}")
+    for target, share in sorted(new_ring.ownership().items()):
+        print(f"  depois {target}: {share:.1%}")
+    if dry_run or not moves:
+        return
+
+    # 1. Copiar as faixas; a origem continua respondendo por elas até a troca do anel
+    copied = 0
+    for start, end, source, target in moves:
+        items = session.get(f'{source}/shard/export', params={'start': start, 'end': end},
+                            timeout=300).json()['items']
+        if items:
+            session.post(f'{target}/shard/import', json={'items': items}, timeout=300).raise_for_status()
+        copied += len(items)
+    print(f"{Fore.GREEN}{copied} assinaturas copiadas")
+
+    # 2. Publicar o novo anel
+    for node in new_ring.nodes:
+        session.post(f'{node}/shard/ring', json=new_ring.config(), timeout=10).raise_for_status()
+    print(f"{Fore.GREEN}Novo anel publicado em {len(new_ring.nodes)} nós")
+
+    # 3. Remover as faixas que saíram de cada origem
+    deleted = 0
+    for start, end, source, _ in moves:
+        try:
+            response = session.post(f'{source}/shard/delete', params={'start': start, 'end': end}, timeout=300)
+            deleted += response.json().get('deleted', 0)
+        except requests.RequestException as e:
+            print(f"{Fore.YELLOW}⚠ Não foi possível limpar {source}: {e}")
+    print(f"{Fore.GREEN}{deleted} assinaturas removidas das origens")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--old', default='', help='Nós do anel atual, separados por vírgula')
+    parser.add_argument('--new', required=True, help='Nós do novo anel, separados por vírgula')
+    parser.add_argument('--vnodes', type=int, default=64)
+    parser.add_argument('--load', default=None, metavar='JSON', help='Distribui uma base completa pelo novo anel')
+    parser.add_argument('--dry-run', action='store_true', help='Só mostra o plano')
+    args = parser.parse_args()
+
+    new_ring = HashRing([n for n in args.new.split(',') if n], args.vnodes)
+    session = requests.Session()
+    if args.load:
+        load_database(new_ring, args.load, session)
+        return 0
+    if not args.old:
+        parser.error('--old é obrigatório sem --load')
+    old_ring = HashRing([n for n in args.old.split(',') if n], args.vnodes)
+    rebalance(old_ring, new_ring, session, args.dry_run)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
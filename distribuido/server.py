@@ -1,197 +1,875 @@
 # Servidor do Antivírus Distribuído/Mantém base de assinaturas atualizada e processa requisições de clientes
 
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 import hashlib
 import json
 import time
 from datetime import datetime
 from colorama import Fore, Style, init
 from pathlib import Path
+from async_logger import AsyncLogger
+from cardinality import ClientActivityTracker
+from signature_store import open_store, BACKENDS
+from stream_scan import StreamScanner, STREAM_CHUNK
+from admission import AdmissionController, retry_after_header
+from framed_protocol import (FramedServer, ProtocolError, ServerBusy, OP_SCAN, OP_VERDICT,
+                             decode_scan_request, encode_verdict)
+from functools import wraps
+from itertools import groupby
+from werkzeug.serving import WSGIRequestHandler
+from replication import ChangeLog, ReplicaFollower
+from sharding import HashRing, RING_SIZE, prefix_range
+import metrics
+import requests
 
 init(autoreset=True)
 
 app = Flask(__name__)
+app.config['MAX_STREAM_BYTES'] = 256 * 1024 * 1024
+app.config['MAX_BATCH_ITEMS'] = 1000
+# Tamanhos aceitos para o prefixo de /range/<prefixo> (dígitos hexadecimais)
+app.config['RANGE_PREFIX_MIN'] = 4
+app.config['RANGE_PREFIX_MAX'] = 8
+
+# Logs das rotas passam pelo logger assíncrono (reconfigurado em main())
+logger = AsyncLogger()
+
+# Admissão das rotas de scan (reconfigurada em main())
+admission = AdmissionController()
+
+# Métricas por rota expostas em /metrics
+registry = metrics.MetricsRegistry()
+http_requests = registry.counter('av_http_requests_total', 'Requisições HTTP por rota, método e status',
+                                 ('route', 'method', 'status'))
+http_in_flight = registry.gauge('av_http_requests_in_flight', 'Requisições em andamento por rota', ('route',))
+http_latency = registry.histogram('av_http_request_duration_seconds', 'Latência das requisições por rota',
+                                  ('route',))
+http_response_size = registry.histogram('av_http_response_size_bytes', 'Tamanho das respostas por rota',
+                                        ('route',), buckets=metrics.SIZE_BUCKETS)
 
 class SignaturesDB:
-    def __init__(self):
-        self.db_file = Path(__file__).parent / 'signatures_db.json'
-        self.load_database()
+    # Acima deste tamanho o corpo de /signatures é gerado em streaming e não fica em cache
+    EXPORT_CACHE_LIMIT = 100000
+    
+    def __init__(self, backend='json', path=None):
+        self.load_database(backend, path)
         self.stats = {
             'total_scans': 0,
             'threats_detected': 0,
-            'clients_connected': set()
+            'range_lookups': 0,
+            'stream_rescans': 0,
+            'clients_connected': ClientActivityTracker()
         }
+        self.cache_stats = {'signatures_body': {'hits': 0, 'misses': 0}}
+        self._serialized = None
+        self.changelog = ChangeLog()
     
-    def load_database(self):
+    def load_database(self, backend='json', path=None):
         """Carrega a base de assinaturas"""
-        if self.db_file.exists():
-            with open(self.db_file, 'r') as f:
-                self.database = json.load(f)
+        self.store = open_store(backend, path)
+        self.db_file = self.store.path
+        if self.store.created:
+            print(f"{Fore.GREEN}Base de assinaturas atualizada criada")
+    
+    def lookup(self, file_hash):
+        """Nome da ameaça associada ao hash, ou None"""
+        return self.store.lookup(file_hash)
+    
+    def patterns(self):
+        return self.store.patterns()
+    
+    def count(self):
+        return self.store.count()
+    
+    def meta(self):
+        return self.store.meta()
+    
+    def add_signature(self, file_hash, threat_name):
+        updated_at = datetime.now().isoformat()
+        self.store.add(file_hash, threat_name, updated_at)
+        self.changelog.append(file_hash, threat_name, updated_at)
+        self.invalidate_cache()
+    
+    def apply_changes(self, changes):
+        """Aplica alterações recebidas do primário, na ordem (também entram no log local)"""
+        for is_delete, group in groupby(changes, key=lambda c: c.get('op') == 'delete_range'):
+            group = list(group)
+            if is_delete:
+                for change in group:
+                    self.store.delete_range(change['start'], change['end'])
+                    self.changelog.append_delete(change['start'], change['end'], change['updated_at'])
+                continue
+            self.store.add_batch([(c['hash'], c['threat_name']) for c in group], group[-1]['updated_at'])
+            for change in group:
+                self.changelog.append(change['hash'], change['threat_name'], change['updated_at'])
+        self.invalidate_cache()
+    
+    def reset(self, database):
+        """Substitui a base pelo snapshot do primário (novo epoch para quem segue esta réplica)"""
+        self.store.reset(database)
+        self.changelog.new_epoch()
+        self.invalidate_cache()
+    
+    def import_signatures(self, items):
+        """Recebe uma faixa de outro shard (entra no log para as réplicas deste nó)"""
+        if not items:
+            return
+        updated_at = datetime.now().isoformat()
+        self.store.add_batch(items, updated_at)
+        for file_hash, threat_name in items:
+            self.changelog.append(file_hash, threat_name, updated_at)
+        self.invalidate_cache()
+    
+    def export_range(self, start, end):
+        return self.store.export_range(start, end)
+    
+    def delete_range(self, start, end):
+        """Remove uma faixa entregue a outro shard (entra no log para as réplicas deste nó)"""
+        deleted = self.store.delete_range(start, end)
+        self.changelog.append_delete(start, end, datetime.now().isoformat())
+        self.invalidate_cache()
+        return deleted
+    
+    def serialized(self):
+        """Corpo JSON de /signatures, serializado novamente só após uma atualização"""
+        body = self._serialized
+        if body is None:
+            self.cache_stats['signatures_body']['misses'] += 1
+            if self.count() > self.EXPORT_CACHE_LIMIT:
+                return self.store.export_chunks()
+            body = b''.join(self.store.export_chunks())
+            self._serialized = body
         else:
-            self.create_updated_database()
-    
-    def create_updated_database(self):
-        """Cria uma base de assinaturas atualizada"""
-        self.database = {
-            '_last_update': datetime.now().isoformat(),
-            '_version': '2.5',
-            'malware': {
-                # Mesmas assinaturas antigas
-                'd41d8cd98f00b204e9800998ecf8427e': 'Empty.File.Test',
-                '5d41402abc4b2a76b9719d911017c592': 'Test.Malware.Hello',
-                '7d793037a0760186574b0282f2f435e7': 'Trojan.WorldVirus',
-                '098f6bcd4621d373cade4e832627b4f6': 'Generic.Malware.Test',
-                
-                # Novas assinaturas (zero-day)
-                '5eb63bbbe01eeed093cb22bb8f5acdc3': 'Trojan.Ransomware.2024',
-                '2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae': 'Worm.CryptoMiner.New',
-                'ad57366865126e55649ecb23ae1d48887544976efea46a48eb5d85a6eeb4d306': 'Virus.ZeroDay.Critical',
-            },
-            'suspicious_patterns': [
-                'eval(',
-                'exec(',
-                'system(',
-                '__import__',
-                'os.system',
-                'subprocess.call',
-                'base64.b64decode',
-                'socket.connect',
-                'requests.post'
-            ],
-            'behavioral_rules': [
-                {
-                    'name': 'Multiple File Access',
-                    'description': 'Acesso rápido a múltiplos arquivos',
-                    'severity': 'high'
-                },
-                {
-                    'name': 'Network Connection',
-                    'description': 'Tentativa de conexão externa',
-                    'severity': 'medium'
-                }
-            ]
-        }
-        
-        with open(self.db_file, 'w') as f:
-            json.dump(self.database, f, indent=2)
-        
-        print(f"{Fore.GREEN}Base de assinaturas atualizada criada")
+            self.cache_stats['signatures_body']['hits'] += 1
+        return body
+    
+    def invalidate_cache(self):
+        self._serialized = None
 
 # Instância global
 signatures_db = SignaturesDB()
 
+# Preenchido em main() quando o servidor roda como réplica (--replica-of)
+replica = None
+
+class ShardUnavailable(Exception):
+    """O shard dono de um digest não respondeu à consulta repassada"""
+    
+    def __init__(self, owner, error):
+        super().__init__(f'Shard {owner} indisponível: {error}')
+        self.owner = owner
+
+# Preenchidos em main() no modo particionado (--shard-nodes)
+shard_ring = None
+shard_self = None
+shard_session = requests.Session()
+shard_stats = {'forwarded_lookups': 0, 'forward_errors': 0}
+
+def owns(file_hash):
+    return shard_ring is None or shard_ring.owner(file_hash) == shard_self
+
+def resolve_threat(file_hash):
+    """Consulta o hash na base local ou, se outro shard é o dono, repassa a consulta a ele"""
+    if owns(file_hash):
+        return signatures_db.lookup(file_hash)
+    owner = shard_ring.owner(file_hash)
+    shard_stats['forwarded_lookups'] += 1
+    try:
+        response = shard_session.get(f'{owner}/shard/lookup', params={'hash': file_hash}, timeout=5)
+        response.raise_for_status()
+        return response.json()['threat']
+    except Exception as e:
+        shard_stats['forward_errors'] += 1
+        logger.error('Falha ao consultar shard', owner=owner, error=e)
+        raise ShardUnavailable(owner, e)
+
+def gather_range(start, end):
+    """Assinaturas em [start, end) do anel; faixas de outros shards vêm do /shard/export do dono.
+    
+    Retorna (pares (digest, nome), True se tudo veio da base local).
+    """
+    if shard_ring is None:
+        return signatures_db.export_range(start, end), True
+    items, local = [], True
+    for range_start, range_end, node in shard_ring.ranges():
+        range_start, range_end = max(range_start, start), min(range_end, end)
+        if range_start >= range_end:
+            continue
+        if node == shard_self:
+            items.extend(signatures_db.export_range(range_start, range_end))
+            continue
+        local = False
+        shard_stats['forwarded_lookups'] += 1
+        try:
+            response = shard_session.get(f'{node}/shard/export', params={'start': range_start, 'end': range_end},
+                                         timeout=5)
+            response.raise_for_status()
+        except Exception as e:
+            shard_stats['forward_errors'] += 1
+            logger.error('Falha ao consultar shard', owner=node, error=e)
+            raise ShardUnavailable(node, e)
+        items.extend(response.json()['items'].items())
+    return items, local
+
+def shard_status():
+    if shard_ring is None:
+        return None
+    return {
+        'self': shard_self,
+        **shard_ring.config(),
+        'owned_fraction': round(shard_ring.ownership().get(shard_self, 0.0), 6),
+        **shard_stats
+    }
+
+def replication_status():
+    if replica is not None:
+        return replica.status()
+    return {'role': 'primary', 'epoch': signatures_db.changelog.epoch, 'seq': signatures_db.changelog.seq}
+
+def collect_server_metrics():
+    """Métricas lidas do estado do servidor no momento do scrape"""
+    meta = signatures_db.meta()
+    stats = signatures_db.stats
+    families = [
+        ('av_signatures_total', 'gauge', 'Assinaturas de malware na base',
+         {(): signatures_db.count()}),
+        ('av_suspicious_patterns_total', 'gauge', 'Padrões suspeitos na base',
+         {(): len(signatures_db.patterns())}),
+        ('av_signature_db_info', 'gauge', 'Versão, backend e última atualização da base',
+         {(('version', meta['_version']), ('backend', signatures_db.store.name),
+           ('last_update', meta['_last_update'] or '')): 1}),
+        ('av_scans_total', 'counter', 'Scans processados', {(): stats['total_scans']}),
+        ('av_threats_detected_total', 'counter', 'Ameaças detectadas', {(): stats['threats_detected']}),
+        ('av_range_lookups_total', 'counter', 'Consultas por prefixo de hash (/range)', {(): stats['range_lookups']}),
+        ('av_stream_rescans_total', 'counter', 'Arquivos já vistos em /scan analisados de novo por inteiro',
+         {(): stats['stream_rescans']}),
+        ('av_active_clients', 'gauge', 'Clientes distintos estimados por janela',
+         {(('window', name),): value for name, value in stats['clients_connected'].active().items()}),
+        ('av_log_events_dropped_total', 'counter', 'Eventos de log descartados pelo buffer',
+         {(): logger.stats['dropped']}),
+    ]
+    hits, misses, ratios = {}, {}, {}
+    for cache, counts in signatures_db.cache_stats.items():
+        label = (('cache', cache),)
+        total = counts['hits'] + counts['misses']
+        hits[label] = counts['hits']
+        misses[label] = counts['misses']
+        ratios[label] = counts['hits'] / total if total else 0.0
+    families.append(('av_cache_hits_total', 'counter', 'Acertos de cache', hits))
+    families.append(('av_cache_misses_total', 'counter', 'Faltas de cache', misses))
+    families.append(('av_cache_hit_ratio', 'gauge', 'Taxa de acerto de cache', ratios))
+    return families
+
+registry.register_collector(collect_server_metrics)
+
+def collect_admission_metrics():
+    snapshot = admission.snapshot()
+    return [
+        ('av_admission_queue_depth', 'gauge', 'Requisições aguardando vaga de execução',
+         {(): snapshot['waiting']}),
+        ('av_admission_running', 'gauge', 'Requisições de scan em execução', {(): snapshot['running']}),
+        ('av_admission_rejected_total', 'counter', 'Requisições rejeitadas com 429 por motivo',
+         {(('reason', reason),): snapshot[f'rejected_{reason}'] for reason in ('rate', 'queue', 'timeout')}),
+    ]
+
+registry.register_collector(collect_admission_metrics)
+
+def collect_replication_metrics():
+    status = replication_status()
+    families = [
+        ('av_replication_info', 'gauge', 'Papel do servidor na replicação',
+         {(('role', status['role']), ('epoch', status.get('epoch') or '')): 1}),
+        ('av_replication_seq', 'gauge', 'Última alteração registrada/aplicada',
+         {(): status.get('applied_seq', status.get('seq', 0))}),
+    ]
+    if status['role'] == 'replica':
+        families.append(('av_replication_lag_entries', 'gauge', 'Alterações do primário ainda não aplicadas',
+                         {(): status['lag_entries']}))
+        if status['lag_seconds'] is not None:
+            families.append(('av_replication_lag_seconds', 'gauge', 'Tempo desde a última sincronia completa',
+                             {(): status['lag_seconds']}))
+    return families
+
+registry.register_collector(collect_replication_metrics)
+
+def collect_shard_metrics():
+    status = shard_status()
+    if status is None:
+        return []
+    return [
+        ('av_shard_owned_fraction', 'gauge', 'Fração do anel de hashing sob responsabilidade deste nó',
+         {(('node', shard_self),): status['owned_fraction']}),
+        ('av_shard_nodes', 'gauge', 'Nós no anel de hashing', {(): len(status['nodes'])}),
+        ('av_shard_forwarded_lookups_total', 'counter', 'Consultas repassadas ao shard dono',
+         {(): status['forwarded_lookups']}),
+        ('av_shard_forward_errors_total', 'counter', 'Consultas repassadas que falharam',
+         {(): status['forward_errors']}),
+    ]
+
+registry.register_collector(collect_shard_metrics)
+
+def admission_controlled(view):
+    """Aplica fila limitada e token bucket do cliente; rejeita com 429 + Retry-After"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        client_id = request.args.get('client_id')
+        if client_id is None:
+            client_id = (request.get_json(silent=True) or {}).get('client_id', 'unknown')
+        admitted, retry_after, reason = admission.admit(client_id)
+        if not admitted:
+            logger.debug('Requisição rejeitada', client=client_id, reason=reason)
+            response = jsonify({'error': 'Servidor sobrecarregado', 'reason': reason,
+                                'retry_after': round(retry_after, 3)})
+            response.status_code = 429
+            response.headers['Retry-After'] = retry_after_header(retry_after)
+            return response
+        start = time.perf_counter()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release(time.perf_counter() - start)
+    return wrapper
+
+@app.before_request
+def metrics_start():
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_start = time.perf_counter()
+    http_in_flight.inc(g.metrics_route)
+
+@app.after_request
+def metrics_finish(response):
+    route = g.get('metrics_route', 'unmatched')
+    http_latency.observe(route, value=time.perf_counter() - g.get('metrics_start', time.perf_counter()))
+    http_requests.inc(route, request.method, str(response.status_code))
+    http_response_size.observe(route, value=response.content_length or 0)
+    return response
+
+@app.teardown_request
+def metrics_teardown(exc):
+    if 'metrics_route' in g:
+        http_in_flight.dec(g.pop('metrics_route'))
+
 @app.route('/health', methods=['GET'])
 def health():
     """Endpoint de saúde"""
+    meta = signatures_db.meta()
     return jsonify({
         'status': 'online',
-        'version': signatures_db.database.get('_version', '1.0'),
-        'last_update': signatures_db.database.get('_last_update'),
-        'total_signatures': len(signatures_db.database.get('malware', {}))
+        'version': meta['_version'],
+        'last_update': meta['_last_update'],
+        'total_signatures': signatures_db.count(),
+        'backend': signatures_db.store.name,
+        'role': 'replica' if replica is not None else 'primary',
+        'replication': replication_status(),
+        'shard': shard_status()
     })
 
 @app.route('/signatures', methods=['GET'])
 def get_signatures():
     """Retorna a base de assinaturas completa"""
     client_id = request.args.get('client_id', 'unknown')
-    signatures_db.stats['clients_connected'].add(client_id)
+    signatures_db.stats['clients_connected'].record(client_id)
     
-    print(f"{Fore.CYAN}Cliente {client_id} solicitou assinaturas")
+    logger.info('Cliente solicitou assinaturas', color=Fore.CYAN, client=client_id)
     
-    return jsonify(signatures_db.database)
+    return app.response_class(signatures_db.serialized(), mimetype='application/json')
 
-@app.route('/scan', methods=['POST'])
-def scan_file():
-    """Endpoint para scan de arquivo"""
-    data = request.json
-    file_hash = data.get('hash')
-    file_name = data.get('name', 'unknown')
-    client_id = data.get('client_id', 'unknown')
-    content_preview = data.get('content_preview', '')
+def build_verdict(file_hashes, find_patterns, file_name, client_id, rescan=False):
+    """Monta o resultado do scan: assinatura por hash primeiro, depois padrões suspeitos.
     
-    signatures_db.stats['total_scans'] += 1
-    signatures_db.stats['clients_connected'].add(client_id)
+    `rescan` marca o mesmo arquivo enviado de novo (prévia limpa em /scan, conteúdo
+    completo em /scan/stream): conta à parte para `total_scans` ser um por arquivo.
+    """
+    signatures_db.stats['stream_rescans' if rescan else 'total_scans'] += 1
+    signatures_db.stats['clients_connected'].record(client_id)
     
     result = {
         'clean': True,
         'threat': None,
         'severity': 'none',
+        'method': None,
         'recommendations': []
     }
     
     # Verificar hash
-    if file_hash in signatures_db.database.get('malware', {}):
-        threat_name = signatures_db.database['malware'][file_hash]
+    threat_name = None
+    for file_hash in file_hashes:
+        threat_name = resolve_threat(file_hash) if file_hash else None
+        if threat_name:
+            break
+    if threat_name:
         result['clean'] = False
         result['threat'] = threat_name
         result['severity'] = 'critical'
+        result['method'] = 'hash_signature'
         result['recommendations'].append('Deletar arquivo imediatamente')
         signatures_db.stats['threats_detected'] += 1
         
-        print(f"{Fore.RED}AMEAÇA DETECTADA: {file_name}")
-        print(f"   Cliente: {client_id}")
-        print(f"   Tipo: {threat_name}")
+        logger.warning('AMEAÇA DETECTADA', color=Fore.RED, file=file_name,
+                       client=client_id, threat=threat_name)
     
     # Verificar padrões suspeitos
-    elif content_preview:
-        for pattern in signatures_db.database.get('suspicious_patterns', []):
-            if pattern in content_preview:
-                result['clean'] = False
-                result['threat'] = 'Suspicious.Pattern'
-                result['severity'] = 'medium'
-                result['recommendations'].append(f'Padrão suspeito encontrado: {pattern}')
-                signatures_db.stats['threats_detected'] += 1
-                
-                print(f"{Fore.YELLOW}⚠ SUSPEITO: {file_name}")
-                print(f"   Cliente: {client_id}")
-                print(f"   Padrão: {pattern}")
+    else:
+        for pattern in find_patterns():
+            result['clean'] = False
+            result['threat'] = 'Suspicious.Pattern'
+            result['severity'] = 'medium'
+            result['method'] = 'pattern_matching'
+            result['recommendations'].append(f'Padrão suspeito encontrado: {pattern}')
+            signatures_db.stats['threats_detected'] += 1
+            
+            logger.warning('SUSPEITO', color=Fore.YELLOW, file=file_name,
+                           client=client_id, pattern=pattern)
     
     if result['clean']:
-        print(f"{Fore.GREEN}Limpo: {file_name} (Cliente: {client_id})")
+        logger.info('Limpo', sampled=True, file=file_name, client=client_id)
+    
+    return result
+
+def range_tag():
+    """Identifica a versão da base servida por /range: muda a cada atualização (e troca de anel)"""
+    meta = signatures_db.meta()
+    ring = shard_ring.config() if shard_ring is not None else None
+    key = json.dumps([meta['_version'], meta['_last_update'], ring], sort_keys=True)
+    return hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+@app.route('/range', methods=['GET'])
+def range_info():
+    """Versão atual, tamanhos de prefixo aceitos e padrões suspeitos para a consulta por faixa"""
+    response = jsonify({
+        'version': range_tag(),
+        'prefix_min': app.config['RANGE_PREFIX_MIN'],
+        'prefix_max': app.config['RANGE_PREFIX_MAX'],
+        'suspicious_patterns': signatures_db.patterns()
+    })
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/range/<prefix>', methods=['GET'])
+def range_lookup(prefix):
+    """Todos os digests conhecidos que começam pelo prefixo, sem saber qual arquivo o cliente tem.
+    
+    A resposta depende só do prefixo e da versão da base, então pode ser
+    guardada por qualquer cache HTTP: com `?v=<versão atual>` vai como
+    immutable; sem versão (ou com uma antiga) o cache precisa revalidar pelo
+    ETag. Sem client_id na URL, clientes diferentes compartilham as respostas.
+    """
+    prefix = prefix.lower()
+    if not (app.config['RANGE_PREFIX_MIN'] <= len(prefix) <= app.config['RANGE_PREFIX_MAX']) or \
+            any(c not in '0123456789abcdef' for c in prefix):
+        return jsonify({'error': 'Prefixo inválido',
+                        'prefix_min': app.config['RANGE_PREFIX_MIN'],
+                        'prefix_max': app.config['RANGE_PREFIX_MAX']}), 400
+    signatures_db.stats['range_lookups'] += 1
+    tag = range_tag()
+    items, local = gather_range(*prefix_range(prefix))
+    response = jsonify({
+        'prefix': prefix,
+        'version': tag,
+        # Só o restante de cada digest: o prefixo já está na URL
+        'matches': {d[len(prefix):]: threat for d, threat in items if d.startswith(prefix)}
+    })
+    response.cache_control.public = True
+    if request.args.get('v') == tag and local:
+        response.cache_control.max_age = 365 * 24 * 3600
+        response.cache_control.immutable = True
+    else:
+        # Faixa com partes de outros shards: a versão local não cobre mudanças neles
+        response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/scan', methods=['POST'])
+@admission_controlled
+def scan_file():
+    """Endpoint para scan de arquivo"""
+    data = request.json
+    file_hash = data.get('hash')
+    file_name = data.get('name', 'unknown')
+    client_id = data.get('client_id', 'unknown')
+    content_preview = data.get('content_preview', '')
+    
+    def find_patterns():
+        if not content_preview:
+            return []
+        return [p for p in signatures_db.patterns() if p in content_preview]
+    
+    return jsonify(build_verdict([file_hash], find_patterns, file_name, client_id))
+
+@app.route('/scan/batch', methods=['POST'])
+@admission_controlled
+def scan_batch():
+    """Vários scans em uma requisição (reconciliação da fila offline do cliente); resultados na mesma ordem"""
+    data = request.json or {}
+    client_id = data.get('client_id', 'unknown')
+    items = data.get('items', [])
+    if len(items) > app.config['MAX_BATCH_ITEMS']:
+        return jsonify({'error': 'Lote acima do limite', 'max_items': app.config['MAX_BATCH_ITEMS']}), 413
     
+    results = []
+    for item in items:
+        content_preview = item.get('content_preview', '')
+        
+        def find_patterns():
+            if not content_preview:
+                return []
+            return [p for p in signatures_db.patterns() if p in content_preview]
+        
+        results.append(build_verdict([item.get('hash')], find_patterns, item.get('name', 'unknown'), client_id))
+    return jsonify({'results': results})
+
+@app.route('/scan/stream', methods=['POST'])
+@admission_controlled
+def scan_stream():
+    """Scan do conteúdo completo enviado em streaming (corpo bruto, pode ser chunked)"""
+    file_name = request.args.get('name', 'unknown')
+    client_id = request.args.get('client_id', 'unknown')
+    rescan = request.args.get('rescan') == '1'
+    max_bytes = app.config['MAX_STREAM_BYTES']
+    
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({'error': 'Arquivo acima do limite de streaming', 'max_bytes': max_bytes}), 413
+    
+    scanner = StreamScanner(signatures_db.patterns())
+    while True:
+        chunk = request.stream.read(STREAM_CHUNK)
+        if not chunk:
+            break
+        scanner.update(chunk)
+        if scanner.size > max_bytes:
+            return jsonify({'error': 'Arquivo acima do limite de streaming', 'max_bytes': max_bytes}), 413
+    
+    result = build_verdict(scanner.digests(), lambda: scanner.matches, file_name, client_id, rescan)
+    result['bytes_scanned'] = scanner.size
     return jsonify(result)
 
+def framed_dispatch(opcode, payload, state):
+    """Atende quadros do listener TCP com a mesma lógica (e admissão) de /scan"""
+    if opcode != OP_SCAN:
+        raise ProtocolError(f'Opcode desconhecido: {opcode:#x}')
+    client_id = state['client_id']
+    admitted, retry_after, reason = admission.admit(client_id)
+    if not admitted:
+        raise ServerBusy(retry_after)
+    start = time.perf_counter()
+    try:
+        file_hash, file_name, preview = decode_scan_request(payload)
+        content_preview = preview.decode('utf-8', errors='ignore')
+        
+        def find_patterns():
+            if not content_preview:
+                return []
+            return [p for p in signatures_db.patterns() if p in content_preview]
+        
+        reply = encode_verdict(build_verdict([file_hash], find_patterns, file_name, client_id))
+    finally:
+        elapsed = time.perf_counter() - start
+        admission.release(elapsed)
+    http_latency.observe('tcp:scan', value=elapsed)
+    http_requests.inc('tcp:scan', 'FRAME', 'ok')
+    http_response_size.observe('tcp:scan', value=len(reply))
+    return OP_VERDICT, reply
+
 @app.route('/stats', methods=['GET'])
 def get_stats():
     """Retorna estatísticas do servidor"""
+    tracker = signatures_db.stats['clients_connected']
+    active = tracker.active()
+    top_clients = tracker.top_clients()
     return jsonify({
         'total_scans': signatures_db.stats['total_scans'],
         'threats_detected': signatures_db.stats['threats_detected'],
-        'active_clients': len(signatures_db.stats['clients_connected']),
-        'clients': list(signatures_db.stats['clients_connected'])
+        'range_lookups': signatures_db.stats['range_lookups'],
+        'stream_rescans': signatures_db.stats['stream_rescans'],
+        # Estimativas HyperLogLog: tamanho da resposta não cresce com o número de clientes
+        'active_clients': active['24h'],
+        'active_clients_windows': active,
+        'top_clients': top_clients,
+        'top_clients_window': tracker.top_window,
+        'clients': [c['client_id'] for c in top_clients],
+        'logging': dict(logger.stats),
+        'admission': admission.snapshot()
     })
 
+@app.route('/replication/changes', methods=['GET'])
+def replication_changes():
+    """Fluxo de alterações para réplicas (long-polling com ?since=seq&wait=segundos)"""
+    since = request.args.get('since', 0, type=int)
+    wait = min(request.args.get('wait', 0.0, type=float), 30.0)
+    return jsonify(signatures_db.changelog.since(since, wait))
+
+@app.route('/replication/status', methods=['GET'])
+def get_replication_status():
+    return jsonify(replication_status())
+
+@app.errorhandler(ShardUnavailable)
+def shard_unavailable(error):
+    return jsonify({'error': str(error), 'owner': error.owner}), 503
+
+def read_only_response():
+    if replica is not None:
+        return jsonify({'success': False, 'message': 'Réplica somente leitura',
+                        'primary': replica.primary_url}), 403
+    return None
+
+def ring_range():
+    return request.args.get('start', 0, type=int), request.args.get('end', RING_SIZE, type=int)
+
+@app.route('/shard/info', methods=['GET'])
+def shard_info():
+    """Configuração do anel, usada por clientes e pela ferramenta de rebalanceamento"""
+    status = shard_status()
+    if status is None:
+        return jsonify({'error': 'Servidor não particionado'}), 404
+    return jsonify(status)
+
+@app.route('/shard/lookup', methods=['GET'])
+def shard_lookup():
+    """Consulta só a base local (destino das consultas repassadas por outros shards)"""
+    file_hash = request.args.get('hash', '')
+    return jsonify({'hash': file_hash, 'threat': signatures_db.lookup(file_hash)})
+
+@app.route('/shard/export', methods=['GET'])
+def shard_export():
+    """Assinaturas locais em uma faixa [start, end) do anel"""
+    start, end = ring_range()
+    return jsonify({'start': start, 'end': end, 'items': dict(signatures_db.export_range(start, end))})
+
+@app.route('/shard/import', methods=['POST'])
+def shard_import():
+    denied = read_only_response()
+    if denied:
+        return denied
+    items = list((request.json or {}).get('items', {}).items())
+    signatures_db.import_signatures(items)
+    logger.info('Faixa de assinaturas importada', count=len(items))
+    return jsonify({'success': True, 'imported': len(items)})
+
+@app.route('/shard/delete', methods=['POST'])
+def shard_delete():
+    denied = read_only_response()
+    if denied:
+        return denied
+    start, end = ring_range()
+    deleted = signatures_db.delete_range(start, end)
+    logger.info('Faixa de assinaturas removida', start=start, end=end, count=deleted)
+    return jsonify({'success': True, 'deleted': deleted})
+
+@app.route('/shard/ring', methods=['POST'])
+def shard_set_ring():
+    """Troca o anel em execução (passo do rebalanceamento, depois da cópia das faixas)"""
+    global shard_ring
+    if shard_ring is None:
+        return jsonify({'error': 'Servidor não particionado'}), 404
+    data = request.json or {}
+    ring = HashRing(data.get('nodes', []), data.get('vnodes', shard_ring.vnodes))
+    if shard_self not in ring.nodes:
+        return jsonify({'error': f'{shard_self} não está no anel'}), 400
+    shard_ring = ring
+    logger.info('Anel de shards atualizado', nodes=len(ring.nodes), vnodes=ring.vnodes)
+    return jsonify(shard_status())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas no formato texto do Prometheus"""
+    return app.response_class(registry.render(), mimetype=metrics.CONTENT_TYPE)
+
 @app.route('/update', methods=['POST'])
 def update_signature():
     """Endpoint para adicionar novas assinaturas (simulação de atualização automática)"""
+    denied = read_only_response()
+    if denied:
+        return denied
+    
     data = request.json
     file_hash = data.get('hash')
     threat_name = data.get('threat_name')
     
     if file_hash and threat_name:
-        signatures_db.database['malware'][file_hash] = threat_name
-        signatures_db.database['_last_update'] = datetime.now().isoformat()
+        if not owns(file_hash):
+            # Escritas vão sempre ao dono, para que as réplicas dele recebam a alteração
+            return jsonify({'success': False, 'message': 'Hash pertence a outro shard',
+                            'owner': shard_ring.owner(file_hash)}), 421
+        try:
+            signatures_db.add_signature(file_hash, threat_name)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Hash inválido'}), 400
         
-        # Salvar
-        with open(signatures_db.db_file, 'w') as f:
-            json.dump(signatures_db.database, f, indent=2)
-        
-        print(f"{Fore.GREEN}✓ Nova assinatura adicionada: {threat_name}")
+        logger.info('Nova assinatura adicionada', threat=threat_name)
         return jsonify({'success': True, 'message': 'Assinatura adicionada'})
     
     return jsonify({'success': False, 'message': 'Dados inválidos'}), 400
 
+class _RequestBody:
+    """Resto do corpo da requisição atual: o que o werkzeug drena depois da resposta.
+
+    Com Content-Length nunca lê além dele; com chunked para no bloco final.
+    Assim o dreno não consome a próxima requisição da conexão.
+    """
+
+    def __init__(self, handler, stream, length=None):
+        self.handler = handler
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining is not None:
+            size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+            if size <= 0:
+                return b''
+        try:
+            data = self.stream.read(size)
+        except OSError:
+            # Bloco chunked malformado: não dá para saber onde começa a próxima requisição
+            self.handler.close_connection = True
+            return b''
+        if self.remaining is not None:
+            self.remaining -= len(data)
+            if not data:
+                self.remaining = 0
+        return data
+
+    def readline(self, size=-1):
+        if self.remaining is not None:
+            size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+            if size <= 0:
+                return b''
+        line = self.stream.readline(size)
+        if self.remaining is not None:
+            self.remaining -= len(line)
+        return line
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """Handler do werkzeug com conexões persistentes.
+
+    O app.run com threads já fala HTTP/1.1, mas o `run_wsgi` manda
+    `Connection: close` em toda resposta e depois drena o socket por 10ms,
+    o que engoliria a próxima requisição da mesma conexão. Aqui o dreno só
+    enxerga o corpo da requisição atual e o cabeçalho de fechamento só sai
+    quando o próprio cliente pediu para fechar.
+    """
+
+    # Cabeçalhos e corpo saem em write() separados; com Nagle, o segundo espera o ACK atrasado
+    # do cliente (~40ms) em toda resposta de uma conexão reaproveitada
+    disable_nagle_algorithm = True
+
+    def make_environ(self):
+        environ = super().make_environ()
+        if environ.get('wsgi.input_terminated'):
+            # Corpo chunked: o werkzeug já envolveu o socket com DechunkedInput
+            body = _RequestBody(self, environ['wsgi.input'])
+        else:
+            body = _RequestBody(self, self.rfile, int(environ.get('CONTENT_LENGTH') or 0))
+            environ['wsgi.input'] = body
+        self.rfile = body
+        return environ
+
+    def run_wsgi(self):
+        rfile = self.rfile
+        try:
+            super().run_wsgi()
+        finally:
+            self.rfile = rfile
+
+    def send_header(self, keyword, value):
+        # Toda resposta tem Content-Length ou vai em chunked (HTTP/1.1): o fim é conhecido sem fechar
+        if keyword.lower() == 'connection' and value.lower() == 'close' and not self.close_connection:
+            return
+        super().send_header(keyword, value)
+
+
 def main():
+    import argparse
+    import logging
+    global logger, signatures_db, admission, replica, shard_ring, shard_self
+
+    parser = argparse.ArgumentParser(description='Servidor do antivírus distribuído')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--tcp-port', type=int, default=5001,
+                        help='Porta do protocolo TCP binário com quadros (0 desativa)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    parser.add_argument('--log-sample-clean', type=float, default=1.0,
+                        help='Fração dos eventos "Limpo" registrados (0.0 a 1.0)')
+    parser.add_argument('--log-buffer', type=int, default=10000,
+                        help='Capacidade do buffer circular de logs')
+    parser.add_argument('--backend', default='json', choices=sorted(BACKENDS),
+                        help='Armazenamento das assinaturas (sqlite para bases maiores que a RAM)')
+    parser.add_argument('--db', default=None, help='Caminho do arquivo da base (padrão ao lado do servidor)')
+    parser.add_argument('--max-stream-mb', type=int, default=256,
+                        help='Tamanho máximo aceito em /scan/stream')
+    parser.add_argument('--max-concurrent', type=int, default=32,
+                        help='Scans executando ao mesmo tempo')
+    parser.add_argument('--max-queue', type=int, default=64,
+                        help='Scans aguardando vaga antes de responder 429')
+    parser.add_argument('--queue-timeout', type=float, default=2.0,
+                        help='Espera máxima na fila, em segundos')
+    parser.add_argument('--client-rate', type=float, default=50.0,
+                        help='Scans por segundo permitidos por cliente (0 desativa)')
+    parser.add_argument('--client-burst', type=int, default=100,
+                        help='Rajada máxima do token bucket de cada cliente')
+    parser.add_argument('--replica-of', default=None, metavar='URL',
+                        help='Roda como réplica somente leitura do primário informado')
+    parser.add_argument('--top-clients', type=int, default=10,
+                        help='Tamanho do top-K de clientes mais ativos em /stats (0 desativa)')
+    parser.add_argument('--shard-nodes', default=None, metavar='URL,URL,...',
+                        help='Modo particionado: URLs de todos os nós do anel de hashing')
+    parser.add_argument('--shard-self', default=None, metavar='URL',
+                        help='URL deste nó no anel (padrão http://localhost:PORTA)')
+    parser.add_argument('--shard-vnodes', type=int, default=64,
+                        help='Nós virtuais por servidor no anel')
+    args = parser.parse_args()
+
+    # O log de acesso do werkzeug escreve de forma síncrona a cada requisição
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    logger.close()
+    logger = AsyncLogger(level=args.log_level, capacity=args.log_buffer,
+                         clean_sample_rate=args.log_sample_clean)
+    if (args.replica_of or args.shard_nodes) and not args.db:
+        # Réplicas e shards na mesma máquina não podem compartilhar o arquivo do primário
+        suffix = '.json' if args.backend == 'json' else '.sqlite3'
+        kind = 'replica' if args.replica_of else 'shard'
+        args.db = str(Path(__file__).parent / f'signatures_db.{kind}-{args.port}{suffix}')
+    if args.backend != 'json' or args.db:
+        signatures_db = SignaturesDB(args.backend, args.db)
+    signatures_db.stats['clients_connected'] = ClientActivityTracker(top_k=args.top_clients)
+    app.config['MAX_STREAM_BYTES'] = args.max_stream_mb * 1024 * 1024
+    admission = AdmissionController(max_concurrent=args.max_concurrent, max_queue=args.max_queue,
+                                    queue_timeout=args.queue_timeout, client_rate=args.client_rate,
+                                    client_burst=args.client_burst)
+
     print(f"{Fore.CYAN}{'='*70}")
     print(f"{Fore.CYAN}SERVIDOR ANTIVÍRUS DISTRIBUÍDO")
     print(f"{Fore.CYAN}{'='*70}\n")
-    print(f"{Fore.GREEN}Servidor iniciado em http://localhost:5000")
-    print(f"{Fore.GREEN}Base de assinaturas: {len(signatures_db.database.get('malware', {}))} assinaturas")
-    print(f"{Fore.GREEN}Última atualização: {signatures_db.database.get('_last_update')}\n")
+    print(f"{Fore.GREEN}Servidor iniciado em http://localhost:{args.port}")
+    print(f"{Fore.GREEN}Base de assinaturas: {signatures_db.count()} assinaturas ({signatures_db.store.name})")
+    print(f"{Fore.GREEN}Última atualização: {signatures_db.meta()['_last_update']}\n")
+    if args.replica_of:
+        replica = ReplicaFollower(args.replica_of, signatures_db, logger)
+        replica.start()
+        print(f"{Fore.GREEN}Modo réplica: acompanhando {args.replica_of}")
+    if args.shard_nodes:
+        shard_self = (args.shard_self or f'http://localhost:{args.port}').rstrip('/')
+        shard_ring = HashRing(args.shard_nodes.split(','), args.shard_vnodes)
+        if shard_self not in shard_ring.nodes:
+            parser.error(f'--shard-self {shard_self} não está em --shard-nodes')
+        if signatures_db.store.created:
+            # Base nova semeada com o padrão: cada nó fica só com as suas faixas
+            for start, end, owner in shard_ring.ranges():
+                if owner != shard_self:
+                    signatures_db.delete_range(start, end)
+        share = shard_ring.ownership()[shard_self]
+        print(f"{Fore.GREEN}Modo particionado: {len(shard_ring.nodes)} nós, {share:.1%} do espaço de hashes")
+    if args.tcp_port:
+        FramedServer((args.host, args.tcp_port), framed_dispatch).start_background()
+        print(f"{Fore.GREEN}Protocolo TCP com quadros em localhost:{args.tcp_port}")
     print(f"{Fore.YELLOW}Aguardando conexões de clientes...\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    app.run(host=args.host, port=args.port, debug=False, threaded=True, request_handler=KeepAliveRequestHandler)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,101 @@
+# Conjunto de servidores do cliente/Distribui leituras entre primário e réplicas saudáveis e faz failover
+
+
+import time
+import threading
+
+
+class ServerPool:
+    """Servidores conhecidos pelo cliente, com estado de saúde de cada um.
+
+    Leituras (/scan, /signatures) giram entre os servidores saudáveis; um
+    servidor que falha fica em quarentena por `cooldown` segundos e réplicas
+    com atraso acima de `max_lag_entries` deixam de receber leituras.
+    """
+
+    def __init__(self, urls, cooldown=5.0, max_lag_entries=1000):
+        self.cooldown = cooldown
+        self.max_lag_entries = max_lag_entries
+        self.servers = []
+        self.lock = threading.Lock()
+        self.cursor = 0
+        self.stats = {'failovers': 0}
+        for url in urls:
+            self.add(url)
+
+    def add(self, url):
+        """Inclui um servidor descoberto depois (ex.: nós do anel de shards)"""
+        url = url.rstrip('/')
+        with self.lock:
+            if self._get(url) is None:
+                self.servers.append({
+                    'url': url,
+                    'role': None,
+                    'healthy': True,
+                    'failures': 0,
+                    'retry_at': 0.0,
+                    'requests': 0,
+                    'lag_entries': 0
+                })
+
+    def _get(self, url):
+        for server in self.servers:
+            if server['url'] == url:
+                return server
+        return None
+
+    @property
+    def primary(self):
+        """URL do primário (o primeiro servidor, se nenhum se declarou primário)"""
+        for server in self.servers:
+            if server['role'] == 'primary':
+                return server['url']
+        return self.servers[0]['url']
+
+    def candidates(self):
+        """Ordem de tentativa para uma leitura: saudáveis em rodízio, depois os em quarentena vencida"""
+        now = time.monotonic()
+        with self.lock:
+            start = self.cursor
+            self.cursor = (self.cursor + 1) % len(self.servers)
+            rotated = self.servers[start:] + self.servers[:start]
+            healthy = [s for s in rotated if s['healthy'] and s['lag_entries'] <= self.max_lag_entries]
+            recovering = [s for s in rotated if not s['healthy'] and s['retry_at'] <= now]
+            rest = [s for s in rotated if s not in healthy and s not in recovering]
+        return [s['url'] for s in healthy + recovering + rest]
+
+    def available(self, url):
+        """Servidor saudável ou com a quarentena já vencida"""
+        with self.lock:
+            server = self._get(url)
+            return server is None or server['healthy'] or server['retry_at'] <= time.monotonic()
+
+    def mark_success(self, url):
+        with self.lock:
+            server = self._get(url)
+            if server:
+                server['healthy'] = True
+                server['failures'] = 0
+                server['requests'] += 1
+
+    def mark_failure(self, url):
+        with self.lock:
+            server = self._get(url)
+            if server:
+                server['healthy'] = False
+                server['failures'] += 1
+                server['retry_at'] = time.monotonic() + self.cooldown * min(server['failures'], 6)
+                self.stats['failovers'] += 1
+
+    def update_health(self, url, info):
+        """Atualiza papel e atraso de replicação a partir da resposta de /health"""
+        replication = info.get('replication') or {}
+        with self.lock:
+            server = self._get(url)
+            if server:
+                server['role'] = info.get('role', 'primary')
+                server['lag_entries'] = replication.get('lag_entries') or 0
+
+    def summary(self):
+        with self.lock:
+            return [dict(s) for s in self.servers]
@@ -0,0 +1,146 @@
+# Particionamento por hashing consistente/Anel com nós virtuais que divide o espaço de digests entre servidores
+
+
+import bisect
+import hashlib
+
+# Posições no anel são inteiros de 64 bits
+RING_SIZE = 2 ** 64
+
+
+def key_position(digest):
+    """Posição de uma assinatura no anel: os primeiros 8 bytes do próprio digest.
+
+    Digests MD5/SHA-256 já são uniformes, então cada faixa do anel é também uma
+    faixa contígua de chaves (e de BLOBs no SQLite, ver `position_bound`).
+    Digests hexadecimais com menos de 8 bytes são completados com zeros à
+    direita; valores que não são hexadecimais (só o backend JSON os aceita)
+    caem em uma posição derivada do MD5 do texto.
+    """
+    try:
+        raw = bytes.fromhex(digest)
+    except (TypeError, ValueError):
+        return int.from_bytes(hashlib.md5(str(digest).encode('utf-8')).digest()[:8], 'big')
+    return int.from_bytes(raw[:8].ljust(8, b'\0'), 'big')
+
+
+def position_bound(position):
+    """Menor digest binário com a posição `position` (os 8 bytes sem os zeros finais).
+
+    Comparar BLOBs com ele equivale a comparar posições: `digest >= bound` se e
+    só se `key_position(digest) >= position`, inclusive para digests curtos
+    (o SQLite ordena um BLOB prefixo de outro antes dele).
+    """
+    return position.to_bytes(8, 'big').rstrip(b'\0')
+
+
+def prefix_range(prefix):
+    """Faixa [início, fim) do anel com exatamente os digests que começam por `prefix` (até 16 dígitos hex)"""
+    shift = 64 - 4 * len(prefix)
+    start = int(prefix, 16) << shift
+    return start, start + (1 << shift)
+
+
+def _vnode_position(node, index):
+    return int.from_bytes(hashlib.md5(f'{node}#{index}'.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Anel de hashing consistente; cada nó ocupa `vnodes` pontos do anel.
+
+    Um nó é dono das chaves entre o ponto anterior (exclusivo) e cada um dos
+    seus pontos (inclusivo). Todos os participantes montam o mesmo anel a
+    partir da mesma lista de nós e do mesmo `vnodes`.
+    """
+
+    def __init__(self, nodes=(), vnodes=64):
+        self.vnodes = vnodes
+        self.nodes = []
+        self.points = []
+        self.owners = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node):
+        node = node.rstrip('/')
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        self._rebuild()
+
+    def remove_node(self, node):
+        node = node.rstrip('/')
+        if node in self.nodes:
+            self.nodes.remove(node)
+            self._rebuild()
+
+    def _rebuild(self):
+        points = sorted((_vnode_position(node, i), node) for node in self.nodes for i in range(self.vnodes))
+        self.points = [p for p, _ in points]
+        self.owners = [n for _, n in points]
+
+    def owner(self, digest):
+        """Nó responsável pelo digest"""
+        if not self.points:
+            raise LookupError('Anel sem nós')
+        index = bisect.bisect_left(self.points, key_position(digest))
+        return self.owners[index % len(self.points)]
+
+    def ranges(self):
+        """Faixas [início, fim) do anel e o dono de cada uma, em ordem de posição"""
+        if not self.points:
+            return []
+        result = []
+        previous = 0
+        for point, node in zip(self.points, self.owners):
+            if point + 1 > previous:
+                result.append((previous, point + 1, node))
+            previous = point + 1
+        # Depois do último ponto o anel volta para o primeiro nó
+        if previous < RING_SIZE:
+            result.append((previous, RING_SIZE, self.owners[0]))
+        return result
+
+    def ranges_of(self, node):
+        return [(start, end) for start, end, owner in self.ranges() if owner == node.rstrip('/')]
+
+    def ownership(self):
+        """Fração do espaço de chaves de cada nó"""
+        shares = {node: 0 for node in self.nodes}
+        for start, end, node in self.ranges():
+            shares[node] += end - start
+        return {node: share / RING_SIZE for node, share in shares.items()}
+
+    def config(self):
+        return {'nodes': list(self.nodes), 'vnodes': self.vnodes}
+
+
+def plan_rebalance(old_ring, new_ring):
+    """Faixas que mudam de dono entre dois anéis: lista de (início, fim, origem, destino).
+
+    Só as faixas afetadas aparecem; adicionar um nó a N nós move cerca de 1/(N+1)
+    do espaço de chaves, todo ele em direção ao nó novo.
+    """
+    boundaries = sorted({0, RING_SIZE}
+                        | {s for s, _, _ in old_ring.ranges()} | {s for s, _, _ in new_ring.ranges()})
+    old_ranges = old_ring.ranges()
+    new_ranges = new_ring.ranges()
+    moves = []
+    i = j = 0
+    for start, end in zip(boundaries, boundaries[1:]):
+        while old_ranges[i][1] <= start:
+            i += 1
+        while new_ranges[j][1] <= start:
+            j += 1
+        source, target = old_ranges[i][2], new_ranges[j][2]
+        if source == target:
+            continue
+        if moves and moves[-1][1] == start and moves[-1][2:] == (source, target):
+            moves[-1] = (moves[-1][0], end, source, target)
+        else:
+            moves.append((start, end, source, target))
+    return moves
+
+
+def moved_fraction(moves):
+    return sum(end - start for start, end, _, _ in moves) / RING_SIZE
@@ -0,0 +1,338 @@
+# Backends de armazenamento de assinaturas/JSON em memória (padrão) ou SQLite para bases maiores que a RAM
+
+
+import json
+import time
+import bisect
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from sharding import key_position, position_bound, RING_SIZE
+
+
+def default_database():
+    """Base de assinaturas atualizada usada quando nenhum arquivo existe"""
+    return {
+        '_last_update': datetime.now().isoformat(),
+        '_version': '2.5',
+        'malware': {
+            # Mesmas assinaturas antigas
+            'd41d8cd98f00b204e9800998ecf8427e': 'Empty.File.Test',
+            '5d41402abc4b2a76b9719d911017c592': 'Test.Malware.Hello',
+            '7d793037a0760186574b0282f2f435e7': 'Trojan.WorldVirus',
+            '098f6bcd4621d373cade4e832627b4f6': 'Generic.Malware.Test',
+
+            # Novas assinaturas (zero-day)
+            '5eb63bbbe01eeed093cb22bb8f5acdc3': 'Trojan.Ransomware.2024',
+            '2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae': 'Worm.CryptoMiner.New',
+            'ad57366865126e55649ecb23ae1d48887544976efea46a48eb5d85a6eeb4d306': 'Virus.ZeroDay.Critical',
+        },
+        'suspicious_patterns': [
+            'eval(',
+            'exec(',
+            'system(',
+            '__import__',
+            'os.system',
+            'subprocess.call',
+            'base64.b64decode',
+            'socket.connect',
+            'requests.post'
+        ],
+        'behavioral_rules': [
+            {
+                'name': 'Multiple File Access',
+                'description': 'Acesso rápido a múltiplos arquivos',
+                'severity': 'high'
+            },
+            {
+                'name': 'Network Connection',
+                'description': 'Tentativa de conexão externa',
+                'severity': 'medium'
+            }
+        ]
+    }
+
+
+class JsonSignatureStore:
+    """Base inteira em um dict carregado de signatures_db.json"""
+
+    name = 'json'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.created = False
+        # (posição no anel, digest) ordenados, montado na primeira consulta por faixa
+        self._positions = None
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.database = json.load(f)
+        else:
+            self.database = default_database()
+            self.save()
+            self.created = True
+
+    def save(self):
+        self._positions = None
+        with open(self.path, 'w') as f:
+            json.dump(self.database, f, indent=2)
+
+    def lookup(self, digest):
+        return self.database.get('malware', {}).get(digest)
+
+    def add(self, digest, threat_name, updated_at):
+        self.database.setdefault('malware', {})[digest] = threat_name
+        self.database['_last_update'] = updated_at
+        self.save()
+
+    def add_batch(self, items, updated_at):
+        """Aplica vários pares (digest, nome) gravando o arquivo uma única vez"""
+        self.database.setdefault('malware', {}).update(items)
+        self.database['_last_update'] = updated_at
+        self.save()
+
+    def reset(self, database):
+        """Substitui a base inteira (snapshot de réplica)"""
+        self.database = database
+        self.save()
+
+    def count(self):
+        return len(self.database.get('malware', {}))
+
+    def patterns(self):
+        return self.database.get('suspicious_patterns', [])
+
+    def meta(self):
+        return {
+            '_version': self.database.get('_version', '1.0'),
+            '_last_update': self.database.get('_last_update')
+        }
+
+    def export_chunks(self):
+        yield json.dumps(self.database).encode('utf-8')
+
+    def export_range(self, start, end):
+        """Pares (digest, nome) com posição no anel em [start, end), por busca binária no índice ordenado"""
+        malware = self.database.get('malware', {})
+        positions = self._positions
+        if positions is None:
+            positions = self._positions = sorted((key_position(d), d) for d in malware)
+        first = bisect.bisect_left(positions, (start,))
+        last = bisect.bisect_left(positions, (end,), lo=first)
+        return [(d, malware[d]) for _, d in positions[first:last] if d in malware]
+
+    def delete_range(self, start, end):
+        malware = self.database.get('malware', {})
+        doomed = [d for d, _ in self.export_range(start, end)]
+        for digest in doomed:
+            del malware[digest]
+        if doomed:
+            self.save()
+        return len(doomed)
+
+    def close(self):
+        pass
+
+
+class SqliteSignatureStore:
+    """Assinaturas em SQLite (modo WAL) com o digest como chave primária indexada.
+
+    Cada thread usa sua própria conexão; o módulo sqlite3 mantém as consultas
+    compiladas em cache por conexão, então `LOOKUP_SQL` é preparado uma vez só.
+    Vários processos do servidor podem compartilhar o mesmo arquivo.
+    """
+
+    name = 'sqlite'
+
+    LOOKUP_SQL = 'SELECT threat FROM signatures WHERE digest = ?'
+
+    # COUNT(*) percorre a tabela inteira; o valor é reaproveitado por alguns segundos
+    COUNT_TTL = 5.0
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS signatures (
+            digest BLOB PRIMARY KEY,
+            threat TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path, cache_mb=64, seed=True):
+        self.path = Path(path)
+        self.cache_mb = cache_mb
+        self.local = threading.local()
+        self.created = not self.path.exists()
+        conn = self.connection()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+        self._patterns = None
+        self._count = (0.0, None)
+        if self.created and seed:
+            self.import_database(default_database())
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, cached_statements=256)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA cache_size=-{self.cache_mb * 1024}')
+            conn.execute('PRAGMA mmap_size=268435456')
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def encode_digest(digest):
+        """Digests hexadecimais viram BLOB (metade do tamanho); outros valores são inválidos"""
+        try:
+            return bytes.fromhex(digest)
+        except (TypeError, ValueError):
+            return None
+
+    def lookup(self, digest):
+        key = self.encode_digest(digest)
+        if key is None:
+            return None
+        row = self.connection().execute(self.LOOKUP_SQL, (key,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, digest, threat_name, updated_at):
+        key = self.encode_digest(digest)
+        if key is None:
+            raise ValueError(f'Digest inválido: {digest!r}')
+        conn = self.connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO signatures (digest, threat) VALUES (?, ?)', (key, threat_name))
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('_last_update', updated_at))
+        self._count = (0.0, None)
+
+    def add_batch(self, items, updated_at):
+        self.add_many(items)
+        conn = self.connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('_last_update', updated_at))
+
+    def reset(self, database):
+        """Substitui a base inteira (snapshot de réplica)"""
+        conn = self.connection()
+        with conn:
+            conn.execute('DELETE FROM signatures')
+        self.import_database(database)
+
+    def add_many(self, items, batch_size=50000):
+        """Insere pares (digest, nome) em transações de `batch_size` linhas"""
+        conn = self.connection()
+        batch = []
+        total = 0
+        for digest, threat_name in items:
+            key = self.encode_digest(digest)
+            if key is None:
+                continue
+            batch.append((key, threat_name))
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany('INSERT OR REPLACE INTO signatures (digest, threat) VALUES (?, ?)', batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO signatures (digest, threat) VALUES (?, ?)', batch)
+            total += len(batch)
+        self._count = (0.0, None)
+        return total
+
+    def import_database(self, database):
+        """Importa um dict no formato de signatures_db.json; retorna o número de assinaturas"""
+        conn = self.connection()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+                ('_version', str(database.get('_version', '1.0'))),
+                ('_last_update', database.get('_last_update') or datetime.now().isoformat()),
+                ('suspicious_patterns', json.dumps(database.get('suspicious_patterns', []))),
+                ('behavioral_rules', json.dumps(database.get('behavioral_rules', [])))
+            ])
+        self._patterns = None
+        return self.add_many(database.get('malware', {}).items())
+
+    def _meta_value(self, key, default=None):
+        row = self.connection().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def count(self):
+        checked_at, value = self._count
+        if value is None or time.monotonic() - checked_at > self.COUNT_TTL:
+            value = self.connection().execute('SELECT COUNT(*) FROM signatures').fetchone()[0]
+            self._count = (time.monotonic(), value)
+        return value
+
+    def patterns(self):
+        if self._patterns is None:
+            self._patterns = json.loads(self._meta_value('suspicious_patterns', '[]'))
+        return self._patterns
+
+    def meta(self):
+        return {
+            '_version': self._meta_value('_version', '1.0'),
+            '_last_update': self._meta_value('_last_update')
+        }
+
+    def export_chunks(self, batch_size=10000):
+        """Gera o JSON de /signatures em pedaços, sem montar a base inteira em memória"""
+        meta = self.meta()
+        yield (json.dumps({'_last_update': meta['_last_update'], '_version': meta['_version']})[:-1]
+               + ', "malware": {').encode('utf-8')
+        cursor = self.connection().execute('SELECT digest, threat FROM signatures')
+        first = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            parts = [f'{json.dumps(digest.hex())}: {json.dumps(threat)}' for digest, threat in rows]
+            yield (('' if first else ', ') + ', '.join(parts)).encode('utf-8')
+            first = False
+        yield ('}, "suspicious_patterns": ' + json.dumps(self.patterns())
+               + ', "behavioral_rules": ' + self._meta_value('behavioral_rules', '[]') + '}').encode('utf-8')
+
+    @staticmethod
+    def _range_clause(start, end):
+        """A posição no anel são os 8 primeiros bytes do digest: a faixa vira comparação de BLOBs"""
+        clause, params = 'digest >= ?', [position_bound(start)]
+        if end < RING_SIZE:
+            clause += ' AND digest < ?'
+            params.append(position_bound(end))
+        return clause, params
+
+    def export_range(self, start, end):
+        clause, params = self._range_clause(start, end)
+        rows = self.connection().execute(f'SELECT digest, threat FROM signatures WHERE {clause}', params)
+        return [(digest.hex(), threat) for digest, threat in rows]
+
+    def delete_range(self, start, end):
+        clause, params = self._range_clause(start, end)
+        conn = self.connection()
+        with conn:
+            deleted = conn.execute(f'DELETE FROM signatures WHERE {clause}', params).rowcount
+        self._count = (0.0, None)
+        return deleted
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+BACKENDS = {
+    'json': (JsonSignatureStore, 'signatures_db.json'),
+    'sqlite': (SqliteSignatureStore, 'signatures_db.sqlite3')
+}
+
+
+def open_store(backend='json', path=None):
+    """Abre o backend pedido; sem `path`, usa o arquivo padrão ao lado do servidor"""
+    store_class, default_file = BACKENDS[backend]
+    return store_class(path or Path(__file__).parent / default_file)
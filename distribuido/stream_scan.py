@@ -0,0 +1,40 @@
+# Scan em streaming/Hash e busca de padrões aplicados pedaço a pedaço, sem manter o arquivo em memória
+
+
+import hashlib
+
+# Tamanho de leitura do corpo da requisição no servidor
+STREAM_CHUNK = 64 * 1024
+
+
+class StreamScanner:
+    """Calcula MD5/SHA-256 e procura padrões à medida que os pedaços chegam.
+
+    Os últimos `len(maior padrão) - 1` bytes de cada pedaço são mantidos para
+    que padrões divididos entre dois pedaços também sejam encontrados.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [(p, p.encode('utf-8')) for p in patterns]
+        self.overlap = max((len(raw) for _, raw in self.patterns), default=1) - 1
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+        self.tail = b''
+        self.size = 0
+        self.matches = []
+
+    def update(self, chunk):
+        self.md5.update(chunk)
+        self.sha256.update(chunk)
+        self.size += len(chunk)
+
+        if len(self.matches) < len(self.patterns):
+            window = self.tail + chunk
+            for pattern, raw in self.patterns:
+                if pattern not in self.matches and raw in window:
+                    self.matches.append(pattern)
+            self.tail = window[-self.overlap:] if self.overlap else b''
+
+    def digests(self):
+        """Digests calculados até agora (MD5 primeiro, como o cliente envia)"""
+        return [self.md5.hexdigest(), self.sha256.hexdigest()]
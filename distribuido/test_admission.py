@@ -0,0 +1,74 @@
+# Testes do controle de admissão/Reposição do token bucket, Retry-After e rejeição por fila
+
+
+import pytest
+
+from admission import TokenBucket, AdmissionController, retry_after_header
+
+
+def test_bucket_spends_burst_then_rejects_with_time_to_next_token():
+    bucket = TokenBucket(rate=10, burst=3)
+    t0 = bucket.updated
+    assert [bucket.try_acquire(t0)[0] for _ in range(3)] == [True, True, True]
+    ok, wait = bucket.try_acquire(t0)
+    assert not ok and wait == pytest.approx(0.1)
+    # 40ms depois: 0.4 ficha acumulada, faltam 0.6 → 60ms
+    ok, wait = bucket.try_acquire(t0 + 0.04)
+    assert not ok and wait == pytest.approx(0.06)
+
+
+def test_bucket_refills_at_rate_and_caps_at_burst():
+    bucket = TokenBucket(rate=10, burst=3)
+    t0 = bucket.updated
+    for _ in range(3):
+        bucket.try_acquire(t0)
+    assert bucket.try_acquire(t0 + 0.1) == (True, 0.0)
+    assert not bucket.try_acquire(t0 + 0.1)[0]
+    # Uma hora parado não acumula mais que o burst
+    later = t0 + 3600
+    assert [bucket.try_acquire(later)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_rate_rejection_reports_bucket_wait():
+    controller = AdmissionController(client_rate=2, client_burst=1)
+    assert controller.admit('a')[0]
+    controller.release(0.001)
+    ok, retry_after, reason = controller.admit('a')
+    assert not ok and reason == 'rate' and 0 < retry_after <= 0.5
+    # Outro cliente tem o próprio balde
+    assert controller.admit('b')[0]
+    assert controller.stats['rejected_rate'] == 1
+
+
+def test_queue_full_retry_after_from_backlog_and_service_time():
+    controller = AdmissionController(max_concurrent=2, max_queue=0, client_rate=0)
+    controller.service_time = 0.5
+    assert controller.admit('a')[0] and controller.admit('b')[0]
+    ok, retry_after, reason = controller.admit('c')
+    # 2 em execução × 0.5s / 2 vagas
+    assert (ok, reason) == (False, 'queue') and retry_after == pytest.approx(0.5)
+    controller.release(1.0)
+    assert controller.service_time == pytest.approx(0.9 * 0.5 + 0.1 * 1.0)
+    assert controller.admit('c')[0]
+
+
+def test_queue_timeout_rejects_waiting_request():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05, client_rate=0)
+    assert controller.admit('a')[0]
+    ok, retry_after, reason = controller.admit('b')
+    assert (ok, reason) == (False, 'timeout') and retry_after >= controller.service_time
+    assert controller.snapshot()['waiting'] == 0
+
+
+def test_client_buckets_are_bounded_lru():
+    controller = AdmissionController(client_rate=1, client_burst=1, max_clients=2)
+    for client in ('a', 'b', 'a', 'c'):
+        if controller.admit(client)[0]:
+            controller.release(0.001)
+    # 'b' foi o menos usado recentemente
+    assert list(controller.buckets) == ['a', 'c']
+
+
+@pytest.mark.parametrize('seconds, header', [(0.0, '1'), (0.2, '1'), (1.0, '1'), (1.01, '2'), (7.5, '8')])
+def test_retry_after_header_rounds_up_to_whole_seconds(seconds, header):
+    assert retry_after_header(seconds) == header
@@ -0,0 +1,130 @@
+# Testes da contagem de clientes/Erro do HyperLogLog, giro das janelas e despejo do Space-Saving
+
+
+import random
+
+import pytest
+
+from cardinality import HyperLogLog, SlidingWindowHLL, TopK, SlidingWindowTopK, ClientActivityTracker
+
+
+def relative_error(estimate, actual):
+    return abs(estimate - actual) / actual
+
+
+@pytest.mark.parametrize('n', [1000, 20000, 200000])
+def test_hll_error_within_three_standard_errors(n):
+    hll = HyperLogLog(p=11)
+    for i in range(n):
+        hll.add(f'cliente-{i}')
+    # Erro padrão 1.04/sqrt(2048) ~ 2.3%
+    assert relative_error(hll.count(), n) < 3 * 1.04 / hll.m ** 0.5
+
+
+def test_hll_small_cardinalities_use_linear_counting():
+    hll = HyperLogLog(p=11)
+    assert hll.count() == 0
+    for i in range(50):
+        hll.add(f'cliente-{i}')
+        hll.add(f'cliente-{i}')
+    assert abs(hll.count() - 50) <= 1
+
+
+def test_hll_merge_is_union():
+    a, b, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(5000):
+        (a if i % 2 else b).add(i)
+        union.add(i)
+    # Sobreposição não conta duas vezes
+    for i in range(0, 5000, 3):
+        a.add(i)
+    a.merge(b)
+    assert a.registers == union.registers
+
+
+def test_window_drops_buckets_older_than_window():
+    window = SlidingWindowHLL(window_seconds=60, buckets=6)
+    for i in range(300):
+        window.add(f'velho-{i}', now=5)
+    for i in range(200):
+        window.add(f'novo-{i}', now=35)
+    assert relative_error(window.count(now=40), 500) < 0.05
+    # t=65: o bucket de t=5 (epoch 0) saiu da janela, o de t=35 (epoch 3) continua
+    assert relative_error(window.count(now=65), 200) < 0.05
+    assert window.count(now=96) == 0
+
+
+def test_window_reuses_slot_without_stale_registers():
+    window = SlidingWindowHLL(window_seconds=60, buckets=6)
+    for i in range(1000):
+        window.add(f'velho-{i}', now=1)
+    # t=61 cai no mesmo slot (epoch 6 % 6 == 0): o sketch é limpo antes de receber o item
+    window.add('novo', now=61)
+    assert window.count(now=61) == 1
+
+
+def test_window_count_matches_fresh_union_between_rotations():
+    window = SlidingWindowHLL(window_seconds=60, buckets=6)
+    rng = random.Random(3)
+    now = 0.0
+    for step in range(400):
+        now += rng.random()
+        window.add(f'cliente-{rng.randrange(300)}', now=now)
+        if step % 7 == 0:
+            # A união mantida incrementalmente é igual à refeita do zero
+            expected = window.count(now=now)
+            window.merged = None
+            assert window.count(now=now) == expected
+
+
+def test_space_saving_evicts_minimum_and_inherits_its_count():
+    top = TopK(k=2)
+    for item in ['a', 'a', 'a', 'b', 'c']:
+        top.add(item)
+    assert top.items() == [{'client_id': 'a', 'requests': 3, 'error': 0},
+                           {'client_id': 'c', 'requests': 2, 'error': 1}]
+
+
+def test_space_saving_bounds_and_heavy_hitters():
+    rng = random.Random(7)
+    stream = ['pesado-1'] * 400 + ['pesado-2'] * 250 + [f'raro-{rng.randrange(500)}' for _ in range(1350)]
+    rng.shuffle(stream)
+    actual = {}
+    top = TopK(k=10)
+    for item in stream:
+        top.add(item)
+        actual[item] = actual.get(item, 0) + 1
+    ranking = top.items()
+    assert len(ranking) == 10
+    # Todo item com mais de N/k ocorrências está na tabela; contagem - erro <= real <= contagem
+    assert [r['client_id'] for r in ranking[:2]] == ['pesado-1', 'pesado-2']
+    for entry in ranking:
+        assert entry['requests'] - entry['error'] <= actual[entry['client_id']] <= entry['requests']
+    assert sum(r['requests'] for r in ranking) == len(stream)
+
+
+def test_windowed_top_k_drops_old_buckets_and_keeps_bounds():
+    top = SlidingWindowTopK(window_seconds=60, buckets=6, k=2)
+    for item in ['a'] * 5 + ['b'] * 3:
+        top.add(item, now=0)
+    for item in ['b'] * 4 + ['c'] * 2 + ['d']:
+        top.add(item, now=30)
+    # 'a' não está na tabela cheia do segundo bucket: pode ter ocorrido até o piso dela
+    ranking = {entry['client_id']: entry for entry in top.items(now=30)}
+    assert ranking['b']['requests'] == 7 and ranking['a']['requests'] - ranking['a']['error'] <= 5
+    assert ranking['a']['requests'] >= 5
+    # t=65: o bucket de t=0 saiu da janela
+    assert [entry['client_id'] for entry in top.items(now=65)] == ['b', 'd']
+
+
+def test_tracker_reports_each_window():
+    tracker = ClientActivityTracker(windows={'1m': (60, 6), '1h': (3600, 12)}, top_k=3)
+    for i in range(100):
+        tracker.record(f'c{i}', now=0)
+    tracker.record('c0', now=120)
+    assert tracker.active(now=120) == {'1m': 1, '1h': 100}
+    top = tracker.top_clients(now=120)
+    assert tracker.top_window == '1h'
+    assert len(top) == 3 and sum(entry['requests'] for entry in top) == 101
+    # O ranking é da janela, não acumulado desde o início do servidor
+    assert tracker.top_clients(now=3600 + 300) == []
@@ -0,0 +1,34 @@
+# Testes do coalescer/Lotes respondidos pela metade e encerramento
+
+
+import pytest
+
+from coalescer import AdaptiveCoalescer
+
+
+def test_partial_response_fails_unmatched_futures():
+    coalescer = AdaptiveCoalescer(lambda items: [item * 10 for item in items[:2]])
+    try:
+        coalescer.window = 4
+        futures = [coalescer.submit(i, 1) for i in range(4)]
+        assert [f.result(5) for f in futures[:2]] == [0, 10]
+        for future in futures[2:]:
+            with pytest.raises(RuntimeError):
+                future.result(5)
+    finally:
+        coalescer.close()
+
+
+def test_close_flushes_pending_and_rejects_new_items():
+    sent = []
+    coalescer = AdaptiveCoalescer(lambda items: sent.extend(items) or items, max_delay=10)
+    coalescer.window = 100
+    # Prazo longo: só o close() envia
+    coalescer.min_delay = 10
+    future = coalescer.submit('a', 1)
+    coalescer.close()
+    assert future.result(0) == 'a' and sent == ['a']
+    assert not coalescer.thread.is_alive()
+    coalescer.close()
+    with pytest.raises(RuntimeError):
+        coalescer.submit('b', 1)
@@ -0,0 +1,138 @@
+# Testes do protocolo TCP com quadros/Codificação e decodificação de quadros, requisições de scan e vereditos
+
+
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from framed_protocol import (OP_OK, OP_SCAN, MAX_PAYLOAD, ProtocolError, HEADER, FramedServer, FramedClient,
+                             encode_frame, read_frame, encode_scan_request, decode_scan_request,
+                             encode_verdict, decode_verdict)
+
+MD5 = '5d41402abc4b2a76b9719d911017c592'
+
+
+def roundtrip(file_hash, name='dir/arquivo.txt', preview=b'conteudo'):
+    return decode_scan_request(encode_scan_request(file_hash, name, preview))
+
+
+def test_scan_request_md5_roundtrip():
+    payload = encode_scan_request(MD5, 'dir/arquivo.txt', b'conteudo')
+    # Digest hexadecimal vai em binário: 16 bytes em vez de 32
+    assert len(payload) == 3 + 16 + 2 + len('dir/arquivo.txt') + len(b'conteudo')
+    assert decode_scan_request(payload) == (MD5, 'dir/arquivo.txt', b'conteudo')
+
+
+def test_scan_request_digest_longer_than_255_bytes():
+    hex_digest = 'ab' * 300
+    assert roundtrip(hex_digest) == (hex_digest, 'dir/arquivo.txt', b'conteudo')
+    text_digest = 'sha-x:' + 'z' * 400
+    assert roundtrip(text_digest) == (text_digest, 'dir/arquivo.txt', b'conteudo')
+
+
+def test_scan_request_non_hex_digest_and_unicode_name():
+    assert roundtrip('nao-hex', 'ação/é.txt', b'') == ('nao-hex', 'ação/é.txt', b'')
+
+
+def test_scan_request_rejects_missing_digest():
+    with pytest.raises(ValueError):
+        encode_scan_request(None, 'ilegivel.bin', b'')
+    with pytest.raises(ValueError):
+        encode_scan_request('', 'ilegivel.bin', b'')
+
+
+def test_scan_request_rejects_digest_over_length_prefix():
+    with pytest.raises(ValueError):
+        encode_scan_request('z' * 0x10000, 'a', b'')
+
+
+def test_verdict_roundtrip():
+    hash_hit = {'threat': 'Trojan.Teste', 'severity': 'critical', 'method': 'hash_signature',
+                'recommendations': ['Deletar arquivo imediatamente']}
+    pattern_hit = {'threat': 'Suspicious.Pattern', 'severity': 'medium', 'method': 'pattern_matching',
+                   'recommendations': ['Padrão suspeito encontrado: eval(', 'Padrão suspeito encontrado: exec(']}
+    for result in (hash_hit, pattern_hit):
+        decoded = decode_verdict(encode_verdict(result))
+        for key in ('threat', 'severity', 'method', 'recommendations'):
+            assert decoded[key] == result[key]
+    clean = decode_verdict(encode_verdict({'severity': 'none', 'method': None}))
+    assert clean['threat'] is None and clean['severity'] == 'none'
+
+
+def test_frame_roundtrip_over_socket():
+    left, right = socket.socketpair()
+    try:
+        payload = encode_scan_request('ab' * 300, 'x', b'p' * 1000)
+        left.sendall(encode_frame(7, OP_SCAN, payload) + encode_frame(8, OP_SCAN))
+        assert read_frame(right) == (7, OP_SCAN, payload)
+        assert read_frame(right) == (8, OP_SCAN, b'')
+    finally:
+        left.close()
+        right.close()
+
+
+def test_frame_over_limit_is_rejected():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(HEADER.pack(MAX_PAYLOAD + 1, 1, OP_SCAN))
+        with pytest.raises(ProtocolError):
+            read_frame(right)
+    finally:
+        left.close()
+        right.close()
+
+
+@pytest.fixture
+def framed_server():
+    servers = []
+
+    def start(dispatch):
+        server = FramedServer(('127.0.0.1', 0), dispatch)
+        server.start_background()
+        servers.append(server)
+        return server.server_address[1]
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_call_timeout_raises_builtin_and_forgets_request(framed_server):
+    release = threading.Event()
+
+    def dispatch(opcode, payload, state):
+        release.wait(5)
+        return OP_OK, b''
+
+    client = FramedClient('127.0.0.1', framed_server(dispatch), client_id='lento')
+    try:
+        # Builtin mesmo no Python 3.10, onde o TimeoutError de concurrent.futures é outra classe
+        with pytest.raises(TimeoutError) as raised:
+            client.call(OP_SCAN, b'x', timeout=0.05)
+        assert type(raised.value) is TimeoutError
+        assert client.pending == {}
+        # A resposta atrasada é descartada e a conexão continua utilizável
+        release.set()
+        assert client.call(OP_SCAN, b'y') == (OP_OK, b'')
+    finally:
+        release.set()
+        client.close()
+
+
+def test_hello_precedes_concurrent_requests(framed_server):
+    seen = []
+
+    def dispatch(opcode, payload, state):
+        seen.append(state['client_id'])
+        return OP_OK, b''
+
+    client = FramedClient('127.0.0.1', framed_server(dispatch), client_id='cliente-1')
+    try:
+        # Várias threads disparam o connect() juntas: nenhuma requisição pode sair antes do HELLO
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(lambda i: client.call(OP_SCAN, b'%d' % i), range(64)))
+        assert seen == ['cliente-1'] * 64
+    finally:
+        client.close()
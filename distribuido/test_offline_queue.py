@@ -0,0 +1,101 @@
+# Testes da fila offline/Retomada pelo offset, linhas truncadas por queda e compactação de caminhos repetidos
+
+
+from offline_queue import OfflineQueue
+
+
+def fill(queue, names):
+    for name in names:
+        queue.append(f'/dados/{name}', f'hash-{name}', 10, 1, 'previa')
+
+
+def pending(queue, size=200):
+    return [[entry['p'] for entry in entries] for entries, _ in queue.batches(size)]
+
+
+def test_entry_fields(tmp_path):
+    queue = OfflineQueue(tmp_path / 'fila.jsonl')
+    queue.append('/dados/a', 'abc', 10, 123, 'eval(payload) ção')
+    [[entry]] = [entries for entries, _ in queue.batches()]
+    # A prévia vai inteira: com o arquivo apagado é ela que o servidor analisa
+    assert entry == {'p': '/dados/a', 'h': 'abc', 's': 10, 'm': 123, 'v': 'eval(payload) ção'}
+
+
+def test_resumes_from_committed_batch(tmp_path):
+    queue = OfflineQueue(tmp_path / 'fila.jsonl')
+    fill(queue, 'abcde')
+    entries, offset = next(queue.batches(2))
+    queue.commit(offset)
+    queue.close()
+    # Nova execução: só o que veio depois do lote confirmado
+    reopened = OfflineQueue(tmp_path / 'fila.jsonl')
+    assert reopened.has_pending()
+    assert pending(reopened, 2) == [['/dados/c', '/dados/d'], ['/dados/e']]
+
+
+def test_commit_of_everything_removes_files(tmp_path):
+    queue = OfflineQueue(tmp_path / 'fila.jsonl')
+    fill(queue, 'ab')
+    *_, (entries, offset) = queue.batches()
+    queue.commit(offset)
+    assert not queue.has_pending()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_repeated_path_keeps_latest_entry(tmp_path):
+    queue = OfflineQueue(tmp_path / 'fila.jsonl')
+    fill(queue, 'aba')
+    [entries] = [entries for entries, _ in queue.batches()]
+    assert [e['p'] for e in entries] == ['/dados/b', '/dados/a']
+
+
+def test_truncated_line_is_skipped_and_later_entries_recovered(tmp_path):
+    path = tmp_path / 'fila.jsonl'
+    queue = OfflineQueue(path)
+    fill(queue, 'ab')
+    entries, offset = next(queue.batches(1))
+    queue.commit(offset)
+    queue.close()
+    # Queda no meio de uma escrita: última linha sem o '\n'
+    with open(path, 'ab') as f:
+        f.write(b'{"p":"/dados/meia","h":"ha')
+
+    reopened = OfflineQueue(path)
+    assert pending(reopened) == [['/dados/b']]
+    # A próxima execução anexa depois do fragmento sem perder a entrada nova
+    fill(reopened, 'c')
+    batches = list(reopened.batches())
+    assert [[e['p'] for e in entries] for entries, _ in batches] == [['/dados/b', '/dados/c']]
+    reopened.commit(batches[-1][1])
+    assert not reopened.has_pending() and not path.exists()
+
+
+def test_trailing_fragment_alone_does_not_stay_pending(tmp_path):
+    path = tmp_path / 'fila.jsonl'
+    queue = OfflineQueue(path)
+    fill(queue, 'a')
+    *_, (entries, offset) = queue.batches()
+    queue.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"p":"/dados/meia"')
+    queue.commit(offset)
+
+    reopened = OfflineQueue(path)
+    batches = list(reopened.batches())
+    assert [entries for entries, _ in batches] == [[]]
+    for _, offset in batches:
+        reopened.commit(offset)
+    assert not reopened.has_pending()
+
+
+def test_corrupt_offset_file_restarts_from_beginning(tmp_path):
+    queue = OfflineQueue(tmp_path / 'fila.jsonl')
+    fill(queue, 'ab')
+    queue.offset_path.write_text('lixo')
+    assert pending(queue) == [['/dados/a', '/dados/b']]
+
+
+def test_full_last_batch_is_not_yielded_twice(tmp_path):
+    queue = OfflineQueue(tmp_path / 'fila.jsonl')
+    fill(queue, 'abcd')
+    assert pending(queue, 2) == [['/dados/a', '/dados/b'], ['/dados/c', '/dados/d']]
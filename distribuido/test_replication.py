@@ -0,0 +1,122 @@
+# Testes da replicação/Réplicas encadeadas acompanham os snapshots da réplica que seguem
+
+
+import json
+import time
+import threading
+
+from replication import ChangeLog, ReplicaFollower
+from server import SignaturesDB
+from sharding import key_position
+
+OLD = 'aa' * 16
+NEW = 'bb' * 16
+
+
+class QuietLogger:
+    def info(self, *args, **kwargs):
+        pass
+
+    warning = info
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class Network:
+    """Sessão HTTP de mentira: cada URL aponta para um SignaturesDB no mesmo processo"""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def get(self, url, params=None, timeout=None):
+        base, route = url.split('/', 3)[2], '/' + url.split('/', 3)[3]
+        node = self.nodes[base]
+        if route == '/replication/changes':
+            # Sem long-polling no teste: o follower é dirigido passo a passo
+            return Response(node.changelog.since(params['since']))
+        return Response(json.loads(b''.join(node.store.export_chunks())))
+
+
+def follower(url, node, network):
+    replica = ReplicaFollower(url, node, QuietLogger())
+    replica.session = network
+    return replica
+
+
+def test_chained_replica_follows_snapshot_of_its_upstream(tmp_path):
+    primary, r1, r2 = (SignaturesDB('json', tmp_path / f'{name}.json') for name in ('p', 'r1', 'r2'))
+    network = Network({'p': primary, 'r1': r1})
+    f1, f2 = follower('http://p', r1, network), follower('http://r1', r2, network)
+    f1.snapshot()
+    f2.snapshot()
+
+    primary.add_signature(OLD, 'Old.Threat')
+    f1.poll()
+    f2.poll()
+    assert r2.lookup(OLD) == 'Old.Threat'
+
+    # Primário reiniciado com outra base: R1 precisa de snapshot, e R2 também
+    database = json.loads(b''.join(primary.store.export_chunks()))
+    database['malware'] = {NEW: 'New.Threat'}
+    primary.store.reset(database)
+    primary.changelog = ChangeLog()
+    epoch = r1.changelog.epoch
+    f1.poll()
+    assert r1.changelog.epoch != epoch and r1.lookup(NEW) == 'New.Threat'
+    f2.poll()
+    assert f2.stats['snapshots'] == 2
+    assert r2.lookup(NEW) == 'New.Threat' and r2.lookup(OLD) is None
+
+    # Depois do snapshot o encadeamento volta a receber só as alterações
+    primary.add_signature(OLD, 'Old.Again')
+    f1.poll()
+    f2.poll()
+    assert r2.lookup(OLD) == 'Old.Again' and f2.stats['snapshots'] == 2
+
+
+def test_new_epoch_wakes_long_polling_reader():
+    log = ChangeLog()
+    log.append(OLD, 'Old.Threat', 'agora')
+    result = {}
+
+    def poll():
+        result.update(log.since(log.seq, wait=5.0))
+
+    reader = threading.Thread(target=poll)
+    start = time.monotonic()
+    reader.start()
+    time.sleep(0.05)
+    epoch = log.new_epoch()
+    reader.join()
+    assert time.monotonic() - start < 2.0
+    assert result['epoch'] == epoch and result['changes'] == []
+
+
+def test_range_delete_reaches_chained_replicas(tmp_path):
+    primary, r1, r2 = (SignaturesDB('json', tmp_path / f'{name}.json') for name in ('p', 'r1', 'r2'))
+    network = Network({'p': primary, 'r1': r1})
+    f1, f2 = follower('http://p', r1, network), follower('http://r1', r2, network)
+    f1.snapshot()
+    f2.snapshot()
+    primary.add_signature(OLD, 'Old.Threat')
+    primary.add_signature(NEW, 'New.Threat')
+    f1.poll()
+    f2.poll()
+
+    # Rebalanceamento: a faixa de OLD foi para outro shard e sai do primário
+    primary.delete_range(key_position(OLD), key_position(NEW))
+    primary.add_signature(OLD, 'Old.Back')
+    primary.delete_range(key_position(OLD), key_position(NEW))
+    f1.poll()
+    f2.poll()
+    for node in (r1, r2):
+        # Aplicado na ordem do log: a readição entre as duas remoções não sobrevive
+        assert node.lookup(OLD) is None and node.lookup(NEW) == 'New.Threat'
+    # Pelo log, sem snapshot novo
+    assert f1.stats['snapshots'] == f2.stats['snapshots'] == 1
@@ -0,0 +1,100 @@
+# Testes do servidor HTTP/Conexões persistentes no handler do werkzeug usado pelo app.run
+
+
+import json
+import threading
+import http.client
+
+import pytest
+from werkzeug.serving import make_server
+
+import server
+from admission import AdmissionController
+
+
+@pytest.fixture
+def http_server(monkeypatch):
+    monkeypatch.setattr(server, 'admission', AdmissionController(client_rate=0))
+    # Mesmo servidor do app.run(threaded=True), com o handler do server.py
+    httpd = make_server('127.0.0.1', 0, server.app, threaded=True, request_handler=server.KeepAliveRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    thread.join()
+
+
+def connect(httpd):
+    return http.client.HTTPConnection('127.0.0.1', httpd.server_port, timeout=5)
+
+
+def get_health(conn):
+    conn.request('GET', '/health')
+    response = conn.getresponse()
+    body = response.read()
+    return response, json.loads(body)
+
+
+def test_two_requests_reuse_one_socket(http_server):
+    conn = connect(http_server)
+    first, _ = get_health(conn)
+    sock = conn.sock
+    assert first.status == 200 and first.getheader('Connection') is None and sock is not None
+    second, info = get_health(conn)
+    assert second.status == 200 and info['status'] == 'online'
+    # http.client só mantém o socket se a resposta não pediu para fechar
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_chunked_upload_keeps_connection(http_server):
+    conn = connect(http_server)
+    conn.request('POST', '/scan/stream?name=teste.py&client_id=t', body=iter([b'print(1)\n', b'eval(x)\n']),
+                 encode_chunked=True, headers={'Transfer-Encoding': 'chunked'})
+    response = conn.getresponse()
+    result = json.loads(response.read())
+    assert response.status == 200 and result['bytes_scanned'] == 17
+    sock = conn.sock
+    assert sock is not None
+    assert get_health(conn)[0].status == 200 and conn.sock is sock
+    conn.close()
+
+
+def test_unread_body_is_drained_before_next_request(http_server, monkeypatch):
+    monkeypatch.setitem(server.app.config, 'MAX_STREAM_BYTES', 10)
+    conn = connect(http_server)
+    # Rejeitado pelo Content-Length sem ler o corpo: o resto não pode virar a próxima requisição
+    conn.request('POST', '/scan/stream?name=grande&client_id=t', body=b'x' * 5000)
+    response = conn.getresponse()
+    response.read()
+    assert response.status == 413
+    sock = conn.sock
+    assert sock is not None
+    assert get_health(conn)[0].status == 200 and conn.sock is sock
+    conn.close()
+
+
+def test_stream_rescan_is_not_counted_as_another_scan(http_server, monkeypatch):
+    monkeypatch.setitem(server.signatures_db.stats, 'total_scans', 0)
+    monkeypatch.setitem(server.signatures_db.stats, 'stream_rescans', 0)
+    conn = connect(http_server)
+    conn.request('POST', '/scan', body=json.dumps({'hash': 'ab' * 16, 'name': 'grande.py', 'client_id': 't'}),
+                 headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    assert response.status == 200 and json.loads(response.read())['clean']
+    # Prévia limpa: o cliente manda o arquivo inteiro em seguida
+    conn.request('POST', '/scan/stream?name=grande.py&client_id=t&rescan=1', body=b'x' * 2000)
+    assert json.loads(conn.getresponse().read())['bytes_scanned'] == 2000
+    conn.request('GET', '/stats')
+    stats = json.loads(conn.getresponse().read())
+    assert (stats['total_scans'], stats['stream_rescans']) == (1, 1)
+    conn.close()
+
+
+def test_client_connection_close_is_honored(http_server):
+    conn = connect(http_server)
+    conn.request('GET', '/health', headers={'Connection': 'close'})
+    response = conn.getresponse()
+    response.read()
+    assert response.getheader('Connection') == 'close'
+    conn.close()
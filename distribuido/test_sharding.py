@@ -0,0 +1,69 @@
+# Testes do particionamento/Posição no anel, faixas nos dois backends e rebalanceamento com digests curtos
+
+
+import pytest
+
+from sharding import HashRing, RING_SIZE, key_position, position_bound, plan_rebalance, prefix_range
+from signature_store import JsonSignatureStore, SqliteSignatureStore, default_database
+
+NODES = ['http://a:5000', 'http://b:5000']
+DIGESTS = ['5d41402abc4b2a76b9719d911017c592', '2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae',
+           'ab', 'abcd', 'ff', '00', '0100', 'abcd000000000000', 'abcd00000000000001', '7fffffffffffffff']
+
+
+def make_store(kind, path):
+    if kind == 'sqlite':
+        return SqliteSignatureStore(path / 'db.sqlite3', seed=False)
+    database = default_database()
+    database['malware'] = {}
+    store = JsonSignatureStore(path / 'db.json')
+    store.reset(database)
+    return store
+
+
+def test_short_digest_is_zero_padded():
+    assert key_position('abcd') == 0xabcd000000000000
+    assert key_position('ABCD') == key_position('abcd000000000000')
+    assert key_position('5d41402abc4b2a76b9719d911017c592') == 0x5d41402abc4b2a76
+
+
+def test_position_bound_orders_like_key_position():
+    for position in (0, 1, 0xab00000000000000, 0xabcd000000000000, 0xabcd000000000001, RING_SIZE - 1):
+        bound = position_bound(position)
+        for digest in DIGESTS:
+            # Ordem de BLOBs do SQLite (memcmp, prefixo antes) é a mesma de bytes no Python
+            assert (bytes.fromhex(digest) >= bound) == (key_position(digest) >= position), (digest, position)
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_range_export_matches_ring_owner(kind, tmp_path):
+    store = make_store(kind, tmp_path)
+    store.add_batch([(d, f'T.{d}') for d in DIGESTS], 'agora')
+    start, end = 0xabcd000000000000, 0xabce000000000000
+    assert {d for d, _ in store.export_range(start, end)} == {'abcd', 'abcd000000000000', 'abcd00000000000001'}
+    assert {d for d, _ in store.export_range(*prefix_range('ab'))} == {
+        'ab', 'abcd', 'abcd000000000000', 'abcd00000000000001'}
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_short_digest_stays_on_owner_after_rebalance(kind, tmp_path):
+    old_ring = HashRing(NODES, vnodes=16)
+    new_ring = HashRing(NODES + ['http://c:5000'], vnodes=16)
+    stores = {}
+    for node in new_ring.nodes:
+        path = tmp_path / node.split('//')[1].replace(':', '_')
+        path.mkdir()
+        stores[node] = make_store(kind, path)
+    for node in old_ring.nodes:
+        stores[node].add_batch([(d, f'T.{d}') for d in DIGESTS if old_ring.owner(d) == node], 'agora')
+
+    # Mesmo roteiro do reshard.py: copia a faixa para o destino e apaga da origem
+    for start, end, source, target in plan_rebalance(old_ring, new_ring):
+        stores[target].add_batch(stores[source].export_range(start, end), 'agora')
+        stores[source].delete_range(start, end)
+
+    for node, store in stores.items():
+        held = {d for d, _ in store.export_range(0, RING_SIZE)}
+        assert held == {d for d in DIGESTS if new_ring.owner(d) == node}
+        for digest in held:
+            assert store.lookup(digest) == f'T.{digest}'
@@ -0,0 +1,193 @@
+# Transporte HTTP do cliente/Sessão keep-alive com pool de conexões, novas tentativas e circuit breaker
+
+
+import time
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Requisição recusada localmente: o circuito do servidor está aberto"""
+
+
+class CircuitBreaker:
+    """Fechado → aberto após `failure_threshold` falhas seguidas → meio-aberto após `reset_timeout`.
+
+    Aberto, recusa tudo sem tocar na rede; meio-aberto, deixa passar uma única
+    requisição de teste, que fecha o circuito se der certo ou o reabre se falhar.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+        self.stats = {'opened': 0, 'short_circuited': 0}
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self.probing = False
+            if self.state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            self.stats['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.stats['opened'] += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+def counting_pools(counter):
+    """Classes de pool do urllib3 cujas conexões somam em `counter` cada socket realmente aberto.
+
+    O urllib3 reaproveita o mesmo objeto `HTTPConnection` e reconecta por baixo
+    quando o servidor fecha a conexão, sem mudar `num_connections`; só contando
+    `connect()` dá para saber se houve keep-alive de verdade.
+    """
+    def counted(connection_cls):
+        class CountingConnection(connection_cls):
+            def connect(self):
+                counter.increment()
+                return super().connect()
+        return CountingConnection
+
+    class CountingHTTPPool(HTTPConnectionPool):
+        ConnectionCls = counted(HTTPConnection)
+
+    class CountingHTTPSPool(HTTPSConnectionPool):
+        ConnectionCls = counted(HTTPSConnection)
+
+    return {'http': CountingHTTPPool, 'https': CountingHTTPSPool}
+
+
+class _Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def increment(self):
+        with self.lock:
+            self.value += 1
+
+
+class HttpTransport:
+    """Uma `requests.Session` compartilhada: conexões keep-alive reaproveitadas entre arquivos.
+
+    Falhas ao abrir a conexão (nada foi enviado) são repetidas pelo urllib3 com
+    backoff exponencial para qualquer método; falhas de leitura e respostas
+    502/503/504 só para GETs, que são idempotentes. 429 e failover ficam a
+    cargo do cliente. Cada servidor tem
+    seu circuit breaker, então um servidor fora do ar custa `failure_threshold`
+    timeouts e não um timeout por arquivo.
+    """
+
+    def __init__(self, pool_size=16, connect_timeout=2.0, read_timeout=10.0, retries=2,
+                 backoff_factor=0.2, failure_threshold=3, reset_timeout=10.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False,
+                      respect_retry_after_header=True)
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.connects = _Counter()
+        self.adapter.poolmanager.pool_classes_by_scheme = counting_pools(self.connects)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _origin(url):
+        parts = urlparse(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def breaker(self, url):
+        origin = self._origin(url)
+        with self.lock:
+            breaker = self.breakers.get(origin)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.breakers[origin] = breaker
+            return breaker
+
+    def allows(self, url):
+        """Consulta sem consumir a vaga de teste do estado meio-aberto; servidor pulado conta como evitado"""
+        breaker = self.breaker(url)
+        allowed = breaker.state == 'closed' or (
+            breaker.state == 'open' and time.monotonic() - breaker.opened_at >= breaker.reset_timeout)
+        if not allowed:
+            with breaker.lock:
+                breaker.stats['short_circuited'] += 1
+        return allowed
+
+    def request(self, method, url, timeout=None, **kwargs):
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f'Circuito aberto para {self._origin(url)}')
+        if timeout is None or isinstance(timeout, (int, float)):
+            timeout = (self.connect_timeout, timeout or self.read_timeout)
+        try:
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def connection_stats(self):
+        """Sockets abertos (cada `connect()`, inclusive reconexões) vs requisições feitas nos pools"""
+        requests_made = 0
+        pools = self.adapter.poolmanager.pools
+        for pool in [pools[key] for key in pools.keys()]:
+            requests_made += pool.num_requests
+        opened = self.connects.value
+        breakers = list(self.breakers.values())
+        return {
+            'connections_opened': opened,
+            'requests': requests_made,
+            'connections_reused': max(0, requests_made - opened),
+            'circuit_opened': sum(b.stats['opened'] for b in breakers),
+            'short_circuited': sum(b.stats['short_circuited'] for b in breakers)
+        }
+
+    def close(self):
+        self.session.close()
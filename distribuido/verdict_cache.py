@@ -0,0 +1,116 @@
+# Cache de vereditos do cliente/Vereditos em disco por arquivo e por hash, válidos para uma versão da base do servidor
+
+
+import os
+import json
+import threading
+from pathlib import Path
+
+
+class VerdictCache:
+    """Vereditos de execuções anteriores, gravados em JSON ao lado do cliente.
+
+    Um arquivo com o mesmo caminho, tamanho, mtime e inode reaproveita o
+    veredito sem ser lido; um arquivo alterado cujo conteúdo (MD5) já foi visto
+    reaproveita o veredito pelo hash. Tudo é descartado de uma vez quando a
+    etiqueta da base do servidor (`_version`/`_last_update` do /health) muda.
+    """
+
+    # Chaves que o cliente acrescenta ao veredito e que não fazem parte dele
+    TRANSIENT_KEYS = ('hash', 'bytes_scanned', 'fallback', 'cached', 'queued')
+
+    def __init__(self, path, max_entries=200000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.tag = None
+        self.entries = {}
+        self.by_digest = {}
+        self.active = False
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'hash_hits': 0, 'misses': 0, 'stores': 0, 'invalidated': 0}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.tag = data.get('tag')
+            self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+        self.by_digest = {e['hash']: e['verdict'] for e in self.entries.values() if e.get('hash')}
+
+    def validate(self, tag):
+        """Ativa o cache para a versão atual da base; versão diferente apaga todos os vereditos"""
+        with self.lock:
+            if tag is None:
+                # Servidor fora do ar: sem como saber se os vereditos ainda valem
+                self.active = False
+                return
+            if tag != self.tag:
+                self.stats['invalidated'] = len(self.entries)
+                self.entries = {}
+                self.by_digest = {}
+                self.tag = tag
+                self.dirty = True
+            self.active = True
+
+    @staticmethod
+    def identity(filepath):
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return str(Path(filepath).resolve()), st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get(self, identity):
+        """Veredito do arquivo se ele não mudou desde a última execução"""
+        if not self.active or identity is None:
+            return None
+        key, size, mtime_ns, inode = identity
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry['size'] == size and entry['mtime_ns'] == mtime_ns and entry['inode'] == inode:
+                self.stats['hits'] += 1
+                return dict(entry['verdict'])
+            self.stats['misses'] += 1
+        return None
+
+    def get_by_hash(self, file_hash):
+        if not self.active or not file_hash:
+            return None
+        with self.lock:
+            verdict = self.by_digest.get(file_hash)
+            if verdict is not None:
+                self.stats['hash_hits'] += 1
+                return dict(verdict)
+        return None
+
+    def put(self, identity, file_hash, verdict):
+        if not self.active or identity is None:
+            return
+        key, size, mtime_ns, inode = identity
+        verdict = {k: v for k, v in verdict.items() if k not in self.TRANSIENT_KEYS}
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = {'size': size, 'mtime_ns': mtime_ns, 'inode': inode,
+                                 'hash': file_hash, 'verdict': verdict}
+            if file_hash:
+                self.by_digest[file_hash] = verdict
+            while len(self.entries) > self.max_entries:
+                oldest = next(iter(self.entries))
+                self.by_digest.pop(self.entries.pop(oldest).get('hash'), None)
+            self.stats['stores'] += 1
+            self.dirty = True
+
+    def save(self):
+        """Grava em um arquivo temporário e troca de uma vez (nunca deixa o cache pela metade)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump({'tag': self.tag, 'entries': self.entries}, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
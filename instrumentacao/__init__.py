@@ -0,0 +1,6 @@
+# Instrumentação compartilhada pelos dois antivírus
+
+from .fases import PhaseTimer, zero_clock
+from .recursos import ResourceSampler
+
+__all__ = ['PhaseTimer', 'zero_clock', 'ResourceSampler']
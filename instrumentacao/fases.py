@@ -0,0 +1,121 @@
+# Tempo por fase do scan/Acumula perf_counter_ns por fase (stat, leitura, hash, rede...) ao longo da execução
+
+
+import time
+import threading
+from contextlib import nullcontext
+
+# Contexto reutilizável devolvido quando a medição está desligada (ou fora de um arquivo)
+NOOP = nullcontext()
+
+
+def zero_clock():
+    return 0
+
+
+class _Phase:
+    __slots__ = ('timer', 'name')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._exit()
+        return False
+
+
+class PhaseTimer:
+    """Tempo acumulado por fase, em nanossegundos, somado entre arquivos e threads.
+
+    As fases são aninháveis e contadas de forma exclusiva: ao entrar em uma
+    fase interna o relógio da externa pausa, então a soma das fases é o tempo
+    dos arquivos, sem dupla contagem. Fases internas só contam dentro de uma
+    fase raiz (`root=True`, aberta por arquivo) na mesma thread; trabalho de
+    threads auxiliares (envio de lotes, por exemplo) fica de fora, já que o
+    arquivo que espera por ele já mede a espera.
+
+    Desligado (`enabled=False`), `phase()` devolve um contexto vazio e `clock`
+    sempre 0, sem tocar no relógio nem em locks.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.clock = time.perf_counter_ns if enabled else zero_clock
+        self.totals = {}
+        self.counts = {}
+        self.maxima = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def phase(self, name, root=False):
+        if not self.enabled or not (root or getattr(self.local, 'stack', None)):
+            return NOOP
+        return _Phase(self, name)
+
+    def _enter(self, name):
+        now = time.perf_counter_ns()
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        if stack:
+            # Pausa a fase externa: o tempo daqui em diante é da interna
+            parent = stack[-1]
+            parent[2] += now - parent[1]
+        stack.append([name, now, 0])
+
+    def _exit(self):
+        now = time.perf_counter_ns()
+        stack = self.local.stack
+        name, started, elapsed = stack.pop()
+        self._record(name, elapsed + now - started, 1)
+        if stack:
+            stack[-1][1] = now
+
+    def add(self, name, elapsed_ns, calls=1):
+        """Soma tempo medido por fora de `phase()` (laços de leitura/hash por bloco).
+
+        O trecho medido está dentro da fase aberta nesta thread, então ela perde
+        esse tempo, como aconteceria com uma fase interna.
+        """
+        stack = getattr(self.local, 'stack', None)
+        if not self.enabled or not stack:
+            return
+        stack[-1][2] -= elapsed_ns
+        self._record(name, elapsed_ns, calls)
+
+    def _record(self, name, elapsed_ns, calls):
+        with self.lock:
+            self.totals[name] = self.totals.get(name, 0) + elapsed_ns
+            self.counts[name] = self.counts.get(name, 0) + calls
+            if elapsed_ns > self.maxima.get(name, 0):
+                self.maxima[name] = elapsed_ns
+
+    def snapshot(self):
+        """Fase → total (ms), chamadas, média e máximo (µs) e fração do tempo medido; maior total primeiro"""
+        with self.lock:
+            totals = dict(self.totals)
+            counts = dict(self.counts)
+            maxima = dict(self.maxima)
+        measured = sum(totals.values())
+        return {name: {'total_ms': total / 1e6,
+                       'calls': counts[name],
+                       'avg_us': total / counts[name] / 1e3 if counts[name] else 0.0,
+                       'max_us': maxima.get(name, 0) / 1e3,
+                       'share': total / measured if measured else 0.0}
+                for name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)}
+
+    def table_lines(self, phases=None, indent='   '):
+        """Linhas da tabela de fases para o print_results dos scanners"""
+        phases = self.snapshot() if phases is None else phases
+        if not phases:
+            return []
+        lines = [f"{indent}{'fase':<14} {'chamadas':>9} {'total ms':>11} {'média µs':>10} {'máx µs':>10} {'%':>6}"]
+        for name, p in phases.items():
+            lines.append(f"{indent}{name:<14} {p['calls']:>9} {p['total_ms']:>11.2f} {p['avg_us']:>10.1f} "
+                         f"{p['max_us']:>10.1f} {p['share'] * 100:>5.1f}%")
+        return lines
@@ -0,0 +1,143 @@
+# Uso de recursos do processo durante o scan/Amostra CPU, RSS, E/S, descritores e threads em intervalo fixo numa thread auxiliar
+
+
+import time
+import threading
+import psutil
+
+# Intervalo padrão entre amostras (s): fino o bastante para pegar o pico de scans de poucos segundos
+INTERVAL = 0.05
+# Séries guardadas em cada amostra; E/S é acumulada desde o início, as demais são instantâneas
+SERIES = ('cpu_percent', 'rss_mb', 'read_mb', 'write_mb', 'fds', 'threads')
+# Séries resumidas: E/S vira taxa entre amostras consecutivas (o acumulado só cresce)
+STATS = ('cpu_percent', 'rss_mb', 'read_mb_s', 'write_mb_s', 'fds', 'threads')
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+class ResourceSampler:
+    """Amostras periódicas do próprio processo via psutil, do `start()` ao `stop()`.
+
+    A CPU é a % desde a amostra anterior (100 = um núcleo inteiro). Leitura e
+    escrita vêm de `io_counters()`: no Linux `read_chars`/`write_chars`, que
+    contam também o que saiu do cache de páginas (`read_bytes` só vê o disco e
+    fica em 0 com o corpus em cache). Descritores são `num_fds()` (handles no
+    Windows). A contagem de threads desconta a do próprio amostrador.
+
+    Desligado (`enabled=False`), `start()` e `stop()` não criam thread e o
+    resumo só tem a memória do início e do fim, como antes.
+    """
+
+    def __init__(self, interval=INTERVAL, enabled=True):
+        self.interval = interval
+        self.enabled = enabled
+        self.process = psutil.Process()
+        self.samples = {'t': [], **{name: [] for name in SERIES}}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.io_start = None
+
+    def io_mb(self):
+        try:
+            io = self.process.io_counters()
+        except (AttributeError, psutil.Error):
+            # macOS não expõe E/S por processo
+            return 0.0, 0.0
+        read = getattr(io, 'read_chars', io.read_bytes)
+        write = getattr(io, 'write_chars', io.write_bytes)
+        return read / 1024 / 1024, write / 1024 / 1024
+
+    def descriptors(self):
+        try:
+            return self.process.num_fds()
+        except AttributeError:
+            return self.process.num_handles()
+
+    def sample(self):
+        with self.process.oneshot():
+            cpu = self.process.cpu_percent(None)
+            rss = self.process.memory_info().rss / 1024 / 1024
+            read, write = self.io_mb()
+            fds = self.descriptors()
+            threads = self.process.num_threads() - (self.thread is not None)
+        self.samples['t'].append(time.perf_counter() - self.started)
+        for name, value in zip(SERIES, (cpu, rss, read - self.io_start[0], write - self.io_start[1], fds, threads)):
+            self.samples[name].append(value)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.io_start = self.io_mb()
+        # A primeira chamada de cpu_percent só fixa a referência
+        self.process.cpu_percent(None)
+        self.sample()
+        if self.enabled:
+            self.thread = threading.Thread(target=self.run, name='recursos', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """Para a thread, tira a amostra final e devolve o resumo"""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.sample()
+        return self.summary()
+
+    def rate(self, name):
+        """Série acumulada → taxa por segundo entre amostras consecutivas"""
+        t = self.samples['t']
+        values = self.samples[name]
+        rates = [(values[i] - values[i - 1]) / (t[i] - t[i - 1]) for i in range(1, len(t)) if t[i] > t[i - 1]]
+        return rates or [0.0]
+
+    def summary(self):
+        """Pico, média e percentis de cada série; E/S em MB totais; amostras em colunas para os gráficos"""
+        samples = self.samples
+        series = {name: samples[name] for name in ('rss_mb', 'fds', 'threads')}
+        # A amostra inicial de CPU é a referência (sempre 0) e puxaria a média para baixo
+        series['cpu_percent'] = samples['cpu_percent'][1:] or samples['cpu_percent']
+        series['read_mb_s'] = self.rate('read_mb')
+        series['write_mb_s'] = self.rate('write_mb')
+        stats = {}
+        for name in STATS:
+            values = series[name]
+            stats[name] = {'peak': max(values), 'mean': sum(values) / len(values),
+                           'p50': percentile(values, 0.50), 'p95': percentile(values, 0.95),
+                           'p99': percentile(values, 0.99)}
+        rss = samples['rss_mb']
+        return {'interval': self.interval, 'count': len(samples['t']),
+                'rss_start_mb': rss[0], 'rss_end_mb': rss[-1], 'rss_growth_mb': max(rss) - rss[0],
+                'read_mb': samples['read_mb'][-1], 'write_mb': samples['write_mb'][-1],
+                'stats': stats, 'samples': samples}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    @staticmethod
+    def table_lines(resources, indent='   '):
+        """Linhas da tabela de recursos para o print_results dos scanners"""
+        if not resources or resources['count'] < 3:
+            return []
+        units = {'cpu_percent': 'CPU %', 'rss_mb': 'RSS MB', 'read_mb_s': 'leitura MB/s',
+                 'write_mb_s': 'escrita MB/s', 'fds': 'descritores', 'threads': 'threads'}
+        lines = [f"{indent}{'recurso':<13} {'pico':>10} {'média':>10} {'p50':>10} {'p95':>10} {'p99':>10}"]
+        for name in STATS:
+            s = resources['stats'][name]
+            lines.append(f"{indent}{units[name]:<13} {s['peak']:>10.1f} {s['mean']:>10.1f} {s['p50']:>10.1f} "
+                         f"{s['p95']:>10.1f} {s['p99']:>10.1f}")
+        lines.append(f"{indent}{resources['count']} amostras a cada {resources['interval'] * 1000:.0f}ms; "
+                     f"lidos {resources['read_mb']:.2f} MB, escritos {resources['write_mb']:.2f} MB")
+        return lines
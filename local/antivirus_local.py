@@ -2,18 +2,22 @@
 
 
 import os
+import sys
+import argparse
 import hashlib
 import json
 import time
-import psutil
 from pathlib import Path
 from datetime import datetime
 from colorama import Fore, Style, init
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from instrumentacao import PhaseTimer, ResourceSampler
+
 init(autoreset=True)
 
 class AntivirusLocal:
-    def __init__(self):
+    def __init__(self, phases=True, resources=True):
         self.signatures = {}
         self.load_signatures()
         self.scan_results = {
@@ -30,9 +34,15 @@ class AntivirusLocal:
             'threat_severity': {'critical': 0, 'high': 0, 'medium': 0, 'low': 0},
             'file_types_scanned': {},
             'largest_file': {'name': '', 'size': 0},
-            'smallest_file': {'name': '', 'size': float('inf')}
+            'smallest_file': {'name': '', 'size': float('inf')},
+            'phases': {},
+            'resources': {}
         }
         self.scan_times = []  # tempos individuais de cada arquivo
+        # Tempo por fase de cada arquivo (stat, leitura, hash, padrões, saída)
+        self.phases = PhaseTimer(enabled=phases)
+        # Amostras de CPU, memória, E/S, descritores e threads durante o scan
+        self.resources = resources
         
     def load_signatures(self):
         """Carrega assinaturas de malware da base local"""
@@ -76,21 +86,40 @@ class AntivirusLocal:
     def calculate_hash(self, filepath):
         """Calcula o hash MD5 de um arquivo"""
         md5 = hashlib.md5()
+        clock = self.phases.clock
+        read_ns = hash_ns = 0
+        # Abertura e leituras contam como leitura; cada update do MD5, como hash
+        t0 = clock()
         try:
             with open(filepath, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
+                while True:
+                    chunk = f.read(4096)
+                    t1 = clock()
+                    read_ns += t1 - t0
+                    if not chunk:
+                        break
                     md5.update(chunk)
+                    t0 = clock()
+                    hash_ns += t0 - t1
             return md5.hexdigest()
         except Exception as e:
             return None
+        finally:
+            self.phases.add('leitura', read_ns)
+            self.phases.add('hash', hash_ns)
     
     def scan_file(self, filepath):
         """Escaneia um arquivo individual com análise detalhada"""
+        with self.phases.phase('outros', root=True):
+            return self._scan_file(filepath)
+    
+    def _scan_file(self, filepath):
         file_start_time = time.time()
         self.scan_results['total_files'] += 1
         
         try:
-            file_size = Path(filepath).stat().st_size
+            with self.phases.phase('stat'):
+                file_size = Path(filepath).stat().st_size
             self.scan_results['total_bytes_scanned'] += file_size
             
             # Rastrear maior e menor arquivo
@@ -113,10 +142,11 @@ class AntivirusLocal:
         file_hash = self.calculate_hash(filepath)
         if file_hash and file_hash in self.signatures.get('malware', {}):
             threat_name = self.signatures['malware'][file_hash]
-            print(f"{Fore.RED}✗ AMEAÇA DETECTADA: {filepath}")
-            print(f"  Tipo: {threat_name}")
-            print(f"  Método: Assinatura Hash")
-            print(f"  Severidade: CRÍTICA")
+            with self.phases.phase('saída'):
+                print(f"{Fore.RED}✗ AMEAÇA DETECTADA: {filepath}")
+                print(f"  Tipo: {threat_name}")
+                print(f"  Método: Assinatura Hash")
+                print(f"  Severidade: CRÍTICA")
             self.scan_results['infected_files'] += 1
             self.scan_results['detection_methods']['hash'] += 1
             self.scan_results['threat_severity']['critical'] += 1
@@ -133,33 +163,35 @@ class AntivirusLocal:
         # Verificar padrões suspeitos
         if not threat_detected:
             try:
-                with open(filepath, 'rb') as f:
+                with self.phases.phase('leitura'), open(filepath, 'rb') as f:
                     content = f.read()
-                    for pattern in self.signatures.get('suspicious_patterns', []):
-                        if pattern in content:
-                            print(f"{Fore.YELLOW} SUSPEITO: {filepath}")
-                            print(f"  Padrão encontrado: {pattern.decode('utf-8', errors='ignore')}")
-                            print(f"  Método: Análise de Padrões")
-                            print(f"  Severidade: MÉDIA")
-                            self.scan_results['suspicious_files'] += 1
-                            self.scan_results['detection_methods']['pattern'] += 1
-                            self.scan_results['threat_severity']['medium'] += 1
-                            self.scan_results['threats_found'].append({
-                                'file': str(filepath),
-                                'threat': 'Suspicious.Pattern',
-                                'pattern': str(pattern),
-                                'method': 'pattern_matching',
-                                'severity': 'medium',
-                                'size': file_size
-                            })
-                            threat_detected = True
-                            break
+                with self.phases.phase('padrões'):
+                    pattern = next((p for p in self.signatures.get('suspicious_patterns', []) if p in content), None)
+                if pattern is not None:
+                    with self.phases.phase('saída'):
+                        print(f"{Fore.YELLOW} SUSPEITO: {filepath}")
+                        print(f"  Padrão encontrado: {pattern.decode('utf-8', errors='ignore')}")
+                        print(f"  Método: Análise de Padrões")
+                        print(f"  Severidade: MÉDIA")
+                    self.scan_results['suspicious_files'] += 1
+                    self.scan_results['detection_methods']['pattern'] += 1
+                    self.scan_results['threat_severity']['medium'] += 1
+                    self.scan_results['threats_found'].append({
+                        'file': str(filepath),
+                        'threat': 'Suspicious.Pattern',
+                        'pattern': str(pattern),
+                        'method': 'pattern_matching',
+                        'severity': 'medium',
+                        'size': file_size
+                    })
+                    threat_detected = True
             except:
                 pass
         
         if not threat_detected:
             self.scan_results['clean_files'] += 1
-            print(f"{Fore.GREEN}✓ Limpo: {filepath}")
+            with self.phases.phase('saída'):
+                print(f"{Fore.GREEN}✓ Limpo: {filepath}")
         
         # Registrar tempo de scan
         file_scan_time = time.time() - file_start_time
@@ -174,8 +206,7 @@ class AntivirusLocal:
         print(f"{Fore.CYAN}{'='*70}\n")
         
         start_time = time.time()
-        process = psutil.Process()
-        start_memory = process.memory_info().rss / 1024 / 1024  # MB
+        sampler = ResourceSampler(enabled=self.resources).start()
         
         path = Path(directory)
         if path.is_file():
@@ -187,10 +218,13 @@ class AntivirusLocal:
                     self.scan_file(filepath)
         
         end_time = time.time()
-        end_memory = process.memory_info().rss / 1024 / 1024  # MB
+        resources = sampler.stop()
         
         self.scan_results['scan_time'] = end_time - start_time
-        self.scan_results['memory_used'] = end_memory - start_memory
+        # Crescimento até o pico, não a diferença fim - início (que perde o pico e pode ser negativa)
+        self.scan_results['memory_used'] = resources['rss_growth_mb']
+        self.scan_results['resources'] = resources
+        self.scan_results['phases'] = self.phases.snapshot()
         
         # Calcular métricas adicionais
         if self.scan_results['scan_time'] > 0:
@@ -222,9 +256,17 @@ class AntivirusLocal:
             print(f"   Arquivo mais rápido: {min(self.scan_times)*1000:.2f}ms")
             print(f"   Arquivo mais lento: {max(self.scan_times)*1000:.2f}ms")
         
+        # Fases
+        if self.scan_results['phases']:
+            print(f"\n{Fore.WHITE}TEMPO POR FASE:")
+            for line in self.phases.table_lines(self.scan_results['phases']):
+                print(line)
+        
         # Recursos
         print(f"\n{Fore.WHITE}USO DE RECURSOS:")
-        print(f"   Memória utilizada: {self.scan_results['memory_used']:.2f} MB")
+        print(f"   Memória utilizada: {self.scan_results['memory_used']:.2f} MB (pico - início)")
+        for line in ResourceSampler.table_lines(self.scan_results['resources']):
+            print(line)
         total_mb = self.scan_results['total_bytes_scanned'] / 1024 / 1024
         print(f"   Total de dados escaneados: {total_mb:.2f} MB")
         if self.scan_results['scan_time'] > 0:
@@ -285,20 +327,21 @@ class AntivirusLocal:
         print(f"   • Sem inteligência coletiva")
 
 def main():
-    import sys
-    
-    if len(sys.argv) < 2:
-        print("Uso: python antivirus_local.py <diretório ou arquivo>")
-        sys.exit(1)
-    
-    target = sys.argv[1]
+    parser = argparse.ArgumentParser(description='Antivírus local')
+    parser.add_argument('target', help='Diretório ou arquivo a escanear')
+    # Mesmos nomes do client.py distribuído
+    parser.add_argument('--no-phases', action='store_true',
+                        help='Desliga a medição de tempo por fase (nenhuma leitura de relógio extra)')
+    parser.add_argument('--no-resources', action='store_true',
+                        help='Desliga o amostrador (só memória do início e do fim)')
+    args = parser.parse_args()
     
-    if not os.path.exists(target):
-        print(f"{Fore.RED}Erro: {target} não existe!")
+    if not os.path.exists(args.target):
+        print(f"{Fore.RED}Erro: {args.target} não existe!")
         sys.exit(1)
     
-    av = AntivirusLocal()
-    av.scan_directory(target)
+    av = AntivirusLocal(phases=not args.no_phases, resources=not args.no_resources)
+    av.scan_directory(args.target)
 
 if __name__ == '__main__':
     main()